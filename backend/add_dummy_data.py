@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from settings import SessionLocal
 from models.users import User
+from models.friendship import Friendship
 from models.vitaldataname import VitalDataName
 from models.vitaldata import VitalData
 from models.objective import Objective
@@ -46,37 +47,35 @@ def add_dummy_data():
                 "username": "田中太郎",
                 "date_of_birth": datetime(1990, 5, 15),
                 "sex": True,  # True: 男性
-                "friends": [2, 3],
-                "objective": [1, 2, 7]  # 体重、身長、歩数の目標
+                "friends": [2, 3]
             },
             {
                 "email": "suzuki.hanako@example.com", 
                 "username": "鈴木花子",
                 "date_of_birth": datetime(1985, 8, 22),
                 "sex": False,  # False: 女性
-                "friends": [1, 3, 4],
-                "objective": [1, 5, 8]  # 体重、心拍数、睡眠時間の目標
+                "friends": [1, 3, 4]
             },
             {
                 "email": "yamada.ichiro@example.com",
                 "username": "山田一郎",
                 "date_of_birth": datetime(1992, 12, 3),
                 "sex": True,
-                "friends": [1, 2],
-                "objective": [3, 4, 7]  # 血圧、心拍数、歩数の目標
+                "friends": [1, 2]
             },
             {
                 "email": "sato.yuki@example.com",
                 "username": "佐藤由紀",
                 "date_of_birth": datetime(1988, 3, 10),
                 "sex": False,
-                "friends": [2],
-                "objective": [1, 9, 10]  # 体重、水分摂取量、カロリー摂取量の目標
+                "friends": [2]
             }
         ]
         
         print("👥 ユーザーデータを追加中...")
-        for user_data in users_data:
+        friend_links = []
+        for user_id, user_data in enumerate(users_data, start=1):
+            friend_links.extend((user_id, friend_id) for friend_id in user_data.pop("friends"))
             existing = db.query(User).filter(User.email == user_data["email"]).first()
             if not existing:
                 user = User(**user_data)
@@ -84,6 +83,13 @@ def add_dummy_data():
         
         db.commit()
         
+        # 友達関係の追加
+        for user_id, friend_id in friend_links:
+            if not db.get(Friendship, (user_id, friend_id)):
+                db.add(Friendship(user_id=user_id, friend_id=friend_id))
+        
+        db.commit()
+        
         # バイタルデータの追加
         print("📈 バイタルデータを追加中...")
         base_date = datetime.now() - timedelta(days=30)
@@ -144,24 +150,28 @@ def add_dummy_data():
             {
                 "start_date": datetime.now() - timedelta(days=20),
                 "end_date": datetime.now() + timedelta(days=40),
+                "user_id": 1,
                 "name_id": 1,  # 体重
                 "value": 65.0
             },
             {
                 "start_date": datetime.now() - timedelta(days=15),
                 "end_date": datetime.now() + timedelta(days=45),
+                "user_id": 2,
                 "name_id": 7,  # 歩数
                 "value": 10000.0
             },
             {
                 "start_date": datetime.now() - timedelta(days=10),
                 "end_date": datetime.now() + timedelta(days=50),
+                "user_id": 3,
                 "name_id": 8,  # 睡眠時間
                 "value": 8.0
             },
             {
                 "start_date": datetime.now() - timedelta(days=25),
                 "end_date": datetime.now() + timedelta(days=35),
+                "user_id": 4,
                 "name_id": 5,  # 心拍数
                 "value": 70.0
             }
@@ -2,7 +2,6 @@ from pydantic_settings import BaseSettings
 from typing import Optional
 
 class Settings(BaseSettings):
-    database_url: str = "sqlite:///./db.sqlite3"
     secret_key: str = "your-secret-key-here"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
@@ -15,5 +14,6 @@ class Settings(BaseSettings):
 
     class Config:
         env_file = ".env"
+        extra = "ignore"  # DB の接続設定（DATABASE_URL, DB_*）は settings.py で読む
 
 settings = Settings()
\ No newline at end of file
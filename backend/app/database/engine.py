@@ -0,0 +1,194 @@
+"""
+DB 接続の設定と engine の生成
+
+接続先・コネクションプール・ステートメントタイムアウト・SQLite の PRAGMA は環境変数（.env）で指定する
+engine の実体は settings.py で1回だけ作り、スクリプト・FastAPI・Alembic のすべてがそれを使う
+
+    APP_ENV=production
+    DATABASE_URL_PRODUCTION=postgresql://user:pass@db:5432/health
+    DB_POOL_SIZE=20
+    DB_STATEMENT_TIMEOUT_MS=10000
+
+接続先は DATABASE_URL_<APP_ENV> → DATABASE_URL → 既定値（development のみ SQLite）の順で決める
+読み取りレプリカは DATABASE_READ_URL_<APP_ENV> → DATABASE_READ_URL（app/database/routing.py）
+"""
+
+import os
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import Field
+from pydantic_settings import BaseSettings
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+
+
+# APP_ENV ごとの既定の接続先（ここにない環境では DATABASE_URL の指定が必須）
+DEFAULT_DATABASE_URLS = {
+    "development": "sqlite:///./test.db",  # プロジェクトルート直下
+}
+
+# 非同期ドライバ
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+class DatabaseSettings(BaseSettings):
+    app_env: str = Field("development", validation_alias="APP_ENV")
+    database_url: Optional[str] = Field(None, validation_alias="DATABASE_URL")
+    # 読み取り専用エンドポイントの接続先（レプリカ、未設定なら primary を使う）
+    read_database_url: Optional[str] = Field(None, validation_alias="DATABASE_READ_URL")
+    # 書き込んだユーザーの読み取りを primary に送る秒数（レプリカの遅延より長くする）
+    read_your_writes_seconds: float = 5.0
+
+    # コネクションプール（インメモリ SQLite 以外で有効）
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30  # 空き接続を待つ秒数
+    pool_recycle: int = 1800  # この秒数より古い接続は作り直す（サーバー側のアイドル切断対策）
+    pool_pre_ping: bool = True  # 貸し出し前に接続の生存確認をする（サーバー DB のみ）
+
+    # 1文あたりの実行時間の上限（ミリ秒、0 で無効）
+    # PostgreSQL / MySQL のみ（SQLite にはサーバー側のタイムアウトがない）
+    statement_timeout_ms: int = 30000
+
+    echo: bool = False  # SQL をログに出す
+
+    # SQLite のチューニング（接続ごとに PRAGMA を設定する、DB_SQLITE_TUNING=false で無効）
+    sqlite_tuning: bool = True
+    # WAL では読み取りと書き込みが互いを待たない（DB ファイルの横に -wal / -shm ファイルができる）
+    sqlite_journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST"] = "WAL"
+    # WAL と NORMAL の組み合わせでは DB は壊れないが、電源断時に直近のコミットが失われることがある
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000  # 他の接続の書き込みロックを待つ上限
+    sqlite_cache_size_kib: int = 65536  # 接続ごとのページキャッシュ
+    sqlite_mmap_size: int = 268435456  # メモリマップで読む上限バイト数（0 で無効）
+    sqlite_temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"  # ソート・一時テーブルをメモリに置く
+
+    class Config:
+        env_prefix = "DB_"
+        env_file = ".env"
+        extra = "ignore"
+
+    def resolved_url(self) -> str:
+        """APP_ENV に応じた接続先 URL を返す"""
+        url = os.getenv(f"DATABASE_URL_{self.app_env.upper()}") or self.database_url
+        if url:
+            return url
+        if self.app_env in DEFAULT_DATABASE_URLS:
+            return DEFAULT_DATABASE_URLS[self.app_env]
+        raise RuntimeError(
+            f"APP_ENV={self.app_env} では DATABASE_URL_{self.app_env.upper()} または DATABASE_URL を設定してください"
+        )
+
+    def resolved_read_url(self) -> Optional[str]:
+        """APP_ENV に応じた読み取りレプリカの URL を返す（未設定なら None）"""
+        return os.getenv(f"DATABASE_READ_URL_{self.app_env.upper()}") or self.read_database_url
+
+
+def async_database_url(url: str) -> str:
+    """同期ドライバの URL を非同期ドライバ（aiosqlite / asyncpg など）の URL にする"""
+    parsed = make_url(url)
+    if "+" in parsed.drivername or parsed.drivername not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[parsed.drivername]).render_as_string(hide_password=False)
+
+
+def is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def engine_options(config: DatabaseSettings, url: str, is_async: bool) -> Dict[str, Any]:
+    """create_engine / create_async_engine に渡す引数を組み立てる"""
+    backend = make_url(url).get_backend_name()
+    options: Dict[str, Any] = {"echo": config.echo}
+    connect_args: Dict[str, Any] = {}
+
+    if backend == "sqlite":
+        if not is_async:
+            # FastAPI のスレッドプールから同じ接続を使うため
+            connect_args["check_same_thread"] = False
+        if is_memory_sqlite(url):
+            # インメモリ DB は接続ごとに別の DB になるため1本を共有する
+            options["poolclass"] = StaticPool
+            options["connect_args"] = connect_args
+            return options
+    elif config.statement_timeout_ms > 0:
+        if backend == "postgresql" and is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(config.statement_timeout_ms)}
+        elif backend == "postgresql":
+            connect_args["options"] = f"-c statement_timeout={config.statement_timeout_ms}"
+
+    # aiosqlite の既定は NullPool（セッションごとに接続を開く）のため、プールを明示する
+    options["poolclass"] = AsyncAdaptedQueuePool if is_async else QueuePool
+    options.update(
+        pool_size=config.pool_size,
+        max_overflow=config.max_overflow,
+        pool_timeout=config.pool_timeout,
+        pool_recycle=config.pool_recycle,
+        # SQLite はファイルを開くだけなので生存確認は不要
+        pool_pre_ping=config.pool_pre_ping and backend != "sqlite",
+    )
+    options["connect_args"] = connect_args
+    return options
+
+
+def sqlite_pragmas(config: DatabaseSettings, url: str) -> List[str]:
+    """接続ごとに実行する PRAGMA（チューニングを無効にしている場合は空）"""
+    if not config.sqlite_tuning:
+        return []
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config.sqlite_busy_timeout_ms)}",
+        f"PRAGMA synchronous = {config.sqlite_synchronous}",
+        # 負の値は KiB 単位の指定
+        f"PRAGMA cache_size = -{int(config.sqlite_cache_size_kib)}",
+        f"PRAGMA mmap_size = {int(config.sqlite_mmap_size)}",
+        f"PRAGMA temp_store = {config.sqlite_temp_store}",
+    ]
+    if not is_memory_sqlite(url):
+        # journal_mode は DB ファイルに記録されるが、接続ごとに設定しても害はない
+        # （切り替え時のロック待ちに busy_timeout が効くよう、その後に実行する）
+        pragmas.insert(1, f"PRAGMA journal_mode = {config.sqlite_journal_mode}")
+    return pragmas
+
+
+def execute_on_connect(engine: Engine, statements: List[str]) -> None:
+    """新しい接続を開くたびに statements を実行する（プールから再利用する接続では実行しない）"""
+    if not statements:
+        return
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+
+def connect_statements(config: DatabaseSettings, url: str, dialect_name: str) -> List[str]:
+    """接続ごとに実行する文（SQLite の PRAGMA と、接続オプションで指定できない MySQL のタイムアウト）"""
+    if dialect_name == "sqlite":
+        return sqlite_pragmas(config, url)
+    if dialect_name == "mysql" and config.statement_timeout_ms > 0:
+        return [f"SET SESSION max_execution_time = {int(config.statement_timeout_ms)}"]
+    return []
+
+
+def create_db_engine(config: DatabaseSettings, url: Optional[str] = None) -> Engine:
+    """スクリプト・CLI・Alembic 用の同期 engine を作る"""
+    url = url or config.resolved_url()
+    engine = create_engine(url, **engine_options(config, url, is_async=False))
+    execute_on_connect(engine, connect_statements(config, url, engine.dialect.name))
+    return engine
+
+
+def create_async_db_engine(config: DatabaseSettings, url: Optional[str] = None) -> AsyncEngine:
+    """FastAPI 用の非同期 engine を作る（終了時に dispose() してプールの接続を閉じること）"""
+    url = async_database_url(url or config.resolved_url())
+    engine = create_async_engine(url, **engine_options(config, url, is_async=True))
+    execute_on_connect(engine.sync_engine, connect_statements(config, url, engine.dialect.name))
+    return engine
@@ -0,0 +1,74 @@
+"""
+月単位の時間パーティション（vitaldata）
+
+PostgreSQL では vitaldata を date の範囲でネイティブにパーティション分割する（月ごとの子テーブル + DEFAULT）。
+パーティション表の主キー・ユニーク索引にはパーティションキーを含める必要があるため、
+テーブルの info["partition_key"] の列を主キーに加えて CREATE TABLE を出力する（ORM 上の主キーは id のまま）
+
+SQLite にはパーティションがないため vitaldata は1つのテーブルのままにし、
+古い月はアーカイブテーブル（vitaldata_archive_YYYYMM）に切り出す（app/services/vital_partitions.py）
+"""
+
+from datetime import date, datetime
+from typing import Iterator, Optional, Union
+
+from sqlalchemy import PrimaryKeyConstraint
+from sqlalchemy.ext.compiler import compiles
+
+
+def month_start(value: Union[date, datetime]) -> date:
+    """日時が属する月の初日"""
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    """翌月の初日"""
+    return date(month.year + 1, 1, 1) if month.month == 12 else date(month.year, month.month + 1, 1)
+
+
+def months_between(start: Union[date, datetime], end: Union[date, datetime]) -> Iterator[date]:
+    """start の月から end の月まで（両端を含む）の月初を順に返す"""
+    month, last = month_start(start), month_start(end)
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def month_bounds(month: date) -> tuple:
+    """月の範囲 [月初0時, 翌月初0時)（vitaldata.date と比べる naive な日時）"""
+    return datetime.combine(month, datetime.min.time()), datetime.combine(next_month(month), datetime.min.time())
+
+
+def overlaps(month: date, start: Optional[datetime], end: Optional[datetime]) -> bool:
+    """月が期間 [start, end]（None は無制限）にかかるか"""
+    lower, upper = month_bounds(month)
+    return (start is None or upper > start) and (end is None or lower <= end)
+
+
+def partition_name(table_name: str, month: date) -> str:
+    """月ごとの子パーティション名（PostgreSQL）"""
+    return f"{table_name}_p{month:%Y%m}"
+
+
+def default_partition_name(table_name: str) -> str:
+    """どの月のパーティションにも入らない行を受けるパーティション名（PostgreSQL）"""
+    return f"{table_name}_default"
+
+
+def archive_table_name(table_name: str, month: date) -> str:
+    """アーカイブした月のテーブル名（SQLite / PostgreSQL 共通）"""
+    return f"{table_name}_archive_{month:%Y%m}"
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def compile_partitioned_primary_key(element, compiler, **kw):
+    partition_key = element.table.info.get("partition_key")
+    if partition_key is None or not element.table.dialect_options["postgresql"]["partition_by"]:
+        return compiler.visit_primary_key_constraint(element, **kw)
+    columns = [column.name for column in element.columns]
+    if partition_key not in columns:
+        columns.append(partition_key)
+    text = "PRIMARY KEY (%s)" % ", ".join(compiler.preparer.quote(name) for name in columns)
+    if element.name is not None:
+        text = "CONSTRAINT %s %s" % (compiler.preparer.format_constraint(element), text)
+    return text
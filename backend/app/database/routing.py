@@ -0,0 +1,103 @@
+"""
+読み取りレプリカへの振り分けと read-your-writes
+
+読み取り専用のエンドポイントはレプリカ（DATABASE_READ_URL）のセッションを使い、書き込みは primary に送る。
+レプリカは primary から遅れて追いつくため、書き込んだユーザーの読み取りは一定時間（DB_READ_YOUR_WRITES_SECONDS）
+primary に送り、自分の書き込みが見えない状態を避ける
+
+書き込みの検出は WriteTrackingSession が行う（INSERT / UPDATE / DELETE か flush をしたセッションの commit 時に、
+session.info["user_id"] のユーザーを記録する。user_id は認証の依存関数が設定する）
+
+recent_writers の記録はプロセス内にしかないため、複数のワーカーで動かすと別のワーカーに届いた読み取りには効かない。
+そのため書き込みのあったリクエストの応答には書き込み時刻の Cookie（LAST_WRITE_COOKIE）も付け、
+どのワーカーでもその時刻から期間内の読み取りは primary に送る（時刻はワーカー間で比べられるよう time.time() を使う）
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class RecentWriters:
+    """直近に書き込んだユーザーと、primary から読むべき期限（プロセス内で保持する）"""
+
+    def __init__(self, window: float = 5.0):
+        self.window = window
+        self._deadlines: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: int) -> None:
+        deadline = time.monotonic() + self.window
+        with self._lock:
+            self._deadlines[user_id] = deadline
+            # 期限切れの記録は書き込みのたびに少しずつ消す
+            if len(self._deadlines) > 1024:
+                now = time.monotonic()
+                for expired in [key for key, value in self._deadlines.items() if value <= now]:
+                    del self._deadlines[expired]
+
+    def is_recent(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        deadline = self._deadlines.get(user_id)
+        return deadline is not None and deadline > time.monotonic()
+
+    def clear(self) -> None:
+        """プロセス内の記録を消す（別のワーカーに届いた読み取りを確認スクリプトで再現する）"""
+        with self._lock:
+            self._deadlines.clear()
+
+    def is_recent_write(self, written_at: Optional[float]) -> bool:
+        """Cookie で受け取った書き込み時刻（UNIX 時間）が期間内か（他のワーカーでの書き込み）"""
+        return written_at is not None and 0 <= time.time() - written_at < self.window
+
+
+# アプリ全体で共有する記録（期間は settings.py で DB_READ_YOUR_WRITES_SECONDS に合わせる）
+recent_writers = RecentWriters()
+
+# 書き込み時刻を持ち回る Cookie の名前
+LAST_WRITE_COOKIE = "last_write"
+
+# リクエストごとの書き込み時刻（app/main.py のミドルウェアが dict を設定し、mark_writer が commit 時に書き込む）
+request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+
+def parse_last_write(value: Optional[str]) -> Optional[float]:
+    """Cookie の値を書き込み時刻に変換する（不正な値は無視する）"""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class WriteTrackingSession(Session):
+    """commit した書き込みをユーザーごとに recent_writers に記録するセッション（primary 用）"""
+
+
+@event.listens_for(WriteTrackingSession, "do_orm_execute")
+def track_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(WriteTrackingSession, "after_flush")
+def track_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(WriteTrackingSession, "after_commit")
+def mark_writer(session):
+    if session.info.pop("wrote", False) and session.info.get("user_id") is not None:
+        recent_writers.mark(session.info["user_id"])
+        writes = request_writes.get()
+        if writes is not None:
+            writes["written_at"] = time.time()
+
+
+@event.listens_for(WriteTrackingSession, "after_rollback")
+def forget_writes(session):
+    session.info.pop("wrote", None)
@@ -1,24 +1,15 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from app.config import settings
-
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False},
-    echo=False,
+# DB の engine・セッションは settings.py に一本化している（ここは互換のための再エクスポート）
+from settings import (
+    DATABASE_URL,
+    READ_DATABASE_URL,
+    engine,
+    SessionLocal,
+    async_engine,
+    AsyncSessionLocal,
+    async_read_engine,
+    AsyncReadSessionLocal,
+    Base,
+    get_db,
+    get_async_db,
+    get_async_read_session,
 )
-
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
-)
-
-Base = declarative_base()
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -1,13 +1,36 @@
-from fastapi import FastAPI
+import math
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, user, friends, vital_data, objectives, chat
+from sqlalchemy.exc import SQLAlchemyError
+from app.utils.user_cache import cache_stats
+from app.utils.vital_names import vital_names
+from app.database.routing import LAST_WRITE_COOKIE, recent_writers, request_writes
+from settings import async_engine, async_read_engine, AsyncSessionLocal
 from fastapi.middleware.cors import CORSMiddleware
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # カテゴリ名 ⇔ ID の辞書を読み込んでおく（全件の読み込みは起動時だけ。失敗したら起動を止める）
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(vital_names.load)
+    except SQLAlchemyError as e:
+        print(f"❌ カテゴリ辞書を読み込めませんでした: {e}")
+        raise
+    yield
+    # プールに残った DB 接続を閉じる
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
 app = FastAPI(
     title="Health Tracking API", 
     description="健康管理アプリケーションAPI", 
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -33,10 +56,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def remember_last_write(request: Request, call_next):
+    # 書き込みのあったリクエストの応答に書き込み時刻の Cookie を付ける（他のワーカーでも read-your-writes にするため）
+    writes = {}
+    token = request_writes.set(writes)
+    try:
+        response = await call_next(request)
+    finally:
+        request_writes.reset(token)
+    if "written_at" in writes:
+        response.set_cookie(
+            LAST_WRITE_COOKIE, f"{writes['written_at']:.3f}",
+            max_age=max(1, math.ceil(recent_writers.window)), httponly=True, samesite="lax",
+        )
+    return response
+
 @app.get("/")
 async def root():
     return {"message": "Health Tracking API is running"}
 
+@app.get("/metrics/user-cache")
+async def user_cache_metrics():
+    # 認証ユーザーキャッシュとカテゴリ辞書のヒット・ミス数（監視用）
+    return {**cache_stats(), "vital_names": vital_names.stats()}
+
 def main():
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
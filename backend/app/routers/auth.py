@@ -1,11 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
 from datetime import datetime, timedelta
 
 from app.schemas.auth import LoginRequest, TokenResponse, OTPRequest
 from app.utils.auth import create_access_token, generate_otp
 from app.utils.email import send_otp_email
-from settings import get_db
+from settings import get_async_db
 from app.config import settings
 from models.users import User
 from models.otpcodes import OTPCode
@@ -13,29 +14,27 @@ from models.otpcodes import OTPCode
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/login/")
-async def login(request: LoginRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
+async def login(request: LoginRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email == request.email))
     if not user:
         user = User(
             email=request.email,
             username="新規ユーザー",
             date_of_birth=None,
-            sex=None,
-            friends=[],
-            objective=[]
+            sex=None
             )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     
     otp_code = generate_otp()
     expires_at = datetime.utcnow() + timedelta(minutes=settings.otp_expire_minutes)
     
-    db.query(OTPCode).filter(OTPCode.id == user.id).delete()
+    await db.execute(delete(OTPCode).where(OTPCode.id == user.id))
     
     otp_record = OTPCode(id=user.id, otp_code=otp_code, expires_at=expires_at, is_used=False)
     db.add(otp_record)
-    db.commit()
+    await db.commit()
     
     # 邮件发送をバックグラウンドで実行し、エラーが発生してもログイン処理を継続
     try:
@@ -47,18 +46,18 @@ async def login(request: LoginRequest, background_tasks: BackgroundTasks, db: Se
     return {"message": f"OTP sent to your email.: {otp_code}"}
 
 @router.post("/one-time/", response_model=TokenResponse)
-async def verify_otp(request: OTPRequest, db: Session = Depends(get_db)):
-    otp_record = db.query(OTPCode).filter(
+async def verify_otp(request: OTPRequest, db: AsyncSession = Depends(get_async_db)):
+    otp_record = await db.scalar(select(OTPCode).where(
         OTPCode.otp_code == request.otp_code,
         OTPCode.is_used == False,
         OTPCode.expires_at > datetime.utcnow()
-    ).first()
+    ))
     
     if not otp_record:
         raise HTTPException(status_code=401, detail="Invalid or expired OTP")
     
     otp_record.is_used = True
-    db.commit()
+    await db.commit()
     
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
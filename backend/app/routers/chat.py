@@ -1,6 +1,6 @@
 import os
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.schemas.chat import (
@@ -10,10 +10,10 @@ from app.schemas.chat import (
     ConversationHistoryResponse,
     CreateConversationRequest
 )
-from app.utils.auth import get_current_user
+from app.utils.auth import get_current_user, get_async_read_db
 from app.services.agent_service import AgentService
 from models.users import User
-from settings import get_db
+from settings import get_async_db
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
@@ -21,7 +21,7 @@ router = APIRouter(prefix="/chat", tags=["Chat"])
 async def send_message(
     request: ChatRequest, 
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """メッセージを送信してエージェントから応答を受け取る"""
     openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -33,7 +33,8 @@ async def send_message(
     try:
         result = await agent_service.process_message(
             request.message, 
-            request.conversation_id
+            request.conversation_id,
+            request.client_message_id
         )
         
         return ChatResponse(**result)
@@ -43,7 +44,7 @@ async def send_message(
 @router.get("/conversations/", response_model=List[ConversationSummary])
 async def get_conversations(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """ユーザーの会話一覧を取得"""
     openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -62,7 +63,7 @@ async def get_conversations(
 async def get_conversation_history(
     conversation_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """特定の会話の履歴を取得"""
     openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -86,7 +87,7 @@ async def get_conversation_history(
 async def delete_conversation(
     conversation_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """会話を削除"""
     openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -110,7 +111,7 @@ async def delete_conversation(
 async def create_conversation(
     request: CreateConversationRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """新しい会話を作成"""
     openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -123,7 +124,7 @@ async def create_conversation(
         conversation = await agent_service._get_or_create_conversation()
         if request.title:
             conversation.title = request.title
-            db.commit()
+            await db.commit()
         
         return {
             "conversation_id": conversation.id,
@@ -138,7 +139,7 @@ async def create_conversation(
 async def chat_legacy(
     request: ChatRequest, 
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """レガシーチャットエンドポイント（後方互換性のため）"""
     return await send_message(request, current_user, db)
\ No newline at end of file
@@ -1,54 +1,85 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List
 from datetime import datetime
-import base64
 
-from app.schemas.user import FriendListResponse, FriendDetailResponse, AddFriendRequest
-from app.utils.auth import get_current_user
-from settings import get_db
+from app.schemas.user import FriendListResponse, FriendDetailResponse, FriendSuggestionResponse, AddFriendRequest
+from app.utils.auth import get_current_principal, get_current_user_id, get_async_read_db
+from app.utils.icons import encode_icon, icon_url
+from app.utils.icon_store import IconStore
+from app.utils.user_cache import invalidate_user
+from app.services.friend_service import FriendService
+from app.services.vital_rollup import VitalRollupService
+from settings import get_async_db
 from models.users import User
-from models.vitaldata import VitalData
 from models.vitaldataname import VitalDataName
 from models.uservitalcategory import UserVitalCategory
 
 router = APIRouter(prefix="/friends", tags=["Friends"])
 
 @router.get("/", response_model=List[FriendListResponse])
-async def get_friends(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_friends(
+    include_icon: bool = False,
+    current_user: User = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     friends = []
-    if current_user.friends:
-        friend_ids = current_user.friends
-        for friend_id in friend_ids:
-            friend = db.query(User).filter(User.id == friend_id).first()
-            if friend:
-                age = -1
-                if friend.date_of_birth:
-                    today = datetime.now()
-                    age = today.year - friend.date_of_birth.year
-                    if (today.month, today.day) < (friend.date_of_birth.month, friend.date_of_birth.day):
-                        age -= 1
+    store = IconStore()
+    # friendships と JOIN して友達をまとめて取得（アイコンは icon_url で返し、include_icon=true のときだけ本体を埋め込む）
+    for friend in await db.run_sync(lambda session: FriendService(session).friends(current_user.id)):
+        age = -1
+        if friend.date_of_birth:
+            today = datetime.now()
+            age = today.year - friend.date_of_birth.year
+            if (today.month, today.day) < (friend.date_of_birth.month, friend.date_of_birth.day):
+                age -= 1
 
-                icon_str = None
-                if friend.icon:
-                    if isinstance(friend.icon, bytes):
-                        icon_str = base64.b64encode(friend.icon).decode('utf-8')
-                    elif isinstance(friend.icon, str):
-                        icon_str = friend.icon
-
-                friends.append(FriendListResponse(
-                    user_id=friend.id,
-                    username=friend.username,
-                    icon=icon_str,
-                    age=age,
-                    sex=friend.sex
-                ))
+        friends.append(FriendListResponse(
+            user_id=friend.id,
+            username=friend.username,
+            icon=encode_icon(await run_in_threadpool(store.read, friend.icon_hash)) if include_icon else None,
+            icon_url=icon_url(friend.id, friend.icon_hash, thumbnail=True),
+            age=age,
+            sex=friend.sex
+        ))
     
     return friends
 
+@router.get("/suggestions/", response_model=List[FriendSuggestionResponse])
+async def get_friend_suggestions(
+    limit: int = Query(20, ge=1, le=100),
+    include_icon: bool = False,
+    current_user: User = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # 友達の友達を共通の友達が多い順に返す
+    suggestions = []
+    store = IconStore()
+    for candidate, mutual_friends in await db.run_sync(
+        lambda session: FriendService(session).friends_of_friends(current_user.id, limit)
+    ):
+        suggestions.append(FriendSuggestionResponse(
+            user_id=candidate.id,
+            username=candidate.username,
+            icon=encode_icon(await run_in_threadpool(store.read, candidate.icon_hash)) if include_icon else None,
+            icon_url=icon_url(candidate.id, candidate.icon_hash, thumbnail=True),
+            mutual_friends=mutual_friends
+        ))
+
+    return suggestions
+
 @router.get("/{user_id}/", response_model=FriendDetailResponse)
-async def get_friend_detail(user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    friend = db.query(User).filter(User.id == user_id).first()
+async def get_friend_detail(
+    user_id: int,
+    max_points: int = Query(500, ge=1, le=5000),
+    include_icon: bool = False,
+    current_user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # 自分自身を指定された場合もセッション内の一部の列だけ読んだ User ではなく全列を読み直す
+    friend = await db.get(User, user_id, populate_existing=True)
     if not friend:
         raise HTTPException(status_code=404, detail="Friend not found")
     
@@ -60,35 +91,27 @@ async def get_friend_detail(user_id: int, current_user: User = Depends(get_curre
             age -= 1
     
     # Get friend's registered categories that are public
-    user_categories = db.query(VitalDataName).join(UserVitalCategory).filter(
+    user_categories = (await db.execute(select(VitalDataName, UserVitalCategory.is_accumulating).join(UserVitalCategory).where(
         VitalDataName.id == UserVitalCategory.vital_id, 
         UserVitalCategory.user_id == friend.id,
         UserVitalCategory.is_public == True
-    ).all()
+    ))).all()
     
     life_logs = []
-    
-    for category in user_categories:
-        # Get vital data for this category
-        vital_data = db.query(VitalData).filter(
-            VitalData.user_id == friend.id,
-            VitalData.name_id == category.id
-        ).order_by(VitalData.date).all()
-        
-        # Convert to chart data format
-        vitaldata_list = [
-            {"x": data.date.isoformat(), "y": data.value}
-            for data in vital_data
-        ]
-        
+    for category, is_accumulating in user_categories:
+        # 点数の上限に収まる最も細かい粒度（生データ / 時間 / 日 / 週 / 月）の系列を返す（全期間の生データは返さない）
+        _, points = await db.run_sync(
+            lambda session: VitalRollupService(session).series(friend.id, category.id, is_accumulating, max_points)
+        )
         life_logs.append({
             "data_name": category.name,
-            "vitaldata_list": vitaldata_list
+            "vitaldata_list": [{"x": point["x"].isoformat(), "y": point["y"]} for point in points]
         })
     
     return FriendDetailResponse(
         user_id=friend.id,
-        icon=friend.icon,
+        icon=encode_icon(await run_in_threadpool(IconStore().read, friend.icon_hash)) if include_icon else None,
+        icon_url=icon_url(friend.id, friend.icon_hash),
         username=friend.username,
         age=age,
         sex=friend.sex,
@@ -96,27 +119,17 @@ async def get_friend_detail(user_id: int, current_user: User = Depends(get_curre
     )
 
 @router.post("/add/")
-async def add_friend(request: AddFriendRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    friend = db.query(User).filter(User.id == request.friend_id).first()
+async def add_friend(request: AddFriendRequest, current_user: User = Depends(get_current_principal), db: AsyncSession = Depends(get_async_db)):
+    if request.friend_id == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot add yourself as a friend")
+
+    friend = await db.get(User, request.friend_id)
     if not friend:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # 当前用户加对方
-    friends = current_user.friends or []
-    if request.friend_id not in friends:
-        friends.append(request.friend_id)
-        friends.sort()
-        current_user.friends = friends
-
-    # 对方也加当前用户
-    friend_friends = friend.friends or []
-    if current_user.id not in friend_friends:
-        friend_friends.append(current_user.id)
-        friend_friends.sort()
-        friend.friends = friend_friends
-
-    db.commit()
-    db.refresh(current_user)
-    db.refresh(friend)
+    # 双方向の友達関係を追加（既にあれば何もしない）
+    await db.run_sync(lambda session: FriendService(session).add_friend(current_user.id, request.friend_id))
+    await db.commit()
+    invalidate_user(current_user.id, request.friend_id)
     
     return {"message": "Friend added successfully"}
\ No newline at end of file
@@ -1,134 +1,64 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List
-import base64
 
 from app.schemas.objective import (
     ObjectiveResponse, ObjectiveListResponse, 
     CreateObjectiveRequest, UpdateObjectiveRequest
 )
-from app.utils.auth import get_current_user
-from settings import get_db
+from app.utils.auth import get_current_principal, get_async_read_db
+from app.utils.user_cache import invalidate_user
+from app.utils.vital_names import vital_names
+from app.utils.vital_name_index import vital_name_index
+from settings import get_async_db
 from models.users import User
 from models.objective import Objective
-from models.vitaldata import VitalData
 from models.vitaldataname import VitalDataName
-from models.uservitalcategory import UserVitalCategory
-from sqlalchemy import func
+from app.services.objective_progress import ObjectiveProgressService
 
 router = APIRouter(prefix="/objectives", tags=["Objectives"])
 
 @router.get("/", response_model=List[ObjectiveResponse])
-async def get_objectives(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == current_user.id).first()
-    objectives_id = user.objective
-    friends_id = user.friends
-    result = []
-    for obj in objectives_id:
-        objective = db.query(Objective).join(VitalDataName).filter(Objective.id == obj, Objective.name_id == VitalDataName.id).first()
-        if objective:
-            friends = []
-            for friend in friends_id:
-                friend_category = db.query(UserVitalCategory).filter(
-                    UserVitalCategory.user_id == friend,
-                    UserVitalCategory.vital_id == objective.name_id
-                ).first()
-                
-                if friend_category:
-                    if friend_category.is_accumulating:
-                        total_value = db.query(func.sum(VitalData.value)).filter(
-                            VitalData.user_id == friend,
-                            VitalData.name_id == objective.name_id,
-                            VitalData.date >= objective.start_date,
-                            VitalData.date <= objective.end_date
-                        ).scalar()
-                        friend_value = total_value if total_value is not None else None
-                    else:
-                        latest_data = db.query(VitalData).filter(
-                            VitalData.user_id == friend,
-                            VitalData.name_id == objective.name_id,
-                            VitalData.date >= objective.start_date,
-                            VitalData.date <= objective.end_date
-                        ).order_by(VitalData.date.desc()).first()
-                        friend_value = latest_data.value if latest_data else None
-                    if friend_value is not None:
-                        friend_user = db.query(User).filter(User.id == friend).first()
-                        if friend_user:
-                            icon_str = None
-                            if friend_user.icon:
-                                if isinstance(friend_user.icon, bytes):
-                                    icon_str = base64.b64encode(friend_user.icon).decode('utf-8')
-                                elif isinstance(friend_user.icon, str):
-                                    icon_str = friend_user.icon
-                            friends.append({
-                                "friend_icon": icon_str,
-                                "friend_info": friend_value,
-                                "friend_sex": friend_user.sex
-                            })
-
-            user_category = db.query(UserVitalCategory).filter(
-                UserVitalCategory.user_id == current_user.id,
-                UserVitalCategory.vital_id == objective.name_id
-            ).first()
-            
-            if not user_category:
-                my_value = None
-            elif user_category.is_accumulating:
-                my_total = db.query(func.sum(VitalData.value)).filter(
-                    VitalData.user_id == current_user.id,
-                    VitalData.name_id == objective.name_id,
-                    VitalData.date >= objective.start_date,
-                    VitalData.date <= objective.end_date
-                ).scalar()
-                my_value = my_total if my_total is not None else None
-            else:
-                my_latest = db.query(VitalData).filter(
-                    VitalData.user_id == current_user.id,
-                    VitalData.name_id == objective.name_id,
-                    VitalData.date >= objective.start_date,
-                    VitalData.date <= objective.end_date
-                ).order_by(VitalData.date.desc()).first()
-                my_value = my_latest.value if my_latest is not None else None
-
-            result.append(ObjectiveResponse(
-                objective_id=objective.id,
-                data_name=objective.vitaldataname.name,
-                start_date=objective.start_date,
-                end_date=objective.end_date,
-                objective_value=objective.value,
-                my_value=my_value,
-                friends=friends
-            ))
-        
-    return result
+async def get_objectives(
+    include_icon: bool = False,
+    current_user: User = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # 全目標・友達の設定・期間内の値を少数の集計クエリでまとめて取得する
+    progress = await db.run_sync(
+        lambda session: ObjectiveProgressService(session).progress(current_user, include_icon=include_icon)
+    )
+    return [ObjectiveResponse(**objective) for objective in progress]
 
 @router.put("/")
-async def create_objective(request: CreateObjectiveRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    data_name_obj = db.query(VitalDataName).filter(VitalDataName.name == request.data_name).first()
-    if not data_name_obj:
+async def create_objective(request: CreateObjectiveRequest, current_user: User = Depends(get_current_principal), db: AsyncSession = Depends(get_async_db)):
+    # 表記ゆれ・同義語で既存のカテゴリに当たる場合はそのカテゴリの目標にする
+    match = await db.run_sync(lambda session: vital_name_index.resolve(session, request.data_name, fuzzy=False))
+    name_id = match.vital_id if match is not None else None
+    if name_id is None:
         new_category_name = VitalDataName(
             name=request.data_name,
         )
         db.add(new_category_name)
-        db.commit()
-        db.refresh(new_category_name)
-        data_name_obj = new_category_name
+        await db.commit()
+        await db.refresh(new_category_name)
+        name_id = new_category_name.id
+        vital_names.add(name_id, new_category_name.name)
     
     objective = Objective(
-        start_date=request.start_date,
-        end_date=request.end_date,
-        name_id=data_name_obj.id,
+        user_id=current_user.id,
+        # DB には naive な日時で保存する
+        start_date=request.start_date.replace(tzinfo=None),
+        end_date=request.end_date.replace(tzinfo=None),
+        name_id=name_id,
         value=request.objective_value
     )
     
     db.add(objective)
-    db.commit()
-    db.refresh(objective)
-    user = db.query(User).filter(User.id == current_user.id).first()
-    if user.objective is None:
-        user.objective = []
-    user.objective.append(objective.id)
-    db.commit()
+    await db.commit()
+    await db.refresh(objective)
+    invalidate_user(current_user.id)
     
     return {"id": objective.id, "message": "Objective created"}
 
@@ -136,32 +66,37 @@ async def create_objective(request: CreateObjectiveRequest, current_user: User =
 async def update_objective(
     objective_id: int, 
     request: UpdateObjectiveRequest, 
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal), 
+    db: AsyncSession = Depends(get_async_db)
 ):
-    objective = db.query(Objective).filter(Objective.id == objective_id).first()
+    objective = await db.scalar(select(Objective).where(
+        Objective.id == objective_id,
+        Objective.user_id == current_user.id
+    ))
     if not objective:
         raise HTTPException(status_code=404, detail="Objective not found")
     
     objective.value = request.objective_value
-    db.commit()
+    await db.commit()
+    invalidate_user(current_user.id)
     
     return {"message": "Objective updated"}
 
 @router.delete("/{objective_id}/")
 async def delete_objective(
     objective_id: int, 
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal), 
+    db: AsyncSession = Depends(get_async_db)
 ):
-    objective = db.query(Objective).filter(Objective.id == objective_id).first()
+    objective = await db.scalar(select(Objective).where(
+        Objective.id == objective_id,
+        Objective.user_id == current_user.id
+    ))
     if not objective:
         raise HTTPException(status_code=404, detail="Objective not found")
     
-    db.delete(objective)
-    db.commit()
-    user = db.query(User).filter(User.id == current_user.id).first()
-    user.objective.remove(objective_id)
-    db.commit()
+    await db.delete(objective)
+    await db.commit()
+    invalidate_user(current_user.id)
     
     return {"message": "Objective deleted"}
\ No newline at end of file
@@ -1,25 +1,42 @@
-from fastapi import APIRouter,  Depends
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
 from app.schemas.user import (
     ProfileResponse, SettingsResponse, IdResponse, ProfileUpdateRequest
 )
-from app.utils.auth import get_current_user
+from app.utils.auth import current_user_with, get_current_user_id, get_async_read_db
+from app.utils.icons import encode_icon, icon_url, icon_media_type, make_thumbnail
+from app.utils.icon_store import IconStore
+from app.utils.user_cache import invalidate_user
 from models.users import User
-from sqlalchemy.orm import Session
-from settings import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional
+from settings import get_async_db
 import base64
 
 router = APIRouter(prefix="/user", tags=["User"])
 
+ICON_CACHE_CONTROL = "private, max-age=86400"
+
+async def read_icon(hash_value: Optional[str]) -> Optional[str]:
+    """アイコン本体を base64 で読む（include_icon=true のときだけ。ファイルの読み込みはスレッドプールで行う）"""
+    return encode_icon(await run_in_threadpool(IconStore().read, hash_value))
+
+def store_icon(icon: bytes):
+    """アイコン本体と一覧用サムネイルをファイルストアに置き、(本体のハッシュ, サムネイルのハッシュ) を返す"""
+    if not icon:
+        return None, None
+    store = IconStore()
+    thumbnail = make_thumbnail(icon)
+    return store.put(icon), store.put(thumbnail) if thumbnail else None
+
 @router.get("/profile/", response_model=ProfileResponse)
-async def get_profile(current_user: User = Depends(get_current_user)):
-    icon_str = ""
-    if current_user.icon:
-        if isinstance(current_user.icon, bytes):
-            icon_str = base64.b64encode(current_user.icon).decode('utf-8')
-        elif isinstance(current_user.icon, str):
-            icon_str = current_user.icon
+async def get_profile(include_icon: bool = False, current_user: User = Depends(current_user_with("profile"))):
+    # アイコンは icon_url で返し、include_icon=true のときだけ本体を埋め込む
     return ProfileResponse(
-        icon=icon_str,
+        icon=await read_icon(current_user.icon_hash) if include_icon else None,
+        icon_url=icon_url(current_user.id, current_user.icon_hash),
         username=current_user.username or "",
         date_of_birth=current_user.date_of_birth,
         height=current_user.height,
@@ -29,32 +46,61 @@ async def get_profile(current_user: User = Depends(get_current_user)):
 @router.put("/profile/")
 async def update_profile(
     profile: ProfileUpdateRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(current_user_with("profile", "icon")),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if profile.icon is not None:
-        current_user.icon = base64.b64decode(profile.icon)
+        icon = base64.b64decode(profile.icon)
+        # 本体と一覧用サムネイルはファイルストアに置き、users にはハッシュだけを持つ（縮小と書き込みはスレッドプールで行う）
+        current_user.icon_hash, current_user.icon_thumbnail_hash = await run_in_threadpool(store_icon, icon)
     if profile.username is not None:
         current_user.username = profile.username
     if profile.date_of_birth is not None:
-        current_user.date_of_birth = profile.date_of_birth
+        current_user.date_of_birth = profile.date_of_birth.replace(tzinfo=None)
     if profile.height is not None:
         current_user.height = profile.height
     if profile.sex is not None:
         current_user.sex = profile.sex
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    invalidate_user(current_user.id)
+    await db.refresh(current_user)
     return {"message": "OK"}
 
 @router.get("/settings/", response_model=SettingsResponse)
-async def get_settings(current_user: User = Depends(get_current_user)):
+async def get_settings(include_icon: bool = False, current_user: User = Depends(current_user_with("account"))):
     return SettingsResponse(
-        icon=current_user.icon,
+        icon=await read_icon(current_user.icon_hash) if include_icon else None,
+        icon_url=icon_url(current_user.id, current_user.icon_hash),
         address=current_user.email,
         username=current_user.username,
         height=current_user.height
     )
 
 @router.get("/id/", response_model=IdResponse)
-async def get_user_id(current_user: User = Depends(get_current_user)):
-    return IdResponse(id=current_user.id)
\ No newline at end of file
+async def get_user_id(current_user_id: int = Depends(get_current_user_id)):
+    return IdResponse(id=current_user_id)
+
+@router.get("/{user_id}/icon/")
+async def get_icon(
+    user_id: int,
+    size: str = "full",
+    if_none_match: Optional[str] = Header(None),
+    current_user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # アイコンをファイルストアから ETag 付きで返す（変更がなければ 304 でファイルを開かない）
+    row = (await db.execute(select(User.icon_hash, User.icon_thumbnail_hash).where(User.id == user_id))).first()
+    if not row or not row.icon_hash:
+        raise HTTPException(status_code=404, detail="Icon not found")
+
+    # 画像として読めずサムネイルを作れなかった場合は元のアイコンを返す
+    hash_value = row.icon_thumbnail_hash if size == "thumb" and row.icon_thumbnail_hash else row.icon_hash
+    etag = f'"{hash_value}"'
+    headers = {"ETag": etag, "Cache-Control": ICON_CACHE_CONTROL}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    store = IconStore()
+    if not store.exists(hash_value):
+        raise HTTPException(status_code=404, detail="Icon not found")
+    return FileResponse(store.path(hash_value), media_type=icon_media_type(store.head(hash_value)), headers=headers)
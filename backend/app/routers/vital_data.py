@@ -1,103 +1,223 @@
-from fastapi import APIRouter, HTTPException, Depends
-from collections import defaultdict
-from sqlalchemy.orm import Session, aliased
-from sqlalchemy import func, and_, case
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Header, UploadFile, File
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List, Optional
-from app.schemas.vital_data import CreateCategoryRequest, RegisterRequest, VitalDataCategoryResponse, VitalDataResponse, StatisticsResponse, LifeLogGroupedResponse, VitalPoint
-from app.utils.auth import get_current_user
-from settings import get_db
+from app.schemas.vital_data import CreateCategoryRequest, RegisterRequest, VitalDataCategoryResponse, VitalDataResponse, StatisticsResponse, HistogramResponse, LifeLogGroupedResponse, VitalSeriesResponse, BulkRegisterResponse, ImportReportResponse
+from app.utils.auth import get_current_principal, get_current_user_id, get_async_read_db
+from app.services.statistics_service import StatisticsService
+from app.services.life_log_service import LifeLogService
+from app.services.vital_rollup import VitalRollupService, RESOLUTIONS
+from app.services.friend_service import FriendService
+from app.services.vital_ingest import VitalIngestService
+from app.services.idempotency import IdempotencyService, IdempotencyConflict
+from app.services.vital_importer import VitalImporter, FORMATS, DEFAULT_CHUNK_SIZE, detect_format
+from app.services.vital_partitions import VitalPartitionService, ArchivedMonthError
+from app.utils.vital_names import vital_names
+from app.utils.vital_name_index import vital_name_index
+from settings import get_db, get_async_db
 from models.users import User
-from models.vitaldata import VitalData
+from models.vitaldata import DEFAULT_SOURCE
 from models.vitaldataname import VitalDataName
 from models.uservitalcategory import UserVitalCategory
-from datetime import datetime, date
+from datetime import datetime
+import io
+import json
 
 router = APIRouter(prefix="/vitaldata", tags=["Vital Data"])
 
 @router.get("/category/", response_model=List[VitalDataCategoryResponse])
-async def get_my_category(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # 获取所有可用的健康数据类型
-    all_vital_types = db.query(VitalDataName).all()
+async def get_my_category(current_user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_async_read_db)):
+    # 获取所有可用的健康数据类型（プロセス内のカテゴリ辞書から返す）
+    all_vital_types = await db.run_sync(vital_names.items)
     
     result = []
-    for vital_type in all_vital_types:
+    for vital_id, name in all_vital_types:
         result.append(VitalDataCategoryResponse(
-            id = vital_type.id,
-            name = vital_type.name
+            id = vital_id,
+            name = name
         ))
     
     return result
 
+async def replayed_response(db: AsyncSession, user_id: int, idempotency_key: Optional[str], payload):
+    """同じ Idempotency-Key で処理済みなら保存した応答を返す"""
+    if not idempotency_key:
+        return None
+    try:
+        return await db.run_sync(lambda session: IdempotencyService(session).lookup(user_id, idempotency_key, payload))
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+
 @router.post("/register/")
-async def add_vital_data(request: RegisterRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # 检查用户是否已经有这个类型的设置
-    existing_category = db.query(UserVitalCategory).filter(
-        UserVitalCategory.vital_id == request.name_id,
-        UserVitalCategory.user_id == current_user.id
-    ).first()
-    
-    # 如果用户还没有这个类型的设置，创建一个默认设置
-    if not existing_category:
-        new_category = UserVitalCategory(
-            user_id=current_user.id,
-            vital_id=request.name_id,
-            is_public=True,  # 默认公开
-            is_accumulating=False  # 默认不累积
-        )
-        db.add(new_category)
-    
-    # 创建健康数据记录
-    vital_data = VitalData(
-        name_id=request.name_id,
-        user_id=current_user.id,
-        date=request.date,
-        value=request.value
-    )
-    db.add(vital_data)
-    db.commit()
-    db.refresh(vital_data)
+async def add_vital_data(
+    request: RegisterRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+):
+    payload = request.model_dump(mode="json")
+    replayed = await replayed_response(db, current_user.id, idempotency_key, payload)
+    if replayed is not None:
+        return replayed
+
+    def register(session: Session):
+        # 未登録のカテゴリは既定の設定（公開・非累積）で登録し、同じ自然キーの行が既にあれば挿入しない
+        inserted_ids = VitalIngestService(session).insert_rows([{
+            "user_id": current_user.id,
+            "name_id": request.name_id,
+            "date": request.date.replace(tzinfo=None),
+            "value": request.value,
+            "source": request.source or DEFAULT_SOURCE,
+        }])
+        response = {"message": "Vital data added successfully", "created": inserted_ids[0] is not None}
+        if idempotency_key:
+            response = IdempotencyService(session).save(current_user.id, idempotency_key, payload, response)
+        return response
+
+    try:
+        response = await db.run_sync(register)
+    except ArchivedMonthError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    await db.commit()
+
+    return response
+
+# 一括登録で1リクエストに含められる最大件数
+BULK_MAX_ITEMS = 10000
+
+async def read_bulk_items(request: Request) -> list:
+    """JSON 配列または NDJSON（1行1件）のリクエスト本文を読み込む"""
+    content_type = request.headers.get("content-type", "")
+    items = []
+    if "ndjson" in content_type or "jsonl" in content_type:
+        buffer = b""
+        line_number = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line_number += 1
+                if line.strip():
+                    try:
+                        items.append(json.loads(line))
+                    except ValueError:
+                        raise HTTPException(status_code=400, detail=f"Invalid JSON on line {line_number}")
+                if len(items) > BULK_MAX_ITEMS:
+                    raise HTTPException(status_code=413, detail=f"Too many items (max {BULK_MAX_ITEMS})")
+        if buffer.strip():
+            try:
+                items.append(json.loads(buffer))
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON on line {line_number + 1}")
+    else:
+        try:
+            items = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Too many items (max {BULK_MAX_ITEMS})")
+    return items
+
+@router.post("/register/bulk/", response_model=BulkRegisterResponse)
+async def add_vital_data_bulk(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # 複数カテゴリの計測値を1パスで検証し、1トランザクションでまとめて挿入する
+    items = await read_bulk_items(request)
+    replayed = await replayed_response(db, current_user.id, idempotency_key, items)
+    if replayed is not None:
+        return replayed
 
-    return {"message": "Vital data added successfully"}
+    def ingest(session: Session):
+        result = VitalIngestService(session).ingest(current_user.id, items)
+        if idempotency_key:
+            result = IdempotencyService(session).save(current_user.id, idempotency_key, items, result)
+        return result
+
+    try:
+        result = await db.run_sync(ingest)
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    await db.commit()
+    return result
+
+@router.post("/import/", response_model=ImportReportResponse)
+def import_vital_data(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv / ndjson（省略時は拡張子から判定）"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=BULK_MAX_ITEMS),
+    current_user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    # ファイルを1行ずつ読み、chunk_size 件ごとに登録する（大きなファイルでもメモリを一定に保つ）
+    # ファイルの読み込みも同期処理なので、def にして同期セッションごとスレッドプールで実行する
+    format = format or detect_format(file.filename)
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format (use one of {', '.join(FORMATS)})")
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    # 認証とは別のセッションなので、書き込んだユーザーをここで設定する（読み取りを primary に送るため）
+    db.info["user_id"] = current_user_id
+    try:
+        return VitalImporter(db, chunk_size=chunk_size, user_id=current_user_id).run(lines, format)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
 
 @router.put("/create/")
 async def create_new_category(
     request: CreateCategoryRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    existing_category = db.query(VitalDataName).filter(VitalDataName.name == request.vitaldataname).first()
-    if not existing_category: #もし全体のカテゴリーに存在しない場合新しいカテゴリーを作成
-        new_category_name = VitalDataName(
-            name=request.vitaldataname,
-        )
-        db.add(new_category_name)
-        db.commit()
-        db.refresh(new_category_name)
-        category_id = new_category_name.id
-    else:
-        category_id = existing_category.id
+    # 表記ゆれ・同義語で既存のカテゴリに当たる場合は作成せず、そのカテゴリを返す（似ているだけの名前は別のカテゴリとして作成する）
+    match = await db.run_sync(lambda session: vital_name_index.resolve(session, request.vitaldataname, fuzzy=False))
+    if match is not None:
+        return {"message": "Category already exists", "created": False, "id": match.vital_id, "name": match.name}
+
+    #もし全体のカテゴリーに存在しない場合新しいカテゴリーを作成
+    new_category_name = VitalDataName(
+        name=request.vitaldataname,
+    )
+    db.add(new_category_name)
+    await db.commit()
+    await db.refresh(new_category_name)
+    vital_names.add(new_category_name.id, new_category_name.name)
     
     # 注意：这里不再自动创建 UserVitalCategory 记录
     # 用户需要手动点击数据类型来注册到自己的账户
     
-    return {"message": "New category created successfully"}
+    return {
+        "message": "New category created successfully",
+        "created": True,
+        "id": new_category_name.id,
+        "name": new_category_name.name,
+    }
 
 @router.post("/register-category/")
 async def register_category_to_user(
     request: CreateCategoryRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # 查找数据类型
-    existing_category = db.query(VitalDataName).filter(VitalDataName.name == request.vitaldataname).first()
-    if not existing_category:
-        raise HTTPException(status_code=404, detail="Vital data type not found")
+    # 查找数据类型（書き込みなので表記ゆれ・同義語まで。似ているだけの名前は登録せず候補を返す）
+    match = await db.run_sync(lambda session: vital_name_index.resolve(session, request.vitaldataname, fuzzy=False))
+    if match is None:
+        suggestions = await db.run_sync(vital_name_index.suggestions, request.vitaldataname)
+        raise HTTPException(status_code=404, detail={"message": "Vital data type not found", "suggestions": suggestions})
+    vital_id = match.vital_id
     
     # 检查用户是否已经注册了这个类型
-    existing_category_in_user = db.query(UserVitalCategory).filter(
-        UserVitalCategory.vital_id == existing_category.id,
+    existing_category_in_user = await db.scalar(select(UserVitalCategory).where(
+        UserVitalCategory.vital_id == vital_id,
         UserVitalCategory.user_id == current_user.id
-    ).first()
+    ))
     
     if existing_category_in_user:
         return {"message": "Category already registered"}
@@ -105,13 +225,13 @@ async def register_category_to_user(
     # 为用户注册这个数据类型
     new_category = UserVitalCategory(
         user_id=current_user.id,
-        vital_id=existing_category.id,
+        vital_id=vital_id,
         is_public=request.is_public,
         is_accumulating=request.is_accumulating
     )
     db.add(new_category)
-    db.commit()
-    db.refresh(new_category)
+    await db.commit()
+    await db.refresh(new_category)
     
     return {"message": "Category registered successfully"}
 
@@ -121,102 +241,67 @@ async def get_statistics(
         start_age: int,
         end_age: int,
         sex: Optional[bool] = None,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        current_user_id: int = Depends(get_current_user_id),
+        db: AsyncSession = Depends(get_async_read_db)
     ):
-    vital_name_obj = db.query(VitalDataName).filter(VitalDataName.name == vital_name).first()
-    if not vital_name_obj:
+    match = await db.run_sync(vital_name_index.resolve, vital_name)
+    if match is None:
         raise HTTPException(status_code=404, detail="Vital data type not found")
+    vital_id = match.vital_id
 
-    current_date = date.today()
-    max_birth_date = datetime(current_date.year - start_age, current_date.month, current_date.day)
-    min_birth_date = datetime(current_date.year - end_age, current_date.month, current_date.day)
-
-    # 基本クエリ: 条件に合うユーザーとカテゴリ設定を取得
-    user_categories = (
-        db.query(
-            User.id.label("user_id"),
-            UserVitalCategory.is_accumulating.label("is_accumulating")
-        )
-        .join(UserVitalCategory, User.id == UserVitalCategory.user_id)
-        .filter(
-            UserVitalCategory.vital_id == vital_name_obj.id,
-            UserVitalCategory.is_public == True,
-            User.date_of_birth >= min_birth_date,
-            User.date_of_birth < max_birth_date
-        )
+    # 条件に合うユーザーの代表値（非累積: 最新の値 / 累積: 最新日の合計）の平均を1回の集計クエリで求める
+    average = await db.run_sync(
+        lambda session: StatisticsService(session).average(vital_id, start_age, end_age, sex)
     )
-  
-    if sex is not None:
-        user_categories = user_categories.filter(User.sex == sex)
-    
-    user_categories = user_categories.all()
-    print("User categories query:", user_categories)  # デバッグ用ログ出力
-    if not user_categories:
-        return StatisticsResponse(average=None)
-    
-    # 各ユーザーの計算値を取得
-    calculated_values = []
-    
-    for user_id, is_accumulating in user_categories:
-        if is_accumulating:
-            # 累積の場合：最新日付の全ての値の合計
-            latest_date = (
-                db.query(func.max(VitalData.date))
-                .filter(
-                    VitalData.user_id == user_id,
-                    VitalData.name_id == vital_name_obj.id
-                )
-                .scalar()
-            )
-            
-            if latest_date:
-                total_value = (
-                    db.query(func.sum(VitalData.value))
-                    .filter(
-                        VitalData.user_id == user_id,
-                        VitalData.name_id == vital_name_obj.id,
-                        func.date(VitalData.date) == func.date(latest_date)
-                    )
-                    .scalar()
-                )
-                if total_value is not None:
-                    calculated_values.append(total_value)
-        else:
-            # 非累積の場合：最新の値
-            latest_value = (
-                db.query(VitalData.value)
-                .filter(
-                    VitalData.user_id == user_id,
-                    VitalData.name_id == vital_name_obj.id
-                )
-                .order_by(VitalData.date.desc())
-                .first()
-            )
-            if latest_value:
-                calculated_values.append(latest_value[0])
-    
-    # 平均値を計算
-    if calculated_values:
-        average = sum(calculated_values) / len(calculated_values)
-    else:
-        average = None
-    
+
     return StatisticsResponse(
+        vital_name=match.name,
         average=average
     )
 
+@router.get("/statistics/histogram/", response_model=HistogramResponse)
+async def get_statistics_histogram(
+        vital_name: str,
+        start_age: int,
+        end_age: int,
+        bucket_width: int = Query(2, ge=1),
+        split_by_sex: bool = False,
+        current_user_id: int = Depends(get_current_user_id),
+        db: AsyncSession = Depends(get_async_read_db)
+    ):
+    # 年代・性別ごとの平均値を1リクエスト・1集計クエリでまとめて返す
+    if end_age <= start_age:
+        raise HTTPException(status_code=400, detail="end_age must be greater than start_age")
+
+    match = await db.run_sync(vital_name_index.resolve, vital_name)
+    if match is None:
+        raise HTTPException(status_code=404, detail="Vital data type not found")
+    vital_id = match.vital_id
+
+    buckets = await db.run_sync(lambda session: StatisticsService(session).histogram(
+        vital_id, start_age, end_age, bucket_width, split_by_sex
+    ))
+
+    return HistogramResponse(
+        vital_name=match.name,
+        bucket_width=bucket_width,
+        buckets=buckets
+    )
+
 @router.get("/me/", response_model=List[VitalDataResponse])
-async def get_my_vital_data(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    vital_data = db.query(VitalData).join(VitalDataName).filter(
-        VitalData.name_id == VitalDataName.id,
-        VitalData.user_id == current_user.id
-    ).order_by(VitalData.date.desc()).limit(10).all()
+async def get_my_vital_data(current_user: User = Depends(get_current_principal), db: AsyncSession = Depends(get_async_read_db)):
+    # 最新の記録がアーカイブした月にしかないユーザーもいるため、アーカイブテーブルも含めて読む
+    vitaldata = await db.run_sync(lambda session: VitalPartitionService(session).source())
+    vital_data = await db.execute(select(VitalDataName.name, vitaldata.value, vitaldata.date).join(
+        VitalDataName, vitaldata.name_id == VitalDataName.id
+    ).where(
+        vitaldata.user_id == current_user.id
+    ).order_by(vitaldata.date.desc(), vitaldata.id.desc()).limit(10))
     
     result = []
     for data in vital_data:
         result.append(VitalDataResponse(
-            name=data.vitaldataname.name,
+            name=data.name,
             value=data.value,
             date=data.date
         ))
@@ -224,42 +309,66 @@ async def get_my_vital_data(current_user: User = Depends(get_current_user), db:
     return result
 
 @router.get("/life-logs/", response_model=List[LifeLogGroupedResponse])
-async def get_life_logs(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # 获取用户注册的所有数据类型
-    user_categories = db.query(VitalDataName).join(UserVitalCategory).filter(
-        VitalDataName.id == UserVitalCategory.vital_id, 
-        UserVitalCategory.user_id == current_user.id
-    ).all()
-    
-    result = []
-    
-    for category in user_categories:
-        # 获取该类型的数据记录
-        vital_data = db.query(VitalData).filter(
-            VitalData.user_id == current_user.id,
-            VitalData.name_id == category.id
-        ).order_by(VitalData.date).all()
-        
-        # 转换为图表数据格式
-        vitaldata_list = [
-            {"x": data.date, "y": data.value}
-            for data in vital_data
-        ]
-        
-        result.append({
-            "data_name": category.name,
-            "vitaldata_list": vitaldata_list
-        })
-    
-    return result
+async def get_life_logs(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    data_name: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    cursor: Optional[str] = None,
+    max_points: Optional[int] = Query(None, ge=2, le=5000),
+    current_user: User = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # 期間・ページング・間引きを指定して、登録済みの全カテゴリを1回のクエリで取得する
+    try:
+        return await db.run_sync(lambda session: LifeLogService(session).series(
+            current_user.id, start=start, end=end, data_name=data_name,
+            limit=limit, cursor=cursor, max_points=max_points
+        ))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/series/", response_model=VitalSeriesResponse)
+async def get_vital_series(
+    data_name: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: int = Query(500, ge=1, le=5000),
+    resolution: Optional[str] = None,
+    user_id: Optional[int] = None,
+    current_user: User = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # 点数の上限に収まる最も細かい粒度（生データ / 時間 / 日 / 週 / 月）の集計を返す
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(RESOLUTIONS)}")
+
+    target_id = user_id if user_id is not None else current_user.id
+    match = await db.run_sync(vital_name_index.resolve, data_name)
+    category = None if match is None else await db.scalar(select(UserVitalCategory).where(
+        UserVitalCategory.user_id == target_id,
+        UserVitalCategory.vital_id == match.vital_id
+    ))
+    # 他のユーザーの系列は友達が公開しているカテゴリだけ
+    if category is None or (target_id != current_user.id and (
+        not category.is_public
+        or not await db.run_sync(lambda session: FriendService(session).is_friend(current_user.id, target_id))
+    )):
+        raise HTTPException(status_code=404, detail="Vital data type not found")
+
+    used, points = await db.run_sync(lambda session: VitalRollupService(session).series(
+        target_id, category.vital_id, category.is_accumulating, max_points,
+        start=start, end=end, resolution=resolution
+    ))
+    return VitalSeriesResponse(data_name=match.name, resolution=used, vitaldata_list=points)
 
 @router.get("/my-categories/", response_model=List[VitalDataCategoryResponse])
-async def get_my_registered_categories(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_my_registered_categories(current_user: User = Depends(get_current_principal), db: AsyncSession = Depends(get_async_read_db)):
     # 获取用户已注册的健康数据类型
-    user_categories = db.query(VitalDataName).join(UserVitalCategory).filter(
+    user_categories = (await db.scalars(select(VitalDataName).join(UserVitalCategory).where(
         VitalDataName.id == UserVitalCategory.vital_id, 
         UserVitalCategory.user_id == current_user.id
-    ).all()
+    ))).all()
 
     result = []
     for category in user_categories:
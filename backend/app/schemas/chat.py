@@ -5,6 +5,7 @@ from datetime import datetime
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
+    client_message_id: Optional[str] = None  # 再送時に同じ値を送ると関数による登録が重複しない
 
 class ChatResponse(BaseModel):
     message: str
@@ -4,6 +4,7 @@ from datetime import datetime
 
 class FriendData(BaseModel):
     friend_icon: Optional[str] = None
+    friend_icon_url: Optional[str] = None
     friend_info: float
     friend_sex: Optional[bool] = None
 
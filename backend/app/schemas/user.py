@@ -4,6 +4,7 @@ from datetime import datetime
 
 class ProfileResponse(BaseModel):
     icon: Optional[str] = None
+    icon_url: Optional[str] = None
     username: str
     date_of_birth: Optional[datetime] = None
     height: Optional[float] = None
@@ -18,6 +19,7 @@ class ProfileUpdateRequest(BaseModel):
 
 class SettingsResponse(BaseModel):
     icon: Optional[str] = None
+    icon_url: Optional[str] = None
     address: str
     username: str
     height: Optional[float] = None
@@ -29,16 +31,25 @@ class FriendListResponse(BaseModel):
     user_id: int
     username: str
     icon: Optional[str] = None
+    icon_url: Optional[str] = None
     age: Optional[int] = -1
     sex: Optional[bool] = None
 
 class FriendDetailResponse(BaseModel):
     user_id: int
     icon: Optional[str] = None
+    icon_url: Optional[str] = None
     username: str
     age: int
     sex: Optional[bool] = None
     life_logs: Optional[List[Dict[str, Any]]] = None
 
+class FriendSuggestionResponse(BaseModel):
+    user_id: int
+    username: str
+    icon: Optional[str] = None
+    icon_url: Optional[str] = None
+    mutual_friends: int
+
 class AddFriendRequest(BaseModel):
     friend_id: int
\ No newline at end of file
@@ -10,6 +10,7 @@ class RegisterRequest(BaseModel):
     name_id: int
     date: datetime
     value: float
+    source: Optional[str] = None  # 登録元（省略時は app）
 
 class CreateCategoryRequest(BaseModel):
     vitaldataname: str
@@ -17,8 +18,21 @@ class CreateCategoryRequest(BaseModel):
     is_accumulating: bool
 
 class StatisticsResponse(BaseModel):
+    vital_name: Optional[str] = None  # 解決したカテゴリ名（指定した名前と違えば表記ゆれ・似た名前から解決した）
     average: Optional[float] = None
 
+class HistogramBucket(BaseModel):
+    start_age: int
+    end_age: int
+    sex: Optional[bool] = None
+    average: Optional[float] = None
+    count: int
+
+class HistogramResponse(BaseModel):
+    vital_name: str
+    bucket_width: int
+    buckets: List[HistogramBucket]
+
 class VitalDataResponse(BaseModel):
     name: str
     value: float
@@ -30,4 +44,42 @@ class VitalPoint(BaseModel):
 
 class LifeLogGroupedResponse(BaseModel):
     data_name: str
-    vitaldata_list: List[VitalPoint]
\ No newline at end of file
+    vitaldata_list: List[VitalPoint]
+    next_cursor: Optional[str] = None
+    downsampled: bool = False
+
+class VitalSeriesPoint(BaseModel):
+    x: datetime
+    y: float
+    min: float
+    max: float
+    count: int
+
+class VitalSeriesResponse(BaseModel):
+    data_name: str
+    resolution: str
+    vitaldata_list: List[VitalSeriesPoint]
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str  # ok / duplicate / error
+    error: Optional[str] = None
+
+class BulkRegisterResponse(BaseModel):
+    inserted: int
+    duplicates: int
+    failed: int
+    results: List[BulkItemResult]
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReportResponse(BaseModel):
+    rows: int
+    inserted: int
+    duplicates: int
+    failed: int
+    errors: List[ImportRowError]  # 先頭の一部のみ
+    seconds: float
+    rows_per_second: float
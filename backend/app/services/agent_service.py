@@ -7,17 +7,19 @@ import json
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional, List
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
 from openai import AsyncOpenAI
 
 from models.users import User
 from models.chat_conversation import ChatConversation, ChatMessage
 from app.services.internal_api import InternalAPIService
+from app.services.idempotency import request_hash
 from app.services.function_schemas import ALL_FUNCTION_SCHEMAS
 
 
 class AgentService:
-    def __init__(self, db: Session, user: User, openai_api_key: str):
+    def __init__(self, db: AsyncSession, user: User, openai_api_key: str):
         self.db = db
         self.user = user
         self.openai_client = AsyncOpenAI(api_key=openai_api_key)
@@ -32,13 +34,21 @@ class AgentService:
             "register_vital_data": self.internal_api.register_vital_data,
             "get_vital_data": self.internal_api.get_vital_data,
         }
+        # 同じ発話からの重複呼び出しで二重登録しないよう idempotency_key を渡す関数
+        self.idempotent_functions = {"register_vital_data"}
 
     async def process_message(
         self, 
         message: str, 
-        conversation_id: Optional[str] = None
+        conversation_id: Optional[str] = None,
+        client_message_id: Optional[str] = None
     ) -> Dict[str, Any]:
-        """メッセージを処理し、OpenAI APIとfunction callingを使用して応答を生成"""
+        """
+        メッセージを処理し、OpenAI APIとfunction callingを使用して応答を生成
+
+        client_message_id はクライアントが発話ごとに付ける ID（再送しても同じ値）で、
+        同じ発話・同じ引数での登録を1回にまとめるのに使う
+        """
         try:
             # 会話セッションの取得または作成
             conversation = await self._get_or_create_conversation(conversation_id)
@@ -52,7 +62,7 @@ class AgentService:
                 timestamp=datetime.utcnow()
             )
             self.db.add(user_message)
-            self.db.commit()
+            await self.db.commit()
             
             # 会話履歴を取得
             conversation_history = await self._get_conversation_history(conversation.id)
@@ -77,7 +87,11 @@ class AgentService:
                 
                 # 関数を実行
                 if function_name in self.available_functions:
-                    function_result = await self.available_functions[function_name](**function_args)
+                    call_args = dict(function_args)
+                    if function_name in self.idempotent_functions:
+                        message_key = client_message_id or user_message.id
+                        call_args["idempotency_key"] = f"chat:{message_key}:{request_hash([function_name, function_args])[:16]}"
+                    function_result = await self.available_functions[function_name](**call_args)
                     function_call_info = {
                         "name": function_name,
                         "arguments": function_args
@@ -127,7 +141,7 @@ class AgentService:
             if not conversation.title:
                 conversation.title = await self._generate_conversation_title(message)
             
-            self.db.commit()
+            await self.db.commit()
             
             return {
                 "message": reply_content,
@@ -137,7 +151,7 @@ class AgentService:
             }
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             return {
                 "message": f"申し訳ございません。エラーが発生しました: {str(e)}",
                 "conversation_id": conversation_id or "error",
@@ -151,10 +165,10 @@ class AgentService:
     ) -> ChatConversation:
         """会話セッションを取得または作成"""
         if conversation_id:
-            conversation = self.db.query(ChatConversation).filter(
+            conversation = await self.db.scalar(select(ChatConversation).where(
                 ChatConversation.id == conversation_id,
                 ChatConversation.user_id == self.user.id
-            ).first()
+            ))
             if conversation:
                 return conversation
         
@@ -166,31 +180,31 @@ class AgentService:
             updated_at=datetime.utcnow()
         )
         self.db.add(conversation)
-        self.db.commit()
+        await self.db.commit()
         return conversation
 
     async def _get_conversation_history(self, conversation_id: str) -> List[Dict[str, Any]]:
         """会話履歴をOpenAI API形式で取得"""
-        messages = self.db.query(ChatMessage).filter(
+        messages = (await self.db.scalars(select(ChatMessage).where(
             ChatMessage.conversation_id == conversation_id
-        ).order_by(ChatMessage.timestamp.asc()).all()
+        ).order_by(ChatMessage.timestamp.asc()))).all()
         
         # ユーザーの現在の目標情報を取得
         user_objectives_info = ""
-        if self.user.objective:
-            from models.objective import Objective
-            from models.vitaldataname import VitalDataName
-            
-            objectives_detail = []
-            for obj_id in self.user.objective:
-                obj = self.db.query(Objective).filter(Objective.id == obj_id).first()
-                if obj:
-                    data_name = self.db.query(VitalDataName).filter(VitalDataName.id == obj.name_id).first()
-                    if data_name:
-                        objectives_detail.append(f"ID {obj_id}: {data_name.name} = {obj.value}")
-            
-            if objectives_detail:
-                user_objectives_info = f"\n\n現在のユーザーの目標:\n" + "\n".join(objectives_detail)
+        from models.objective import Objective
+        from models.vitaldataname import VitalDataName
+        
+        objectives_detail = [
+            f"ID {obj_id}: {data_name} = {value}"
+            for obj_id, data_name, value in await self.db.execute(select(Objective.id, VitalDataName.name, Objective.value).join(
+                VitalDataName, VitalDataName.id == Objective.name_id
+            ).where(
+                Objective.user_id == self.user.id
+            ).order_by(Objective.id))
+        ]
+        
+        if objectives_detail:
+            user_objectives_info = f"\n\n現在のユーザーの目標:\n" + "\n".join(objectives_detail)
         
         # システムメッセージを最初に追加
         history = [{
@@ -252,21 +266,21 @@ class AgentService:
 
     async def get_conversations(self) -> List[Dict[str, Any]]:
         """ユーザーの会話一覧を取得"""
-        conversations = self.db.query(ChatConversation).filter(
+        conversations = (await self.db.scalars(select(ChatConversation).where(
             ChatConversation.user_id == self.user.id
-        ).order_by(ChatConversation.updated_at.desc()).all()
+        ).order_by(ChatConversation.updated_at.desc()))).all()
         
         result = []
         for conversation in conversations:
             # 最新メッセージを取得
-            last_message = self.db.query(ChatMessage).filter(
+            last_message = await self.db.scalar(select(ChatMessage).where(
                 ChatMessage.conversation_id == conversation.id
-            ).order_by(ChatMessage.timestamp.desc()).first()
+            ).order_by(ChatMessage.timestamp.desc()).limit(1))
             
             # メッセージ数を取得
-            message_count = self.db.query(ChatMessage).filter(
+            message_count = await self.db.scalar(select(func.count()).select_from(ChatMessage).where(
                 ChatMessage.conversation_id == conversation.id
-            ).count()
+            ))
             
             result.append({
                 "conversation_id": conversation.id,
@@ -281,17 +295,17 @@ class AgentService:
 
     async def get_conversation_history(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         """特定の会話の履歴を取得"""
-        conversation = self.db.query(ChatConversation).filter(
+        conversation = await self.db.scalar(select(ChatConversation).where(
             ChatConversation.id == conversation_id,
             ChatConversation.user_id == self.user.id
-        ).first()
+        ))
         
         if not conversation:
             return None
         
-        messages = self.db.query(ChatMessage).filter(
+        messages = (await self.db.scalars(select(ChatMessage).where(
             ChatMessage.conversation_id == conversation_id
-        ).order_by(ChatMessage.timestamp.asc()).all()
+        ).order_by(ChatMessage.timestamp.asc()))).all()
         
         message_list = []
         for message in messages:
@@ -314,15 +328,15 @@ class AgentService:
 
     async def delete_conversation(self, conversation_id: str) -> bool:
         """会話を削除"""
-        conversation = self.db.query(ChatConversation).filter(
+        conversation = await self.db.scalar(select(ChatConversation).where(
             ChatConversation.id == conversation_id,
             ChatConversation.user_id == self.user.id
-        ).first()
+        ))
         
         if not conversation:
             return False
         
         # メッセージも一緒に削除（cascadeで自動削除される）
-        self.db.delete(conversation)
-        self.db.commit()
+        await self.db.delete(conversation)
+        await self.db.commit()
         return True
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+友達関係サービス
+friendships テーブル（ユーザー → 友達 の有向辺）に対する参照・追加をまとめる
+"""
+
+from typing import List, Tuple
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, and_
+
+from models.users import User
+from models.friendship import Friendship
+
+
+class FriendService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def friend_ids(self, user_id: int) -> List[int]:
+        """友達のユーザーIDを昇順で返す"""
+        rows = self.db.query(Friendship.friend_id).filter(
+            Friendship.user_id == user_id
+        ).order_by(Friendship.friend_id).all()
+        return [friend_id for friend_id, in rows]
+
+    def friends(self, user_id: int) -> List[User]:
+        """友達のユーザーを1回の JOIN でまとめて取得する"""
+        return self.db.query(User).join(
+            Friendship, Friendship.friend_id == User.id
+        ).filter(
+            Friendship.user_id == user_id
+        ).order_by(User.id).all()
+
+    def is_friend(self, user_id: int, friend_id: int) -> bool:
+        return self.db.get(Friendship, (user_id, friend_id)) is not None
+
+    def add_friend(self, user_id: int, friend_id: int) -> bool:
+        """
+        双方向の友達関係を追加する（commit は呼び出し側で行う）
+        自分自身は友達にしない（autoflush しないセッションでは同じ辺を2回追加してしまうため）
+
+        Returns:
+            bool: 新しく関係を追加した場合は True
+        """
+        if user_id == friend_id:
+            return False
+        added = False
+        for source, target in ((user_id, friend_id), (friend_id, user_id)):
+            if not self.is_friend(source, target):
+                self.db.add(Friendship(user_id=source, friend_id=target))
+                added = True
+        return added
+
+    def friends_of_friends(self, user_id: int, limit: int = 20) -> List[Tuple[User, int]]:
+        """
+        友達の友達（自分と既存の友達を除く）を共通の友達の多い順に返す
+
+        Returns:
+            List[Tuple[User, int]]: (ユーザー, 共通の友達の数)
+        """
+        mine = aliased(Friendship)
+        theirs = aliased(Friendship)
+        already = aliased(Friendship)
+
+        mutual_count = func.count(mine.friend_id).label("mutual_friends")
+        candidates = (
+            self.db.query(theirs.friend_id.label("user_id"), mutual_count)
+            .select_from(mine)
+            .join(theirs, theirs.user_id == mine.friend_id)
+            .outerjoin(
+                already,
+                and_(already.user_id == user_id, already.friend_id == theirs.friend_id)
+            )
+            .filter(
+                mine.user_id == user_id,
+                theirs.friend_id != user_id,
+                already.friend_id.is_(None),
+            )
+            .group_by(theirs.friend_id)
+            .subquery()
+        )
+
+        return (
+            self.db.query(User, candidates.c.mutual_friends)
+            .join(candidates, candidates.c.user_id == User.id)
+            .order_by(candidates.c.mutual_friends.desc(), User.id)
+            .limit(limit)
+            .all()
+        )
@@ -13,7 +13,7 @@ CREATE_OBJECTIVE_SCHEMA = {
             "properties": {
                 "data_name": {
                     "type": "string",
-                    "description": "目標の種類（体重、血圧、歩数など）"
+                    "description": "目標の種類（体重、血圧、歩数など。表記ゆれや英語名（steps など）も既存の種類に解決される。似ているだけの名前は解決されず、候補（suggestions）が返る）"
                 },
                 "start_date": {
                     "type": "string",
@@ -100,7 +100,7 @@ REGISTER_VITAL_DATA_SCHEMA = {
             "properties": {
                 "data_name": {
                     "type": "string",
-                    "description": "データの種類（体重、血圧、歩数など）"
+                    "description": "データの種類（体重、血圧、歩数など。表記ゆれや英語名（steps など）も既存の種類に解決される。似ているだけの名前は解決されず、候補（suggestions）が返る）"
                 },
                 "value": {
                     "type": "number",
@@ -0,0 +1,76 @@
+"""
+Idempotency-Key による再送の重複防止
+同じキーの再送は処理をやり直さず、最初のリクエストの応答をそのまま返す
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from sqlalchemy.orm import Session
+
+from models.idempotencykey import IdempotencyKey
+from app.utils.upsert import dialect_insert
+
+# キーを覚えておく期間（これより古いキーは未使用として扱う）
+IDEMPOTENCY_TTL = timedelta(hours=int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+
+
+class IdempotencyConflict(Exception):
+    """同じキーが別の内容のリクエストに使われた"""
+
+
+def request_hash(payload: Any) -> str:
+    """リクエスト内容のハッシュ（キーの使い回しを検出する）"""
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class IdempotencyService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def lookup(self, user_id: int, key: str, payload: Any) -> Optional[Any]:
+        """
+        保存済みの応答を返す（初回のリクエストなら None）
+
+        Raises:
+            IdempotencyConflict: 同じキーで別の内容が送られた場合
+        """
+        record = self.db.get(IdempotencyKey, (user_id, key))
+        if record is None or record.created_at < datetime.utcnow() - IDEMPOTENCY_TTL:
+            return None
+        if record.request_hash != request_hash(payload):
+            raise IdempotencyConflict(key)
+        return record.response
+
+    def save(self, user_id: int, key: str, payload: Any, response: Any) -> Any:
+        """
+        応答を保存し、このキーの応答として返すものを返す（書き込みと同じトランザクションで呼び、commit は呼び出し側で行う）
+
+        同じキーの再送が並行して処理され、先に別のリクエストが保存していた場合は、保存済みの応答を返す
+        （後から処理したリクエストの「登録済みのため挿入しなかった」という応答で上書きしないため）
+
+        Raises:
+            IdempotencyConflict: 先に保存されていたのが別の内容のリクエストだった場合
+        """
+        now = datetime.utcnow()
+        # 期限切れのキーはこのユーザーの分だけ掃除する（主キーの先頭が user_id なので索引で済む）
+        self.db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.created_at < now - IDEMPOTENCY_TTL,
+        ).delete(synchronize_session=False)
+
+        statement = dialect_insert(self.db, IdempotencyKey).values(
+            user_id=user_id, key=key, request_hash=request_hash(payload), response=response, created_at=now
+        )
+        if self.db.execute(statement.on_conflict_do_nothing(index_elements=["user_id", "key"])).rowcount:
+            return response
+
+        # 最初に保存された応答を優先する
+        record = self.db.get(IdempotencyKey, (user_id, key), populate_existing=True)
+        if record.request_hash != request_hash(payload):
+            raise IdempotencyConflict(key)
+        return record.response
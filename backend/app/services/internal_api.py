@@ -5,21 +5,40 @@ Function calling経由でAPIを呼び出すためのサービス
 
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from fastapi import HTTPException
 
 from models.users import User
 from models.objective import Objective
 from models.vitaldata import VitalData
-from models.vitaldataname import VitalDataName
 from models.uservitalcategory import UserVitalCategory
+from app.services.vital_projection import VitalProjectionService
+from app.services.vital_ingest import VitalIngestService
+from app.services.idempotency import IdempotencyService, IdempotencyConflict
+from app.services.vital_partitions import VitalPartitionService
+from app.utils.user_cache import invalidate_user
+from app.utils.vital_names import vital_names
+from app.utils.vital_name_index import vital_name_index
+
+# エージェント経由で登録した vitaldata の source
+AGENT_SOURCE = "agent"
 
 
 class InternalAPIService:
-    def __init__(self, db: Session, user: User):
+    def __init__(self, db: AsyncSession, user: User):
         self.db = db
         self.user = user
 
+    async def _name_not_found(self, data_name: str) -> Dict[str, Any]:
+        """カテゴリ名を解決できなかったときの応答（似ているカテゴリ名を候補として返す）"""
+        suggestions = await self.db.run_sync(vital_name_index.suggestions, data_name)
+        return {
+            "success": False,
+            "error": f"データ名 '{data_name}' が見つかりません" + (f"（候補: {', '.join(suggestions)}）" if suggestions else ""),
+            "suggestions": suggestions
+        }
+
     async def create_objective(
         self,
         data_name: str,
@@ -29,53 +48,41 @@ class InternalAPIService:
     ) -> Dict[str, Any]:
         """目標を作成する"""
         try:
-            # 日付文字列をdatetimeに変換
-            start_datetime = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            end_datetime = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+            # 日付文字列をdatetimeに変換（DB には naive な日時で保存する）
+            start_datetime = datetime.fromisoformat(start_date.replace('Z', '+00:00')).replace(tzinfo=None)
+            end_datetime = datetime.fromisoformat(end_date.replace('Z', '+00:00')).replace(tzinfo=None)
             
-            # VitalDataNameを取得
-            data_name_obj = self.db.query(VitalDataName).filter(
-                VitalDataName.name == data_name
-            ).first()
+            # 自由入力のカテゴリ名を解決する（書き込みなので表記ゆれ・同義語まで。似ているだけの名前は候補を返す）
+            match = await self.db.run_sync(lambda session: vital_name_index.resolve(session, data_name, fuzzy=False))
             
-            if not data_name_obj:
-                return {
-                    "success": False,
-                    "error": f"データ名 '{data_name}' が見つかりません"
-                }
+            if match is None:
+                return await self._name_not_found(data_name)
+            name_id, data_name = match.vital_id, match.name
             
             # 既存の目標をチェック（コメントアウト - 重複を許可）
-            # user = self.db.query(User).filter(User.id == self.user.id).first()
-            # if user.objective:
-            #     for objective_id in user.objective:
-            #         existing_obj = self.db.query(Objective).filter(
-            #             Objective.id == objective_id
-            #         ).first()
-            #         if existing_obj and existing_obj.name_id == data_name_obj.id:
-            #             return {
-            #                 "success": False,
-            #                 "error": f"'{data_name}' の目標は既に存在します"
-            #             }
+            # existing_obj = self.db.query(Objective).filter(
+            #     Objective.user_id == self.user.id,
+            #     Objective.name_id == name_id
+            # ).first()
+            # if existing_obj:
+            #     return {
+            #         "success": False,
+            #         "error": f"'{data_name}' の目標は既に存在します"
+            #     }
             
             # 目標を作成
             objective = Objective(
+                user_id=self.user.id,
                 start_date=start_datetime,
                 end_date=end_datetime,
-                name_id=data_name_obj.id,
+                name_id=name_id,
                 value=objective_value
             )
             
             self.db.add(objective)
-            self.db.commit()
-            self.db.refresh(objective)
-            
-            # ユーザーの目標リストに追加
-            # セッションから最新のユーザー情報を取得
-            user = self.db.query(User).filter(User.id == self.user.id).first()
-            if user.objective is None:
-                user.objective = []
-            user.objective.append(objective.id)
-            self.db.commit()
+            await self.db.commit()
+            await self.db.refresh(objective)
+            invalidate_user(self.user.id)
             
             return {
                 "success": True,
@@ -84,7 +91,7 @@ class InternalAPIService:
             }
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             return {
                 "success": False,
                 "error": f"目標作成中にエラーが発生しました: {str(e)}"
@@ -93,36 +100,37 @@ class InternalAPIService:
     async def get_objectives(self) -> Dict[str, Any]:
         """目標一覧を取得する"""
         try:
-            user = self.db.query(User).filter(User.id == self.user.id).first()
-            if not user.objective:
+            # ユーザーの目標を user_id の索引で1回のクエリで取得
+            user_objectives = (await self.db.scalars(select(Objective).where(
+                Objective.user_id == self.user.id
+            ).order_by(Objective.id))).all()
+            
+            if not user_objectives:
                 return {
                     "success": True,
                     "objectives": [],
                     "message": "現在設定されている目標はありません"
                 }
             
+            # 現在の値を投影テーブルから、カテゴリ名をプロセス内の辞書から取得
+            latest = await self.db.run_sync(lambda session: {
+                objective.name_id: VitalProjectionService(session).latest(self.user.id, objective.name_id)
+                for objective in user_objectives
+            })
+            names = await self.db.run_sync(vital_names.names_for, {objective.name_id for objective in user_objectives})
+
             objectives = []
-            for obj_id in user.objective:
-                objective = self.db.query(Objective).join(VitalDataName).filter(
-                    Objective.id == obj_id,
-                    Objective.name_id == VitalDataName.id
-                ).first()
+            for objective in user_objectives:
+                current_data = latest[objective.name_id]
                 
-                if objective:
-                    # 現在の値を取得
-                    current_data = self.db.query(VitalData).filter(
-                        VitalData.user_id == self.user.id,
-                        VitalData.name_id == objective.name_id
-                    ).order_by(VitalData.date.desc()).first()
-                    
-                    objectives.append({
-                        "objective_id": objective.id,
-                        "data_name": objective.vitaldataname.name,
-                        "start_date": objective.start_date.isoformat(),
-                        "end_date": objective.end_date.isoformat(),
-                        "objective_value": objective.value,
-                        "current_value": current_data.value if current_data else None
-                    })
+                objectives.append({
+                    "objective_id": objective.id,
+                    "data_name": names.get(objective.name_id),
+                    "start_date": objective.start_date.isoformat(),
+                    "end_date": objective.end_date.isoformat(),
+                    "objective_value": objective.value,
+                    "current_value": current_data.latest_value if current_data else None
+                })
             
             return {
                 "success": True,
@@ -143,9 +151,7 @@ class InternalAPIService:
     ) -> Dict[str, Any]:
         """目標を更新する"""
         try:
-            objective = self.db.query(Objective).filter(
-                Objective.id == objective_id
-            ).first()
+            objective = await self.db.get(Objective, objective_id)
             
             if not objective:
                 return {
@@ -154,15 +160,15 @@ class InternalAPIService:
                 }
             
             # ユーザーの目標かチェック
-            user = self.db.query(User).filter(User.id == self.user.id).first()
-            if not user.objective or objective_id not in user.objective:
+            if objective.user_id != self.user.id:
                 return {
                     "success": False,
                     "error": "この目標を更新する権限がありません"
                 }
             
             objective.value = objective_value
-            self.db.commit()
+            await self.db.commit()
+            invalidate_user(self.user.id)
             
             return {
                 "success": True,
@@ -170,7 +176,7 @@ class InternalAPIService:
             }
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             return {
                 "success": False,
                 "error": f"目標更新中にエラーが発生しました: {str(e)}"
@@ -179,9 +185,7 @@ class InternalAPIService:
     async def delete_objective(self, objective_id: int) -> Dict[str, Any]:
         """目標を削除する"""
         try:
-            objective = self.db.query(Objective).filter(
-                Objective.id == objective_id
-            ).first()
+            objective = await self.db.get(Objective, objective_id)
             
             if not objective:
                 return {
@@ -190,17 +194,16 @@ class InternalAPIService:
                 }
             
             # ユーザーの目標かチェック
-            user = self.db.query(User).filter(User.id == self.user.id).first()
-            if not user.objective or objective_id not in user.objective:
+            if objective.user_id != self.user.id:
                 return {
                     "success": False,
                     "error": "この目標を削除する権限がありません"
                 }
             
             # 目標を削除
-            self.db.delete(objective)
-            user.objective.remove(objective_id)
-            self.db.commit()
+            await self.db.delete(objective)
+            await self.db.commit()
+            invalidate_user(self.user.id)
             
             return {
                 "success": True,
@@ -208,7 +211,7 @@ class InternalAPIService:
             }
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             return {
                 "success": False,
                 "error": f"目標削除中にエラーが発生しました: {str(e)}"
@@ -218,47 +221,82 @@ class InternalAPIService:
         self,
         data_name: str,
         value: float,
-        date: Optional[str] = None
+        date: Optional[str] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict[str, Any]:
-        """バイタルデータを登録する"""
+        """
+        バイタルデータを登録する
+
+        idempotency_key が同じ呼び出しは2回目以降は登録せず、最初の結果を返す
+        （同じ発話に対して関数が重複して呼ばれても行が増えないようにする）
+        """
+        payload = {"data_name": data_name, "value": value, "date": date}
         try:
+            if idempotency_key:
+                replayed = await self.db.run_sync(
+                    lambda session: IdempotencyService(session).lookup(self.user.id, idempotency_key, payload)
+                )
+                if replayed is not None:
+                    return replayed
+
             # 日付の処理
             if date:
                 date_obj = datetime.fromisoformat(date.replace('Z', '+00:00'))
             else:
                 date_obj = datetime.utcnow()
             
-            # VitalDataNameを取得
-            data_name_obj = self.db.query(VitalDataName).filter(
-                VitalDataName.name == data_name
-            ).first()
+            # 自由入力のカテゴリ名を解決する（書き込みなので表記ゆれ・同義語まで。似ているだけの名前は候補を返す）
+            match = await self.db.run_sync(lambda session: vital_name_index.resolve(session, data_name, fuzzy=False))
             
-            if not data_name_obj:
-                return {
-                    "success": False,
-                    "error": f"データ名 '{data_name}' が見つかりません"
-                }
-            
-            # バイタルデータを作成
-            vital_data = VitalData(
-                user_id=self.user.id,
-                date=date_obj,
-                name_id=data_name_obj.id,
-                value=value
-            )
+            if match is None:
+                return await self._name_not_found(data_name)
+            name_id, data_name = match.vital_id, match.name
             
-            self.db.add(vital_data)
-            self.db.commit()
-            self.db.refresh(vital_data)
-            
-            return {
+            # バイタルデータを作成（同じ時刻の登録済みの値があれば挿入しない）
+            row = {
+                "user_id": self.user.id,
+                "name_id": name_id,
+                "date": date_obj.replace(tzinfo=None),
+                "value": value,
+                "source": AGENT_SOURCE,
+            }
+            data_id = (await self.db.run_sync(lambda session: VitalIngestService(session).insert_rows([row])))[0]
+            created = data_id is not None
+            if not created:
+                data_id = await self.db.scalar(select(VitalData.id).where(
+                    VitalData.user_id == row["user_id"],
+                    VitalData.name_id == row["name_id"],
+                    VitalData.date == row["date"],
+                    VitalData.source == row["source"],
+                ))
+
+            result = {
                 "success": True,
-                "data_id": vital_data.id,
-                "message": f"'{data_name}' のデータを登録しました"
+                "created": created,
+                "data_id": data_id,
+                "message": (
+                    f"'{data_name}' のデータを登録しました" if created
+                    else f"'{data_name}' の同じ日時のデータは既に登録されているため、新しく登録しませんでした"
+                )
+            }
+            if idempotency_key:
+                # 同じキーの呼び出しが並行して先に保存していれば、その結果を返す
+                result = await self.db.run_sync(
+                    lambda session: IdempotencyService(session).save(self.user.id, idempotency_key, payload, result)
+                )
+            await self.db.commit()
+            
+            return result
+            
+        except IdempotencyConflict:
+            # 保存の時点で競合した場合は挿入した行も取り消す
+            await self.db.rollback()
+            return {
+                "success": False,
+                "error": "同じ操作キーで別の内容のデータが既に登録されています"
             }
-            
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             return {
                 "success": False,
                 "error": f"データ登録中にエラーが発生しました: {str(e)}"
@@ -271,39 +309,44 @@ class InternalAPIService:
     ) -> Dict[str, Any]:
         """バイタルデータを取得する"""
         try:
-            query = self.db.query(VitalData).filter(
-                VitalData.user_id == self.user.id
+            vitaldata = await self.db.run_sync(lambda session: VitalPartitionService(session).source())
+            query = select(vitaldata.id, vitaldata.name_id, vitaldata.value, vitaldata.date).where(
+                vitaldata.user_id == self.user.id
             )
             
+            # 読み取りは似た名前にも解決する（解決したカテゴリ名を応答に含める）
+            match = None
             if data_name:
-                data_name_obj = self.db.query(VitalDataName).filter(
-                    VitalDataName.name == data_name
-                ).first()
-                if not data_name_obj:
-                    return {
-                        "success": False,
-                        "error": f"データ名 '{data_name}' が見つかりません"
-                    }
-                query = query.filter(VitalData.name_id == data_name_obj.id)
+                match = await self.db.run_sync(vital_name_index.resolve, data_name)
+                if match is None:
+                    return await self._name_not_found(data_name)
+                query = query.where(vitaldata.name_id == match.vital_id)
             
-            vital_data_list = query.join(VitalDataName).order_by(
-                VitalData.date.desc()
-            ).limit(limit).all()
+            vital_data_list = (await self.db.execute(query.order_by(
+                vitaldata.date.desc(), vitaldata.id.desc()
+            ).limit(limit))).all()
+            # カテゴリ名は JOIN せずプロセス内の辞書から引く
+            names = await self.db.run_sync(vital_names.names_for, {vital_data.name_id for vital_data in vital_data_list})
             
             data = []
             for vital_data in vital_data_list:
                 data.append({
                     "id": vital_data.id,
-                    "data_name": vital_data.vitaldataname.name,
+                    "data_name": names.get(vital_data.name_id),
                     "value": vital_data.value,
                     "date": vital_data.date.isoformat()
                 })
             
-            return {
+            result = {
                 "success": True,
                 "data": data,
                 "message": f"{len(data)}件のデータが見つかりました"
             }
+            if match is not None:
+                result["data_name"] = match.name
+                if match.name != data_name:
+                    result["message"] = f"'{data_name}' を '{match.name}' として検索しました。" + result["message"]
+            return result
             
         except Exception as e:
             return {
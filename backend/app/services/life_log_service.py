@@ -0,0 +1,143 @@
+"""
+ライフログ取得サービス
+カテゴリごとの時系列を期間指定・カーソルページング・間引き付きで1回のクエリで取得する
+"""
+
+import base64
+import binascii
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, or_
+
+from models.vitaldataname import VitalDataName
+from models.uservitalcategory import UserVitalCategory
+from app.services.vital_partitions import VitalPartitionService
+from app.utils.downsample import lttb
+
+
+def encode_cursor(name_id: int, date: datetime, row_id: int) -> str:
+    """系列内の最後に返した点を表すカーソル"""
+    raw = f"{name_id}|{date.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, datetime, int]:
+    """
+    カーソルを (name_id, 日時, id) に戻す
+
+    Raises:
+        ValueError: カーソルの形式が正しくない場合
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        name_id, date, row_id = raw.split("|")
+        return int(name_id), datetime.fromisoformat(date), int(row_id)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+class LifeLogService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def series(
+        self,
+        user_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        data_name: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        max_points: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        登録済みカテゴリごとの時系列を返す
+
+        Args:
+            start, end: 期間（両端を含む）
+            data_name: 指定した場合はそのカテゴリだけを返す
+            limit: 1系列あたりの最大点数。超える場合は next_cursor を返す
+            cursor: 前のレスポンスの next_cursor（その系列の続きだけを返す）
+            max_points: 1系列あたりの点数の上限。超える場合は LTTB で間引く
+
+        Raises:
+            ValueError: カーソルの形式が正しくない場合
+        """
+        after = decode_cursor(cursor) if cursor else None
+
+        categories_query = self.db.query(VitalDataName.id, VitalDataName.name).join(
+            UserVitalCategory, UserVitalCategory.vital_id == VitalDataName.id
+        ).filter(UserVitalCategory.user_id == user_id)
+        if data_name is not None:
+            categories_query = categories_query.filter(VitalDataName.name == data_name)
+        if after is not None:
+            categories_query = categories_query.filter(VitalDataName.id == after[0])
+        categories = categories_query.order_by(VitalDataName.id).all()
+        if not categories:
+            return []
+
+        # 期間にかかるアーカイブした月があればそのテーブルも読む
+        vitaldata = VitalPartitionService(self.db).source(start, end)
+        filters = [
+            vitaldata.user_id == user_id,
+            vitaldata.name_id.in_([category.id for category in categories]),
+        ]
+        if start is not None:
+            filters.append(vitaldata.date >= start)
+        if end is not None:
+            filters.append(vitaldata.date <= end)
+        if after is not None:
+            _, after_date, after_id = after
+            filters.append(or_(
+                vitaldata.date > after_date,
+                and_(vitaldata.date == after_date, vitaldata.id > after_id),
+            ))
+
+        columns = [vitaldata.name_id, vitaldata.date, vitaldata.value, vitaldata.id]
+        if limit is None:
+            rows = self.db.query(*columns).filter(*filters).order_by(
+                vitaldata.name_id, vitaldata.date, vitaldata.id
+            ).all()
+        else:
+            # 系列ごとに limit + 1 件まで取得し、余った1件で続きがあるかを判定する
+            ranked = self.db.query(
+                *columns,
+                func.row_number().over(
+                    partition_by=vitaldata.name_id,
+                    order_by=(vitaldata.date, vitaldata.id)
+                ).label("rn"),
+            ).filter(*filters).subquery()
+            rows = self.db.query(
+                ranked.c.name_id, ranked.c.date, ranked.c.value, ranked.c.id
+            ).filter(ranked.c.rn <= limit + 1).order_by(
+                ranked.c.name_id, ranked.c.date, ranked.c.id
+            ).all()
+
+        rows_by_name: Dict[int, list] = defaultdict(list)
+        for name_id, date, value, row_id in rows:
+            rows_by_name[name_id].append((date, value, row_id))
+
+        result = []
+        for category in categories:
+            series_rows = rows_by_name.get(category.id, [])
+            next_cursor = None
+            if limit is not None and len(series_rows) > limit:
+                series_rows = series_rows[:limit]
+                last_date, _, last_id = series_rows[-1]
+                next_cursor = encode_cursor(category.id, last_date, last_id)
+
+            points = [(date, value) for date, value, _ in series_rows]
+            downsampled = max_points is not None and len(points) > max_points
+            if downsampled:
+                points = lttb(points, max_points)
+
+            result.append({
+                "data_name": category.name,
+                "vitaldata_list": [{"x": date, "y": value} for date, value in points],
+                "next_cursor": next_cursor,
+                "downsampled": downsampled,
+            })
+
+        return result
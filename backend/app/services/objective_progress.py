@@ -0,0 +1,178 @@
+"""
+目標進捗計算サービス
+ユーザーの全目標について、自分と友達の期間内の値を少数の集計クエリでまとめて求める
+"""
+
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, case, select, literal, union_all
+
+from models.users import User
+from models.objective import Objective
+from models.uservitalcategory import UserVitalCategory
+from models.vitaldailyrollup import VitalDailyRollup
+from app.services.friend_service import FriendService
+from app.services.vital_projection import day_range
+from app.services.vital_partitions import VitalPartitionService
+from app.utils.icons import encode_icon, icon_url
+from app.utils.icon_store import IconStore
+
+
+class ObjectiveProgressService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def window_values(
+        self,
+        objectives: List[Objective],
+        user_ids: List[int]
+    ) -> Dict[Tuple[int, int], Tuple[float, float]]:
+        """
+        目標ごと・ユーザーごとに期間内の (合計, 最新値) を1回のクエリで求める
+
+        期間の途中の日は vital_daily_rollup の日次集計を使い、
+        開始日・終了日（時刻の途中で切れる日）だけ vitaldata の生データを読む
+        （その日がアーカイブした月に入る場合だけ、その月のアーカイブテーブルも読む）
+        """
+        partitions = VitalPartitionService(self.db)
+
+        def raw(objective: Objective, lower: datetime, upper: datetime, include_upper: bool):
+            vitaldata = partitions.source(lower, upper)
+            return select(
+                literal(objective.id).label("objective_id"),
+                vitaldata.user_id.label("user_id"),
+                vitaldata.date.label("date"),
+                vitaldata.id.label("row_id"),
+                vitaldata.value.label("total"),
+                vitaldata.value.label("last_value"),
+            ).where(
+                vitaldata.user_id.in_(user_ids),
+                vitaldata.name_id == objective.name_id,
+                vitaldata.date >= lower,
+                vitaldata.date <= upper if include_upper else vitaldata.date < upper,
+            )
+
+        parts = []
+        for objective in objectives:
+            start, end = objective.start_date, objective.end_date
+            if start > end:
+                continue
+            first_day, last_day = start.date(), end.date()
+            if first_day == last_day:
+                parts.append(raw(objective, start, end, include_upper=True))
+                continue
+
+            parts.append(raw(objective, start, day_range(first_day)[1], include_upper=False))
+            parts.append(raw(objective, day_range(last_day)[0], end, include_upper=True))
+            if (last_day - first_day).days > 1:
+                parts.append(select(
+                    literal(objective.id).label("objective_id"),
+                    VitalDailyRollup.user_id.label("user_id"),
+                    VitalDailyRollup.last_date.label("date"),
+                    literal(0).label("row_id"),
+                    VitalDailyRollup.value_sum.label("total"),
+                    VitalDailyRollup.last_value.label("last_value"),
+                ).where(
+                    VitalDailyRollup.user_id.in_(user_ids),
+                    VitalDailyRollup.vital_id == objective.name_id,
+                    VitalDailyRollup.day > first_day,
+                    VitalDailyRollup.day < last_day,
+                ))
+        if not parts:
+            return {}
+
+        windows = union_all(*parts).subquery()
+        ranked = select(
+            windows,
+            func.row_number().over(
+                partition_by=(windows.c.objective_id, windows.c.user_id),
+                order_by=(windows.c.date.desc(), windows.c.row_id.desc())
+            ).label("rn"),
+        ).subquery()
+
+        rows = self.db.execute(
+            select(
+                ranked.c.objective_id,
+                ranked.c.user_id,
+                func.sum(ranked.c.total),
+                func.max(case((ranked.c.rn == 1, ranked.c.last_value))),
+            )
+            .group_by(ranked.c.objective_id, ranked.c.user_id)
+        ).all()
+        return {
+            (objective_id, user_id): (total, latest)
+            for objective_id, user_id, total, latest in rows
+        }
+
+    def progress(self, user: User, include_icon: bool = False) -> List[Dict[str, Any]]:
+        """
+        ユーザーの全目標の進捗（自分と友達の値）を返す
+
+        アイコンは URL だけを返す（include_icon が True の場合だけアイコン本体を読んで埋め込む）
+        """
+        objectives = (
+            self.db.query(Objective)
+            .options(joinedload(Objective.vitaldataname))
+            .filter(Objective.user_id == user.id)
+            .order_by(Objective.id)
+            .all()
+        )
+        if not objectives:
+            return []
+        friend_ids = FriendService(self.db).friend_ids(user.id)
+        participant_ids = [user.id] + friend_ids
+        vital_ids = {objective.name_id for objective in objectives}
+
+        categories = {
+            (category.user_id, category.vital_id): category.is_accumulating
+            for category in self.db.query(UserVitalCategory.user_id, UserVitalCategory.vital_id, UserVitalCategory.is_accumulating)
+            .filter(
+                UserVitalCategory.user_id.in_(participant_ids),
+                UserVitalCategory.vital_id.in_(vital_ids),
+            )
+        }
+
+        values = self.window_values(objectives, participant_ids)
+
+        friends = {}
+        if friend_ids:
+            store = IconStore()
+            for row in self.db.query(User.id, User.sex, User.icon_hash).filter(User.id.in_(friend_ids)):
+                friends[row.id] = {
+                    "friend_icon": encode_icon(store.read(row.icon_hash)) if include_icon else None,
+                    "friend_icon_url": icon_url(row.id, row.icon_hash, thumbnail=True),
+                    "friend_sex": row.sex,
+                }
+
+        def value_for(objective: Objective, user_id: int):
+            is_accumulating = categories.get((user_id, objective.name_id))
+            if is_accumulating is None:
+                return None
+            total, latest = values.get((objective.id, user_id), (None, None))
+            return total if is_accumulating else latest
+
+        result = []
+        for objective in objectives:
+            friends_progress = []
+            for friend_id in friend_ids:
+                friend_value = value_for(objective, friend_id)
+                if friend_value is not None and friend_id in friends:
+                    friends_progress.append({
+                        "friend_icon": friends[friend_id]["friend_icon"],
+                        "friend_icon_url": friends[friend_id]["friend_icon_url"],
+                        "friend_info": friend_value,
+                        "friend_sex": friends[friend_id]["friend_sex"]
+                    })
+
+            result.append({
+                "objective_id": objective.id,
+                "data_name": objective.vitaldataname.name,
+                "start_date": objective.start_date,
+                "end_date": objective.end_date,
+                "objective_value": objective.value,
+                "my_value": value_for(objective, user.id),
+                "friends": friends_progress
+            })
+
+        return result
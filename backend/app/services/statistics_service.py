@@ -0,0 +1,147 @@
+"""
+統計計算サービス
+年代・性別ごとのバイタルデータ平均値を集計する
+"""
+
+from datetime import date, datetime
+from typing import Optional, List, Dict, Any
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, case
+
+from models.users import User
+from models.uservitalcategory import UserVitalCategory
+from models.uservitallatest import UserVitalLatest
+from models.vitaldailyrollup import VitalDailyRollup
+from app.utils.date_trunc import truncate_date
+
+
+def birth_date_for_age(age: int, today: Optional[date] = None) -> datetime:
+    """今日時点で age 歳になる境界の生年月日を返す（2/29 は 2/28 に丸める）"""
+    today = today or date.today()
+    try:
+        return datetime(today.year - age, today.month, today.day)
+    except ValueError:
+        return datetime(today.year - age, today.month, today.day - 1)
+
+
+class StatisticsService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def user_values_subquery(self, vital_id: int):
+        """
+        公開設定しているユーザーごとの代表値を user_vital_latest と vital_daily_rollup から引くサブクエリ
+
+        非累積: 最新の値 / 累積: 最新日の合計値
+        """
+        return (
+            self.db.query(
+                UserVitalLatest.user_id.label("user_id"),
+                case(
+                    (UserVitalCategory.is_accumulating == True, VitalDailyRollup.value_sum),
+                    else_=UserVitalLatest.latest_value,
+                ).label("value"),
+            )
+            .join(
+                UserVitalCategory,
+                and_(
+                    UserVitalCategory.user_id == UserVitalLatest.user_id,
+                    UserVitalCategory.vital_id == UserVitalLatest.vital_id,
+                ),
+            )
+            .outerjoin(
+                VitalDailyRollup,
+                and_(
+                    VitalDailyRollup.user_id == UserVitalLatest.user_id,
+                    VitalDailyRollup.vital_id == UserVitalLatest.vital_id,
+                    VitalDailyRollup.day == truncate_date("day", UserVitalLatest.latest_date),
+                ),
+            )
+            .filter(
+                UserVitalLatest.vital_id == vital_id,
+                UserVitalCategory.is_public == True,
+            )
+            .subquery()
+        )
+
+    def average(
+        self,
+        vital_id: int,
+        start_age: int,
+        end_age: int,
+        sex: Optional[bool] = None,
+    ) -> Optional[float]:
+        """年齢範囲・性別に合うユーザーの代表値の平均を1回のクエリで求める"""
+        today = date.today()
+        values = self.user_values_subquery(vital_id)
+        query = (
+            self.db.query(func.avg(values.c.value))
+            .join(User, User.id == values.c.user_id)
+            .filter(
+                User.date_of_birth >= birth_date_for_age(end_age, today),
+                User.date_of_birth < birth_date_for_age(start_age, today),
+            )
+        )
+        if sex is not None:
+            query = query.filter(User.sex == sex)
+        return query.scalar()
+
+    def histogram(
+        self,
+        vital_id: int,
+        start_age: int,
+        end_age: int,
+        bucket_width: int,
+        split_by_sex: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """年齢を bucket_width 歳刻みに区切り、各区間の平均値を1回の集計クエリで求める"""
+        today = date.today()
+        bounds = []
+        for lower in range(start_age, end_age, bucket_width):
+            upper = min(lower + bucket_width, end_age)
+            bounds.append((lower, upper, birth_date_for_age(upper, today), birth_date_for_age(lower, today)))
+
+        bucket = case(
+            *[
+                (and_(User.date_of_birth >= min_birth, User.date_of_birth < max_birth), index)
+                for index, (_, _, min_birth, max_birth) in enumerate(bounds)
+            ],
+            else_=None,
+        ).label("bucket")
+
+        values = self.user_values_subquery(vital_id)
+        columns = [bucket, func.avg(values.c.value), func.count(values.c.value)]
+        if split_by_sex:
+            columns.append(User.sex)
+
+        query = (
+            self.db.query(*columns)
+            .select_from(values)
+            .join(User, User.id == values.c.user_id)
+            .filter(
+                User.date_of_birth >= bounds[-1][2],
+                User.date_of_birth < bounds[0][3],
+            )
+            .group_by(bucket)
+        )
+        if split_by_sex:
+            query = query.filter(User.sex.isnot(None)).group_by(User.sex)
+
+        aggregated = {}
+        for row in query.all():
+            key = (row[0], row[3] if split_by_sex else None)
+            aggregated[key] = (row[1], row[2])
+
+        sexes = [True, False] if split_by_sex else [None]
+        result = []
+        for sex in sexes:
+            for index, (lower, upper, _, _) in enumerate(bounds):
+                average, count = aggregated.get((index, sex), (None, 0))
+                result.append({
+                    "start_age": lower,
+                    "end_age": upper,
+                    "sex": sex,
+                    "average": average,
+                    "count": count,
+                })
+        return result
@@ -3,6 +3,8 @@ from typing import Optional
 from models.users import User
 from models.vitaldata import VitalData
 from models.vitaldataname import VitalDataName
+from app.services.friend_service import FriendService
+from app.utils.user_cache import invalidate_user
 
 class UserService:
     def __init__(self, db: Session):
@@ -25,11 +27,9 @@ class UserService:
         if not self.get_user_by_id(friend_id):
             return False
         
-        friends = user.friends or []
-        if friend_id in friends:
+        if not FriendService(self.db).add_friend(user.id, friend_id):
             return False
         
-        friends.append(friend_id)
-        user.friends = friends
         self.db.commit()
+        invalidate_user(user.id, friend_id)
         return True
\ No newline at end of file
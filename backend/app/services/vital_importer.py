@@ -0,0 +1,152 @@
+"""
+バイタルデータ取り込みサービス
+CSV / NDJSON を1行ずつ読み、一定件数ごとにまとめて登録する（ファイル全体をメモリに載せない）
+
+CSV は1行目がヘッダーで、列は user_id（省略可）, name_id または data_name, date, value, source（省略可）
+同じファイルを取り込み直しても、登録済みの行は重複として数えるだけで挿入しない
+"""
+
+import csv
+import json
+import time
+from itertools import islice
+from typing import Iterable, Iterator, Tuple, Optional, Dict, Any, Callable
+from sqlalchemy.orm import Session
+
+from app.services.vital_ingest import VitalIngestService, VitalNameCache
+
+FORMATS = ("csv", "ndjson")
+DEFAULT_CHUNK_SIZE = 1000
+# source 列がない行の登録元
+IMPORT_SOURCE = "import"
+# レポートに含めるエラーの最大件数
+MAX_REPORTED_ERRORS = 100
+
+# (行番号, 読み込んだ行, 解析エラー)
+ParsedLine = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """拡張子からファイル形式を推定する"""
+    if not filename:
+        return None
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[ParsedLine]:
+    """CSV を1行ずつ dict にする（空欄は未指定として扱う）"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, {key: value for key, value in row.items() if key and value not in (None, "")}, None
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[ParsedLine]:
+    """NDJSON を1行ずつ dict にする（読めない行はエラーとして返す）"""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON"
+            continue
+        if not isinstance(item, dict):
+            yield line_number, None, "Each line must be a JSON object"
+            continue
+        yield line_number, item, None
+
+
+PARSERS: Dict[str, Callable[[Iterable[str]], Iterator[ParsedLine]]] = {
+    "csv": parse_csv,
+    "ndjson": parse_ndjson,
+}
+
+
+class VitalImporter:
+    def __init__(
+        self,
+        db: Session,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        user_id: Optional[int] = None,
+        per_row_user: bool = False
+    ):
+        """
+        Args:
+            chunk_size: 1回の挿入・commit にまとめる行数
+            user_id: 登録先のユーザー（per_row_user の場合は user_id 列がない行の既定値）
+            per_row_user: 行ごとの user_id 列を使う（CLI 用。HTTP では常にログインユーザー）
+        """
+        self.db = db
+        self.chunk_size = chunk_size
+        self.user_id = user_id
+        self.per_row_user = per_row_user
+        self.ingest = VitalIngestService(db, names=VitalNameCache())
+
+    def run(
+        self,
+        lines: Iterable[str],
+        format: str,
+        on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        行を読み込んで chunk_size 件ごとに登録・commit する
+
+        Args:
+            on_chunk: チャンクを commit するたびに途中経過のレポートを受け取る関数
+
+        Returns:
+            Dict[str, Any]: rows / inserted / duplicates / failed / errors / seconds / rows_per_second
+        """
+        parsed = PARSERS[format](lines)
+        report = {"rows": 0, "inserted": 0, "duplicates": 0, "failed": 0, "errors": [], "seconds": 0.0, "rows_per_second": 0.0}
+        started = time.perf_counter()
+
+        while True:
+            chunk = list(islice(parsed, self.chunk_size))
+            if not chunk:
+                break
+
+            items, line_numbers = [], []
+            for line_number, item, error in chunk:
+                if error is not None:
+                    self._add_error(report, line_number, error)
+                    continue
+                if not self.per_row_user:
+                    item.pop("user_id", None)
+                items.append(item)
+                line_numbers.append(line_number)
+
+            result = self.ingest.ingest(self.user_id, items, per_item_user=self.per_row_user, source=IMPORT_SOURCE)
+            self.db.commit()
+
+            for item_result in result["results"]:
+                if item_result["status"] == "error":
+                    self._add_error(report, line_numbers[item_result["index"]], item_result["error"], count=False)
+            report["rows"] += len(chunk)
+            report["inserted"] += result["inserted"]
+            report["duplicates"] += result["duplicates"]
+            report["failed"] += result["failed"]
+            self._update_rate(report, started)
+            if on_chunk is not None:
+                on_chunk(report)
+
+        self._update_rate(report, started)
+        return report
+
+    @staticmethod
+    def _add_error(report: Dict[str, Any], line_number: int, error: str, count: bool = True) -> None:
+        if count:
+            report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"line": line_number, "error": error})
+
+    @staticmethod
+    def _update_rate(report: Dict[str, Any], started: float) -> None:
+        seconds = time.perf_counter() - started
+        report["seconds"] = round(seconds, 3)
+        report["rows_per_second"] = round(report["rows"] / seconds, 1) if seconds > 0 else 0.0
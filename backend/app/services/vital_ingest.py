@@ -0,0 +1,219 @@
+"""
+バイタルデータ一括登録サービス
+複数の計測値を1パスで検証し、未登録カテゴリの登録と vitaldata への挿入を1トランザクションでまとめて行う
+
+(user_id, name_id, date, source) が同じ行は再送とみなして挿入しない（最初の値を残す）
+アーカイブした月（app/services/vital_partitions.py）の行は登録しない
+"""
+
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterable, Set, Tuple
+from pydantic import BaseModel, ValidationError, model_validator
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+
+from models.vitaldata import VitalData, DEFAULT_SOURCE
+from models.uservitalcategory import UserVitalCategory
+from app.services.vital_projection import VitalProjectionService
+from app.services.vital_partitions import VitalPartitionService
+from app.database.partitions import month_start
+from app.utils.upsert import dialect_insert
+from app.utils.vital_names import vital_names
+
+
+class BulkReading(BaseModel):
+    """一括登録の1件（カテゴリは name_id か data_name のどちらかで指定）"""
+    name_id: Optional[int] = None
+    data_name: Optional[str] = None
+    date: datetime
+    value: float
+    source: Optional[str] = None  # 省略時は登録経路ごとの既定値
+
+    @model_validator(mode="after")
+    def check_category(self):
+        if self.name_id is None and not self.data_name:
+            raise ValueError("name_id or data_name is required")
+        return self
+
+
+class ImportReading(BulkReading):
+    """ファイル取り込みの1件（ユーザーを行ごとに指定できる）"""
+    user_id: Optional[int] = None
+
+
+class VitalNameCache:
+    """
+    カテゴリ名 → ID の対応を保持するキャッシュ
+
+    一括登録・取り込みの間で使い回す。プロセス内のカテゴリ辞書（app/utils/vital_names.py）を引き、
+    辞書にない名前だけをまとめて DB に問い合わせる
+    """
+
+    def __init__(self):
+        self.id_by_name: Dict[str, int] = {}
+        self.known_ids: Set[int] = set()
+
+    def resolve(self, db: Session, names: Iterable[str] = (), ids: Iterable[int] = ()) -> None:
+        """未知の名前・ID を辞書から（辞書になければ1回ずつのクエリで）読み込む"""
+        missing_names = set(names) - self.id_by_name.keys()
+        if missing_names:
+            for name, vital_id in vital_names.ids_for(db, missing_names).items():
+                self.id_by_name[name] = vital_id
+                self.known_ids.add(vital_id)
+        missing_ids = set(ids) - self.known_ids
+        if missing_ids:
+            self.known_ids.update(vital_names.names_for(db, missing_ids))
+
+    def vital_id(self, name_id: Optional[int], data_name: Optional[str]) -> Optional[int]:
+        if name_id is not None:
+            return name_id if name_id in self.known_ids else None
+        return self.id_by_name.get(data_name)
+
+
+def validation_message(error: ValidationError) -> str:
+    """pydantic の検証エラーを1行のメッセージにする"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'item'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+class VitalIngestService:
+    def __init__(self, db: Session, names: Optional[VitalNameCache] = None):
+        self.db = db
+        self.names = names or VitalNameCache()
+        self.partitions = VitalPartitionService(db)
+
+    def ingest(
+        self,
+        user_id: Optional[int],
+        items: Iterable[Any],
+        per_item_user: bool = False,
+        source: str = DEFAULT_SOURCE
+    ) -> Dict[str, Any]:
+        """
+        計測値をまとめて登録する（commit は呼び出し側で行う）
+
+        Args:
+            user_id: 登録先のユーザー（per_item_user が True の場合は user_id のない行の既定値）
+            items: dict（未検証）または BulkReading のリスト
+            per_item_user: 行ごとの user_id を使う（CLI での取り込み用）
+            source: source を指定しない行の登録元
+
+        Returns:
+            Dict[str, Any]: inserted / duplicates / failed の件数と、入力順の結果（index, status, error）
+            status は ok / duplicate（登録済みのため挿入しなかった）/ error
+        """
+        model = ImportReading if per_item_user else BulkReading
+        results: List[Dict[str, Any]] = []
+        readings: List[Optional[BulkReading]] = []
+        for index, item in enumerate(items):
+            try:
+                reading = item if isinstance(item, BulkReading) else model.model_validate(item)
+                readings.append(reading)
+                results.append({"index": index, "status": "ok"})
+            except ValidationError as e:
+                readings.append(None)
+                results.append({"index": index, "status": "error", "error": validation_message(e)})
+
+        # キャッシュにないカテゴリ名と ID をそれぞれ1回のクエリで解決する
+        self.names.resolve(
+            self.db,
+            names={r.data_name for r in readings if r is not None and r.name_id is None},
+            ids={r.name_id for r in readings if r is not None and r.name_id is not None},
+        )
+
+        archived = self.partitions.archived_in(r.date for r in readings if r is not None)
+        rows, row_results = [], []
+        for reading, result in zip(readings, results):
+            if reading is None:
+                continue
+            vital_id = self.names.vital_id(reading.name_id, reading.data_name)
+            if vital_id is None:
+                result.update(status="error", error="Vital data type not found")
+                continue
+            row_user_id = getattr(reading, "user_id", None) or user_id
+            if row_user_id is None:
+                result.update(status="error", error="user_id is required")
+                continue
+            if month_start(reading.date) in archived:
+                result.update(status="error", error="Month is archived")
+                continue
+            # DB には naive な日時で保存する
+            rows.append({
+                "user_id": row_user_id,
+                "name_id": vital_id,
+                "date": reading.date.replace(tzinfo=None),
+                "value": reading.value,
+                "source": reading.source or source,
+            })
+            row_results.append(result)
+
+        inserted_ids = self.insert_rows(rows)
+        for inserted_id, result in zip(inserted_ids, row_results):
+            if inserted_id is None:
+                result["status"] = "duplicate"
+
+        inserted = sum(1 for inserted_id in inserted_ids if inserted_id is not None)
+        return {
+            "inserted": inserted,
+            "duplicates": len(rows) - inserted,
+            "failed": len(results) - len(rows),
+            "results": results,
+        }
+
+    def insert_rows(self, rows: List[Dict[str, Any]]) -> List[Optional[int]]:
+        """
+        検証済みの行を挿入し、集計テーブルとカテゴリ設定も更新する（commit は呼び出し側で行う）
+
+        自然キーが登録済みの行（同じリクエスト内の重複を含む）は挿入せず、集計にも加えない
+
+        Returns:
+            List[Optional[int]]: 行ごとの挿入した vitaldata.id（挿入しなかった行は None）
+
+        Raises:
+            ArchivedMonthError: アーカイブした月の行が含まれる場合（1行も挿入しない）
+        """
+        if not rows:
+            return []
+        self.partitions.check_writable(row["date"] for row in rows)
+        self.register_categories({(row["user_id"], row["name_id"]) for row in rows})
+        statement = (
+            dialect_insert(self.db, VitalData)
+            .on_conflict_do_nothing(index_elements=["user_id", "name_id", "date", "source"])
+            .returning(VitalData.id, VitalData.user_id, VitalData.name_id, VitalData.date, VitalData.source)
+        )
+        created = {
+            (user_id, name_id, date, source): row_id
+            for row_id, user_id, name_id, date, source in self.db.execute(statement, rows)
+        }
+
+        inserted_ids = []
+        for row in rows:
+            # 同じ自然キーの行が複数あれば最初の1行だけを挿入済みとして扱う
+            inserted_ids.append(created.pop((row["user_id"], row["name_id"], row["date"], row["source"]), None))
+
+        VitalProjectionService(self.db).record_many(
+            (row["user_id"], row["name_id"], row["date"], row["value"])
+            for row, inserted_id in zip(rows, inserted_ids) if inserted_id is not None
+        )
+        return inserted_ids
+
+    def register_categories(self, pairs: Iterable[Tuple[int, int]]) -> None:
+        """(ユーザー, カテゴリ) のうち未登録のものを既定の設定（公開・非累積）でまとめて登録する"""
+        pairs = set(pairs)
+        if not pairs:
+            return
+        registered = {
+            (user_id, vital_id)
+            for user_id, vital_id in self.db.query(UserVitalCategory.user_id, UserVitalCategory.vital_id).filter(
+                UserVitalCategory.user_id.in_({user_id for user_id, _ in pairs}),
+                UserVitalCategory.vital_id.in_({vital_id for _, vital_id in pairs}),
+            )
+        }
+        missing = sorted(pairs - registered)
+        if missing:
+            self.db.execute(insert(UserVitalCategory), [
+                {"user_id": user_id, "vital_id": vital_id, "is_public": True, "is_accumulating": False}
+                for user_id, vital_id in missing
+            ])
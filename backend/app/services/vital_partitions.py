@@ -0,0 +1,259 @@
+"""
+vitaldata の月単位パーティションとアーカイブの管理サービス
+
+- 読み取り: source(start, end) は期間にかかるアーカイブテーブルだけを vitaldata と UNION ALL した
+  エンティティを返す（かからなければ VitalData そのもの）。PostgreSQL の月パーティションは DB が刈り込む
+- PostgreSQL: 月のパーティションを作り（DEFAULT パーティションに入っていたその月の行を移す）、
+  古い月は DETACH してアーカイブテーブルにする
+- SQLite: 古い月の行を月ごとのアーカイブテーブルに移し、vitaldata（と索引）を直近のデータだけにする
+
+アーカイブした月は読み取り専用（書き込むと ArchivedMonthError）。集計テーブルは残したままなので、
+日・週・月単位の系列や統計はアーカイブの前後で変わらない
+"""
+
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, select, text, union_all
+from sqlalchemy.orm import Session, aliased
+
+from models.vitaldata import VitalData
+from models.vitaldataarchive import VitalDataArchive
+from app.database.partitions import (
+    archive_table_name,
+    default_partition_name,
+    month_bounds,
+    month_start,
+    months_between,
+    next_month,
+    overlaps,
+    partition_name,
+)
+from app.utils.date_trunc import truncate_date
+
+
+# アーカイブテーブルの定義（アプリのモデルとは別に持ち、create_all の対象にしない）
+archive_metadata = MetaData()
+
+
+class ArchivedMonthError(ValueError):
+    """アーカイブした月への書き込み（復元してから書き込む）"""
+
+    def __init__(self, months: Iterable[date]):
+        self.months = sorted(months)
+        super().__init__("Month is archived: " + ", ".join(f"{month:%Y-%m}" for month in self.months))
+
+
+def archive_table(month: date) -> Table:
+    """アーカイブテーブルの定義（列と索引は vitaldata と同じ、外部キーは持たない）"""
+    source = VitalData.__table__
+    name = archive_table_name(source.name, month)
+    table = archive_metadata.tables.get(name)
+    if table is not None:
+        return table
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable, autoincrement=False)
+        for column in source.columns
+    ]
+    indexes = [
+        Index(index.name.replace(source.name, name, 1), *[column.name for column in index.columns], unique=index.unique)
+        for index in source.indexes
+    ]
+    return Table(name, archive_metadata, *columns, *indexes)
+
+
+class VitalPartitionService:
+    def __init__(self, db: Session):
+        self.db = db
+        self._archived: Optional[List[date]] = None
+
+    @property
+    def is_postgresql(self) -> bool:
+        return self.db.get_bind().dialect.name == "postgresql"
+
+    def archived_months(self) -> List[date]:
+        """アーカイブした月（古い順、このサービスの中では1回だけ問い合わせる）"""
+        if self._archived is None:
+            self._archived = list(self.db.scalars(select(VitalDataArchive.month).order_by(VitalDataArchive.month)))
+        return self._archived
+
+    def source(self, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """
+        vitaldata を読むときのエンティティ
+
+        期間 [start, end]（None は無制限）にかかるアーカイブテーブルがあれば、vitaldata と UNION ALL した別名を返す。
+        列は VitalData と同じ名前で参照できる（VitalData.date の代わりに vitaldata.date）
+        """
+        tables = [archive_table(month) for month in self.archived_months() if overlaps(month, start, end)]
+        if not tables:
+            return VitalData
+        names = [column.name for column in VitalData.__table__.columns]
+        rows = union_all(
+            select(*[VitalData.__table__.c[name] for name in names]),
+            *[select(*[table.c[name] for name in names]) for table in tables],
+        ).subquery(f"{VitalData.__tablename__}_all")
+        return aliased(VitalData, rows)
+
+    def archived_in(self, dates: Iterable[datetime]) -> Set[date]:
+        """日時のうちアーカイブした月に入るものの月"""
+        archived = set(self.archived_months())
+        if not archived:
+            return set()
+        return {month_start(value) for value in dates} & archived
+
+    def check_writable(self, dates: Iterable[datetime]) -> None:
+        """
+        アーカイブした月への書き込みでないことを確認する
+
+        Raises:
+            ArchivedMonthError: アーカイブした月の日時が含まれる場合
+        """
+        months = self.archived_in(dates)
+        if months:
+            raise ArchivedMonthError(months)
+
+    def hot_months(self) -> Dict[date, int]:
+        """vitaldata に残っている月ごとの行数"""
+        month = truncate_date("month", VitalData.date)
+        rows = self.db.execute(select(month, func.count()).group_by(month).order_by(month)).all()
+        # SQLite では文字列で返る
+        return {
+            month_start(value if isinstance(value, datetime) else datetime.fromisoformat(value)): count
+            for value, count in rows
+        }
+
+    def partitions(self) -> List[str]:
+        """vitaldata の子パーティション名（PostgreSQL のみ、SQLite では空）"""
+        if not self.is_postgresql:
+            return []
+        # to_regclass は search_path に従って親テーブルを探す
+        return list(self.db.scalars(text(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE pg_inherits.inhparent = to_regclass(:table) ORDER BY child.relname"
+        ), {"table": VitalData.__tablename__}))
+
+    def ensure_partitions(self, months: Iterable[date]) -> List[str]:
+        """
+        月のパーティションがなければ作り、DEFAULT パーティションに入っていたその月の行を移す
+        （PostgreSQL のみ、commit は呼び出し側で行う）
+
+        Returns:
+            List[str]: 作成したパーティション名
+        """
+        if not self.is_postgresql:
+            return []
+        existing = set(self.partitions())
+        archived = set(self.archived_months())
+        created = []
+        for month in sorted({month_start(month) for month in months} - archived):
+            name = partition_name(VitalData.__tablename__, month)
+            if name in existing:
+                continue
+            self.db.execute(text(
+                f'CREATE TABLE "{name}" (LIKE {VitalData.__tablename__} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+            ))
+            self._attach(name, month)
+            created.append(name)
+        return created
+
+    def maintain(self, ahead: int = 2) -> List[str]:
+        """
+        今月から ahead か月先までと、DEFAULT パーティションに入っている月のパーティションを作る
+        （PostgreSQL のみ、commit は呼び出し側で行う）
+        """
+        if not self.is_postgresql:
+            return []
+        current = month_start(datetime.utcnow())
+        last = current
+        for _ in range(ahead):
+            last = next_month(last)
+        months = set(months_between(current, last))
+        months.update(month_start(value) for value in self.db.scalars(text(
+            f"SELECT DISTINCT date_trunc('month', date) FROM \"{default_partition_name(VitalData.__tablename__)}\""
+        )))
+        return self.ensure_partitions(months)
+
+    def archive(self, month: date) -> int:
+        """
+        月の行を vitaldata からアーカイブテーブルに移す（commit は呼び出し側で行う）
+
+        Returns:
+            int: アーカイブした行数
+
+        Raises:
+            ValueError: 今月以降の月、またはアーカイブ済みの月を指定した場合
+        """
+        month = month_start(month)
+        if month >= month_start(datetime.utcnow()):
+            raise ValueError(f"{month:%Y-%m} is not a past month")
+        if month in self.archived_months():
+            raise ValueError(f"{month:%Y-%m} is already archived")
+
+        table = archive_table(month)
+        if self.is_postgresql:
+            # 月のパーティションを切り離し、名前を変えるだけ（行はコピーしない）
+            self.ensure_partitions([month])
+            name = partition_name(VitalData.__tablename__, month)
+            self.db.execute(text(f'ALTER TABLE {VitalData.__tablename__} DETACH PARTITION "{name}"'))
+            self.db.execute(text(f'ALTER TABLE "{name}" RENAME TO "{table.name}"'))
+        else:
+            lower, upper = month_bounds(month)
+            source = VitalData.__table__
+            in_month = (source.c.date >= lower) & (source.c.date < upper)
+            table.create(self.db.connection())
+            self.db.execute(insert(table).from_select(
+                [column.name for column in source.columns], select(*source.columns).where(in_month)
+            ))
+            self.db.execute(delete(source).where(in_month))
+
+        row_count = self.db.scalar(select(func.count()).select_from(table))
+        self.db.add(VitalDataArchive(month=month, table_name=table.name, row_count=row_count))
+        self.db.flush()
+        self._archived = None
+        return row_count
+
+    def restore(self, month: date) -> int:
+        """
+        アーカイブした月を vitaldata に戻す（commit は呼び出し側で行う）
+
+        Returns:
+            int: 戻した行数
+
+        Raises:
+            ValueError: アーカイブしていない月を指定した場合
+        """
+        record = self.db.get(VitalDataArchive, month_start(month))
+        if record is None:
+            raise ValueError(f"{month:%Y-%m} is not archived")
+
+        table = archive_table(record.month)
+        if self.is_postgresql:
+            name = partition_name(VitalData.__tablename__, record.month)
+            self.db.execute(text(f'ALTER TABLE "{table.name}" RENAME TO "{name}"'))
+            self._attach(name, record.month)
+        else:
+            source = VitalData.__table__
+            self.db.execute(insert(source).from_select(
+                [column.name for column in source.columns], select(*[table.c[column.name] for column in source.columns])
+            ))
+            table.drop(self.db.connection())
+
+        row_count = record.row_count
+        self.db.delete(record)
+        self.db.flush()
+        self._archived = None
+        return row_count
+
+    def _attach(self, name: str, month: date) -> None:
+        """テーブルを月のパーティションとして付け直す（DEFAULT パーティションにあるその月の行は先に移す）"""
+        lower, upper = month_bounds(month)
+        self.db.execute(text(
+            f'WITH moved AS (DELETE FROM "{default_partition_name(VitalData.__tablename__)}"'
+            f' WHERE date >= :lower AND date < :upper RETURNING *)'
+            f' INSERT INTO "{name}" SELECT * FROM moved ON CONFLICT DO NOTHING'
+        ), {"lower": lower, "upper": upper})
+        self.db.execute(text(
+            f'ALTER TABLE {VitalData.__tablename__} ATTACH PARTITION "{name}"'
+            f" FOR VALUES FROM ('{lower.isoformat(sep=' ')}') TO ('{upper.isoformat(sep=' ')}')"
+        ))
@@ -0,0 +1,223 @@
+"""
+バイタルデータの投影（projection）管理サービス
+書き込み時点で次の2つを反映する
+
+- user_vital_latest: ユーザー×カテゴリごとの最新値
+- vital_daily_rollup: ユーザー×カテゴリ×日ごとの合計・件数・最小・最大・最後の値
+
+時間・週・月単位の集計（vital_rollup）は VitalRollupService に任せる
+"""
+
+from datetime import datetime, date as date_type, timedelta
+from typing import Optional, Iterable, Tuple, Dict, List
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, insert, delete, select
+
+from models.uservitallatest import UserVitalLatest
+from models.vitaldailyrollup import VitalDailyRollup
+from app.services.vital_rollup import VitalRollupService
+from app.services.vital_partitions import VitalPartitionService
+from app.utils.date_trunc import truncate_date
+
+
+# (user_id, vital_id, date, value)
+Reading = Tuple[int, int, datetime, float]
+
+
+def day_range(day: date_type) -> Tuple[datetime, datetime]:
+    """日付の範囲 [0時, 翌日0時) を返す（vitaldata.date の索引で範囲検索するため）"""
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+class VitalProjectionService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record(self, user_id: int, vital_id: int, date: datetime, value: float) -> None:
+        """1件の計測値を投影に反映する（commit は呼び出し側で行う）"""
+        self.record_many([(user_id, vital_id, date, value)])
+
+    def record_many(self, readings: Iterable[Reading]) -> None:
+        """
+        複数の計測値を投影に反映する（commit は呼び出し側で行う）
+
+        既存の投影行・日次集計行は対象分をそれぞれ1回のクエリでまとめて読み込む
+        """
+        # DB には naive な日時で保存されるため比較前に揃える
+        readings = [
+            (user_id, vital_id, date.replace(tzinfo=None), value)
+            for user_id, vital_id, date, value in readings
+        ]
+        if not readings:
+            return
+
+        user_ids = {user_id for user_id, _, _, _ in readings}
+        vital_ids = {vital_id for _, vital_id, _, _ in readings}
+        days = {date.date() for _, _, date, _ in readings}
+
+        latest: Dict[Tuple[int, int], UserVitalLatest] = {
+            (row.user_id, row.vital_id): row
+            for row in self.db.query(UserVitalLatest).filter(UserVitalLatest.user_id.in_(user_ids))
+        }
+        rollups: Dict[Tuple[int, int, date_type], VitalDailyRollup] = {
+            (row.user_id, row.vital_id, row.day): row
+            for row in self.db.query(VitalDailyRollup).filter(
+                VitalDailyRollup.user_id.in_(user_ids),
+                VitalDailyRollup.vital_id.in_(vital_ids),
+                VitalDailyRollup.day.in_(days),
+            )
+        }
+
+        for user_id, vital_id, date, value in readings:
+            row = latest.get((user_id, vital_id))
+            if row is None:
+                row = UserVitalLatest(user_id=user_id, vital_id=vital_id, latest_date=date, latest_value=value)
+                self.db.add(row)
+                latest[(user_id, vital_id)] = row
+            elif date >= row.latest_date:
+                row.latest_date = date
+                row.latest_value = value
+
+            key = (user_id, vital_id, date.date())
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = VitalDailyRollup(
+                    user_id=user_id,
+                    vital_id=vital_id,
+                    day=date.date(),
+                    value_sum=value,
+                    value_count=1,
+                    value_min=value,
+                    value_max=value,
+                    last_value=value,
+                    last_date=date
+                )
+                self.db.add(rollup)
+                rollups[key] = rollup
+            else:
+                rollup.value_sum += value
+                rollup.value_count += 1
+                rollup.value_min = min(rollup.value_min, value)
+                rollup.value_max = max(rollup.value_max, value)
+                if date >= rollup.last_date:
+                    rollup.last_value = value
+                    rollup.last_date = date
+
+        VitalRollupService(self.db).record_many(readings)
+        self.db.flush()
+
+    def latest(self, user_id: int, vital_id: int) -> Optional[UserVitalLatest]:
+        """ユーザー×カテゴリの最新値を主キーで取得する"""
+        return self.db.get(UserVitalLatest, (user_id, vital_id))
+
+    def daily(
+        self,
+        user_id: int,
+        vital_id: int,
+        start: Optional[date_type] = None,
+        end: Optional[date_type] = None
+    ) -> List[VitalDailyRollup]:
+        """ユーザー×カテゴリの日次集計を日付順に返す（start, end は両端を含む）"""
+        query = self.db.query(VitalDailyRollup).filter(
+            VitalDailyRollup.user_id == user_id,
+            VitalDailyRollup.vital_id == vital_id,
+        )
+        if start is not None:
+            query = query.filter(VitalDailyRollup.day >= start)
+        if end is not None:
+            query = query.filter(VitalDailyRollup.day <= end)
+        return query.order_by(VitalDailyRollup.day).all()
+
+    def rebuild(self, user_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        vitaldata から投影を作り直す（commit は呼び出し側で行う）
+
+        Returns:
+            Dict[str, int]: テーブルごとの作成行数（latest, daily, rollup）
+        """
+        return {
+            "latest": self.rebuild_latest(user_id),
+            "daily": self.rebuild_daily(user_id),
+            "rollup": VitalRollupService(self.db).rebuild(user_id),
+        }
+
+    def rebuild_latest(self, user_id: Optional[int] = None) -> int:
+        """user_vital_latest を vitaldata から作り直す"""
+        deletion = delete(UserVitalLatest)
+        if user_id is not None:
+            deletion = deletion.where(UserVitalLatest.user_id == user_id)
+        self.db.execute(deletion)
+        vitaldata = VitalPartitionService(self.db).source()
+        return self._insert_latest(vitaldata, vitaldata.user_id == user_id if user_id is not None else None)
+
+    def rebuild_daily(self, user_id: Optional[int] = None) -> int:
+        """vital_daily_rollup を vitaldata から作り直す"""
+        deletion = delete(VitalDailyRollup)
+        if user_id is not None:
+            deletion = deletion.where(VitalDailyRollup.user_id == user_id)
+        self.db.execute(deletion)
+        vitaldata = VitalPartitionService(self.db).source()
+        return self._insert_daily(vitaldata, vitaldata.user_id == user_id if user_id is not None else None)
+
+    def _insert_latest(self, vitaldata, condition) -> int:
+        """条件に合う vitaldata（VitalPartitionService.source のエンティティ）からユーザー×カテゴリごとの最新値を挿入する"""
+        ranked = select(
+            vitaldata.user_id.label("user_id"),
+            vitaldata.name_id.label("vital_id"),
+            vitaldata.date.label("date"),
+            vitaldata.value.label("value"),
+            func.row_number().over(
+                partition_by=(vitaldata.user_id, vitaldata.name_id),
+                order_by=(vitaldata.date.desc(), vitaldata.id.desc())
+            ).label("rn"),
+        )
+        if condition is not None:
+            ranked = ranked.where(condition)
+        ranked = ranked.subquery()
+
+        source = select(ranked.c.user_id, ranked.c.vital_id, ranked.c.date, ranked.c.value).where(ranked.c.rn == 1)
+        result = self.db.execute(
+            insert(UserVitalLatest).from_select(["user_id", "vital_id", "latest_date", "latest_value"], source)
+        )
+        return result.rowcount
+
+    def _insert_daily(self, vitaldata, condition) -> int:
+        """条件に合う vitaldata（VitalPartitionService.source のエンティティ）を日ごとに集計して挿入する"""
+        day = truncate_date("day", vitaldata.date)
+        ranked = select(
+            vitaldata.user_id.label("user_id"),
+            vitaldata.name_id.label("vital_id"),
+            day.label("day"),
+            vitaldata.date.label("date"),
+            vitaldata.value.label("value"),
+            func.row_number().over(
+                partition_by=(vitaldata.user_id, vitaldata.name_id, day),
+                order_by=(vitaldata.date.desc(), vitaldata.id.desc())
+            ).label("rn"),
+        )
+        if condition is not None:
+            ranked = ranked.where(condition)
+        ranked = ranked.subquery()
+
+        source = (
+            select(
+                ranked.c.user_id,
+                ranked.c.vital_id,
+                ranked.c.day,
+                func.sum(ranked.c.value),
+                func.count(),
+                func.min(ranked.c.value),
+                func.max(ranked.c.value),
+                func.max(case((ranked.c.rn == 1, ranked.c.value))),
+                func.max(case((ranked.c.rn == 1, ranked.c.date))),
+            )
+            .group_by(ranked.c.user_id, ranked.c.vital_id, ranked.c.day)
+        )
+        result = self.db.execute(
+            insert(VitalDailyRollup).from_select(
+                ["user_id", "vital_id", "day", "value_sum", "value_count", "value_min", "value_max", "last_value", "last_date"],
+                source
+            )
+        )
+        return result.rowcount
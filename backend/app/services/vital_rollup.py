@@ -0,0 +1,271 @@
+"""
+多段階の時系列集計サービス
+ユーザー×カテゴリごとに 時間・週・月 単位の集計を vital_rollup に書き込み時点で反映し、
+グラフ用の系列を点数の上限に合わせた粒度で返す（日単位は vital_daily_rollup を使う）
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional, Iterable, Tuple, Dict, List, Any
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, insert, delete, select, literal
+
+from models.vitaldailyrollup import VitalDailyRollup
+from models.vitalrollup import VitalRollup
+from app.services.vital_partitions import VitalPartitionService
+from app.utils.date_trunc import truncate_date
+
+
+# 細かい順（raw は vitaldata の生データ、day は vital_daily_rollup）
+RESOLUTIONS = ("raw", "hour", "day", "week", "month")
+# vital_rollup に保存する粒度
+STORED_RESOLUTIONS = ("hour", "week", "month")
+
+
+def bucket_start(resolution: str, date: datetime) -> datetime:
+    """日時が属する集計区間の開始時刻（週は月曜始まり）"""
+    if resolution == "hour":
+        return date.replace(minute=0, second=0, microsecond=0)
+    day = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return day
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown resolution: {resolution}")
+
+
+def bucket_start_sql(resolution: str, column):
+    """bucket_start と同じ区切りを SQL で求める（SQLite / PostgreSQL のどちらでも動く）"""
+    if resolution not in STORED_RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    return truncate_date(resolution, column)
+
+
+class VitalRollupService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_many(self, readings: Iterable[Tuple[int, int, datetime, float]]) -> None:
+        """
+        複数の計測値を時間・週・月の集計に反映する（commit は呼び出し側で行う）
+
+        日時は naive に揃えてから渡すこと。既存の集計行は1回のクエリでまとめて読み込む
+        """
+        readings = list(readings)
+        if not readings:
+            return
+
+        keys = {
+            (user_id, vital_id, resolution, bucket_start(resolution, date))
+            for user_id, vital_id, date, _ in readings
+            for resolution in STORED_RESOLUTIONS
+        }
+        rollups: Dict[Tuple[int, int, str, datetime], VitalRollup] = {
+            (row.user_id, row.vital_id, row.resolution, row.bucket_start): row
+            for row in self.db.query(VitalRollup).filter(
+                VitalRollup.user_id.in_({key[0] for key in keys}),
+                VitalRollup.vital_id.in_({key[1] for key in keys}),
+                VitalRollup.bucket_start.in_({key[3] for key in keys}),
+            )
+        }
+
+        for user_id, vital_id, date, value in readings:
+            for resolution in STORED_RESOLUTIONS:
+                key = (user_id, vital_id, resolution, bucket_start(resolution, date))
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = VitalRollup(
+                        user_id=user_id,
+                        vital_id=vital_id,
+                        resolution=resolution,
+                        bucket_start=key[3],
+                        value_sum=value,
+                        value_count=1,
+                        value_min=value,
+                        value_max=value,
+                        last_value=value,
+                        last_date=date
+                    )
+                    self.db.add(rollup)
+                    rollups[key] = rollup
+                else:
+                    rollup.value_sum += value
+                    rollup.value_count += 1
+                    rollup.value_min = min(rollup.value_min, value)
+                    rollup.value_max = max(rollup.value_max, value)
+                    if date >= rollup.last_date:
+                        rollup.last_value = value
+                        rollup.last_date = date
+
+    def rebuild(self, user_id: Optional[int] = None) -> int:
+        """vital_rollup を vitaldata から作り直す（commit は呼び出し側で行う）"""
+        deletion = delete(VitalRollup)
+        if user_id is not None:
+            deletion = deletion.where(VitalRollup.user_id == user_id)
+        self.db.execute(deletion)
+        # アーカイブした月も含めて作り直す
+        vitaldata = VitalPartitionService(self.db).source()
+        condition = vitaldata.user_id == user_id if user_id is not None else None
+        return sum(self._insert(resolution, vitaldata, condition) for resolution in STORED_RESOLUTIONS)
+
+    def _insert(self, resolution: str, vitaldata, condition) -> int:
+        """条件に合う vitaldata（VitalPartitionService.source のエンティティ）を指定した粒度で集計して挿入する"""
+        bucket = bucket_start_sql(resolution, vitaldata.date)
+        ranked = select(
+            vitaldata.user_id.label("user_id"),
+            vitaldata.name_id.label("vital_id"),
+            bucket.label("bucket_start"),
+            vitaldata.date.label("date"),
+            vitaldata.value.label("value"),
+            func.row_number().over(
+                partition_by=(vitaldata.user_id, vitaldata.name_id, bucket),
+                order_by=(vitaldata.date.desc(), vitaldata.id.desc())
+            ).label("rn"),
+        )
+        if condition is not None:
+            ranked = ranked.where(condition)
+        ranked = ranked.subquery()
+
+        source = (
+            select(
+                ranked.c.user_id,
+                ranked.c.vital_id,
+                literal(resolution),
+                ranked.c.bucket_start,
+                func.sum(ranked.c.value),
+                func.count(),
+                func.min(ranked.c.value),
+                func.max(ranked.c.value),
+                func.max(case((ranked.c.rn == 1, ranked.c.value))),
+                func.max(case((ranked.c.rn == 1, ranked.c.date))),
+            )
+            .group_by(ranked.c.user_id, ranked.c.vital_id, ranked.c.bucket_start)
+        )
+        result = self.db.execute(
+            insert(VitalRollup).from_select(
+                ["user_id", "vital_id", "resolution", "bucket_start", "value_sum", "value_count",
+                 "value_min", "value_max", "last_value", "last_date"],
+                source
+            )
+        )
+        return result.rowcount
+
+    def count(
+        self,
+        user_id: int,
+        vital_id: int,
+        resolution: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> int:
+        """期間内の点数（raw は日次集計の件数の合計で見積もる）"""
+        if resolution in ("raw", "day"):
+            query = self.db.query(
+                func.sum(VitalDailyRollup.value_count) if resolution == "raw" else func.count()
+            ).filter(VitalDailyRollup.user_id == user_id, VitalDailyRollup.vital_id == vital_id)
+            if start is not None:
+                query = query.filter(VitalDailyRollup.day >= start.date())
+            if end is not None:
+                query = query.filter(VitalDailyRollup.day <= end.date())
+        else:
+            query = self.db.query(func.count()).select_from(VitalRollup).filter(
+                VitalRollup.user_id == user_id,
+                VitalRollup.vital_id == vital_id,
+                VitalRollup.resolution == resolution,
+            )
+            if start is not None:
+                query = query.filter(VitalRollup.bucket_start >= bucket_start(resolution, start))
+            if end is not None:
+                query = query.filter(VitalRollup.bucket_start <= end)
+        return query.scalar() or 0
+
+    def pick_resolution(
+        self,
+        user_id: int,
+        vital_id: int,
+        max_points: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> str:
+        """点数が max_points 以下に収まる最も細かい粒度を選ぶ（収まらなければ月単位）"""
+        for resolution in RESOLUTIONS[:-1]:
+            if self.count(user_id, vital_id, resolution, start, end) <= max_points:
+                return resolution
+        return RESOLUTIONS[-1]
+
+    def series(
+        self,
+        user_id: int,
+        vital_id: int,
+        is_accumulating: bool,
+        max_points: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        resolution: Optional[str] = None
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        グラフ用の系列を返す
+
+        各点の y は 累積カテゴリなら区間の合計、それ以外は区間の平均。
+        期間の端にかかる区間は区間全体の集計値を返す
+
+        Returns:
+            Tuple[str, List[Dict[str, Any]]]: (使った粒度, 点のリスト)
+        """
+        resolution = resolution or self.pick_resolution(user_id, vital_id, max_points, start, end)
+
+        if resolution == "raw":
+            vitaldata = VitalPartitionService(self.db).source(start, end)
+            query = self.db.query(vitaldata.date, vitaldata.value).filter(
+                vitaldata.user_id == user_id,
+                vitaldata.name_id == vital_id,
+            )
+            if start is not None:
+                query = query.filter(vitaldata.date >= start)
+            if end is not None:
+                query = query.filter(vitaldata.date <= end)
+            rows = query.order_by(vitaldata.date, vitaldata.id).all()
+            return resolution, [
+                {"x": date, "y": value, "min": value, "max": value, "count": 1}
+                for date, value in rows
+            ]
+
+        if resolution == "day":
+            query = self.db.query(
+                VitalDailyRollup.day, VitalDailyRollup.value_sum, VitalDailyRollup.value_count,
+                VitalDailyRollup.value_min, VitalDailyRollup.value_max
+            ).filter(VitalDailyRollup.user_id == user_id, VitalDailyRollup.vital_id == vital_id)
+            if start is not None:
+                query = query.filter(VitalDailyRollup.day >= start.date())
+            if end is not None:
+                query = query.filter(VitalDailyRollup.day <= end.date())
+            rows = [
+                (datetime.combine(day, datetime.min.time()), *values)
+                for day, *values in query.order_by(VitalDailyRollup.day)
+            ]
+        else:
+            query = self.db.query(
+                VitalRollup.bucket_start, VitalRollup.value_sum, VitalRollup.value_count,
+                VitalRollup.value_min, VitalRollup.value_max
+            ).filter(
+                VitalRollup.user_id == user_id,
+                VitalRollup.vital_id == vital_id,
+                VitalRollup.resolution == resolution,
+            )
+            if start is not None:
+                query = query.filter(VitalRollup.bucket_start >= bucket_start(resolution, start))
+            if end is not None:
+                query = query.filter(VitalRollup.bucket_start <= end)
+            rows = query.order_by(VitalRollup.bucket_start).all()
+
+        return resolution, [
+            {
+                "x": x,
+                "y": total if is_accumulating else total / count,
+                "min": value_min,
+                "max": value_max,
+                "count": count,
+            }
+            for x, total, count, value_min, value_max in rows
+        ]
@@ -1,14 +1,18 @@
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
 import secrets
+import time
 
 from app.config import settings
-from settings import get_db
-from models.users import User
+from app.database.routing import LAST_WRITE_COOKIE, parse_last_write
+from settings import get_async_db, get_async_read_session
+from models.users import User, USER_COLUMN_GROUPS
+from app.utils.user_cache import token_cache, user_cache
 
 security = HTTPBearer()
 
@@ -22,19 +26,85 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def decode_user_id(credentials: HTTPAuthorizationCredentials) -> int:
+    """JWT を検証してユーザーID（sub）を取り出す（検証済みのトークンは有効期限までキャッシュする）"""
+    token = credentials.credentials
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
     try:
-        payload = jwt.decode(credentials.credentials, settings.secret_key, algorithms=[settings.algorithm])
-        user_id: int = payload.get("sub")
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    except jwt.PyJWTError:
+        user_id = int(user_id)
+    except (jwt.PyJWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    if expires_in is None or expires_in > 0:
+        token_cache.set(token, user_id, ttl=expires_in)
+    return user_id
+
+def load_user(db: Session, user_id: int, columns) -> User:
+    """
+    指定した列だけを読み込んだ User を返す（キャッシュにあれば DB に問い合わせない）
+
+    キャッシュの値から作った User もセッションに属する。AsyncSession では遅延ロードできないため、
+    エンドポイントで参照する列は current_user_with() のグループで読み込んでおく
+    """
+    keys = [column.key for column in columns]
+    values = user_cache.get_columns(user_id, keys)
+    if values is None:
+        row = db.query(*columns).filter(User.id == user_id).first()
+        if row is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        values = dict(zip(keys, row))
+        user_cache.merge_columns(user_id, values)
+
+    # このセッションで commit した書き込みを、ユーザーの書き込みとして記録する（app/database/routing.py）
+    db.info["user_id"] = user_id
+    user = User(**{key: values[key] for key in keys})
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)):
+    """全列を読み込んだ User を返す（チャットなどユーザー情報を広く使うエンドポイント向け）"""
+    return await db.run_sync(load_user, decode_user_id(credentials), list(User.__table__.columns))
+
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)) -> int:
+    """ユーザーIDだけが必要なエンドポイント向け（ユーザーが存在することだけを確認する）"""
+    user_id = decode_user_id(credentials)
+    await db.run_sync(load_user, user_id, USER_COLUMN_GROUPS["identity"])
+    return user_id
+
+async def get_async_read_db(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    読み取り専用エンドポイント用のセッション（レプリカ、直近に書き込んだユーザーは primary）
+
+    他のワーカーでの書き込みは Cookie の書き込み時刻で判定する（app/database/routing.py）。
+    ユーザーの存在確認は get_current_user_id などの依存関数が primary のセッションで行う
+    """
+    last_write = parse_last_write(request.cookies.get(LAST_WRITE_COOKIE))
+    async for db in get_async_read_session(decode_user_id(credentials), last_write):
+        yield db
+
+def current_user_with(*groups: str):
+    """
+    指定した列グループ（models.users.USER_COLUMN_GROUPS）だけを読み込む依存関数を作る
+
+        current_user: User = Depends(current_user_with("profile"))
+
+    グループを指定しなければ id だけを読み込む（読み込んでいない列は参照できない）
+    """
+    columns = [column for group in ("identity",) + groups for column in USER_COLUMN_GROUPS[group]]
+
+    async def dependency(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)) -> User:
+        return await db.run_sync(load_user, decode_user_id(credentials), columns)
+
+    return dependency
+
+# id だけを読み込んだ User（current_user.id しか使わないエンドポイント向け）
+get_current_principal = current_user_with()
 
 def generate_otp():
     return str(secrets.randbelow(1000000)).zfill(6)
\ No newline at end of file
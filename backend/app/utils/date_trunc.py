@@ -0,0 +1,66 @@
+"""
+DB に依存しない日時の切り捨て（集計区間の開始時刻）
+
+SQLite には date_trunc がないため strftime で DateTime 列と同じ文字列形式を作り、
+PostgreSQL では date_trunc / CAST を使う。どちらも Python 側の bucket_start と同じ区切り（週は月曜始まり）になる
+"""
+
+from sqlalchemy import Date, DateTime
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+
+# 切り捨てできる単位
+UNITS = ("hour", "day", "week", "month")
+
+# SQLite の strftime の書式と修飾子（DateTime 列は 'YYYY-MM-DD HH:MM:SS.ffffff' の文字列で保存される）
+SQLITE_FORMATS = {
+    "hour": ("%Y-%m-%d %H:00:00.000000",),
+    # 'weekday 0' で次の日曜（日曜ならその日）に進めてから6日戻すと月曜になる
+    "week": ("%Y-%m-%d 00:00:00.000000", "weekday 0", "-6 days"),
+    "month": ("%Y-%m-01 00:00:00.000000",),
+}
+
+
+class truncate_date(FunctionElement):
+    """
+    日時を unit（hour / day / week / month）の区間の開始に切り捨てる
+
+    day は Date、それ以外は DateTime を返す
+    """
+    inherit_cache = True
+    # unit は SQL の文字列に埋め込むため、文のキャッシュキーに含める
+    _traverse_internals = FunctionElement._traverse_internals + [("unit", InternalTraversal.dp_string)]
+
+    def __init__(self, unit: str, column):
+        if unit not in UNITS:
+            raise ValueError(f"Unknown unit: {unit}")
+        self.unit = unit
+        self.type = Date() if unit == "day" else DateTime()
+        super().__init__(column)
+
+
+@compiles(truncate_date, "sqlite")
+def compile_sqlite(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    if element.unit == "day":
+        return f"date({column})"
+    arguments = ", ".join(f"'{argument}'" for argument in SQLITE_FORMATS[element.unit][1:])
+    fmt = SQLITE_FORMATS[element.unit][0]
+    return f"strftime('{fmt}', {column}{', ' + arguments if arguments else ''})"
+
+
+@compiles(truncate_date, "postgresql")
+def compile_postgresql(element, compiler, **kw):
+    column = compiler.process(element.clauses, **kw)
+    if element.unit == "day":
+        return f"CAST({column} AS DATE)"
+    # PostgreSQL の week は ISO 週（月曜始まり）
+    return f"date_trunc('{element.unit}', {column})"
+
+
+@compiles(truncate_date)
+def compile_default(element, compiler, **kw):
+    raise CompileError(f"truncate_date is not supported on {compiler.dialect.name}")
@@ -0,0 +1,54 @@
+"""
+時系列データの間引き
+グラフ表示用に点数を減らしても形が崩れにくい LTTB（Largest-Triangle-Three-Buckets）を使う
+"""
+
+from datetime import datetime
+from typing import List, Sequence, Tuple
+
+Point = Tuple[datetime, float]
+
+
+def lttb(points: Sequence[Point], threshold: int) -> List[Point]:
+    """
+    点列を threshold 点に間引く（最初と最後の点は必ず残す）
+
+    points は x（日時）の昇順に並んでいること。threshold 以下の点数ならそのまま返す
+    """
+    count = len(points)
+    if threshold >= count or count <= 2:
+        return list(points)
+    if threshold < 3:
+        return [points[0], points[-1]][:max(threshold, 1)]
+
+    xs = [point[0].timestamp() for point in points]
+    ys = [point[1] for point in points]
+
+    sampled = [points[0]]
+    # 最初と最後を除いた点を threshold - 2 個のバケットに分ける
+    every = (count - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # 次のバケットの平均点
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, count)
+        next_len = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / next_len
+        avg_y = sum(ys[next_start:next_end]) / next_len
+
+        # 現在のバケットから、前に選んだ点・次のバケットの平均点と作る三角形が最大の点を選ぶ
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        max_area = -1.0
+        chosen = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                chosen = j
+        sampled.append(points[chosen])
+        a = chosen
+
+    sampled.append(points[-1])
+    return sampled
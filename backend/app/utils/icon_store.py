@@ -0,0 +1,72 @@
+"""
+アイコン画像のファイルストア
+内容の sha256 をファイル名にして保存する（同じ画像は1ファイルにまとまる）
+
+    <root>/ab/cd/abcd...（64桁の16進ハッシュ）
+"""
+
+import os
+import tempfile
+from typing import Optional
+
+from app.utils.icons import icon_hash
+
+DEFAULT_ROOT = os.environ.get("ICON_STORE_DIR", "./icon_store")  # プロジェクトルート直下
+
+
+class IconStore:
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+
+    def path(self, hash_value: str) -> str:
+        """ハッシュに対応するファイルパス"""
+        return os.path.join(self.root, hash_value[:2], hash_value[2:4], hash_value)
+
+    def exists(self, hash_value: Optional[str]) -> bool:
+        return bool(hash_value) and os.path.isfile(self.path(hash_value))
+
+    def put(self, data: bytes) -> str:
+        """
+        画像を保存してハッシュを返す（同じ内容が既にあれば書き込まない）
+
+        一時ファイルに書いてから rename するので、読み出し側が書きかけのファイルを見ることはない
+        """
+        hash_value = icon_hash(data)
+        path = self.path(hash_value)
+        if os.path.isfile(path):
+            return hash_value
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return hash_value
+
+    def read(self, hash_value: Optional[str]) -> Optional[bytes]:
+        """画像を読み出す（ハッシュが空、またはファイルがなければ None）"""
+        if not self.exists(hash_value):
+            return None
+        with open(self.path(hash_value), "rb") as f:
+            return f.read()
+
+    def head(self, hash_value: str, size: int = 16) -> bytes:
+        """Content-Type 判定用に先頭のバイトだけ読む"""
+        with open(self.path(hash_value), "rb") as f:
+            return f.read(size)
+
+    def delete(self, hash_value: str) -> None:
+        """
+        ファイルを削除する
+
+        同じ画像を複数のユーザーが共有していることがあるため、参照がなくなったことを
+        呼び出し側で確認してから使う
+        """
+        if self.exists(hash_value):
+            os.remove(self.path(hash_value))
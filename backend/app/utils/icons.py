@@ -0,0 +1,57 @@
+import base64
+import hashlib
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image, UnidentifiedImageError
+
+THUMBNAIL_SIZE = (128, 128)
+
+def encode_icon(icon) -> Optional[str]:
+    """アイコンを JSON で返せる base64 文字列にする"""
+    if not icon:
+        return None
+    if isinstance(icon, bytes):
+        return base64.b64encode(icon).decode('utf-8')
+    return icon
+
+def icon_hash(data: bytes) -> str:
+    """アイコンの内容から ETag / キャッシュキーに使うハッシュを求める"""
+    return hashlib.sha256(data).hexdigest()
+
+def icon_url(user_id: int, hash_value: Optional[str], thumbnail: bool = False) -> Optional[str]:
+    """アイコン取得エンドポイントの URL（内容が変わると URL も変わる）"""
+    if not hash_value:
+        return None
+    size = "thumb" if thumbnail else "full"
+    return f"/user/{user_id}/icon/?size={size}&v={hash_value[:16]}"
+
+def icon_media_type(data: bytes) -> str:
+    """先頭バイトから画像の Content-Type を判定する"""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+def make_thumbnail(data: bytes) -> Optional[bytes]:
+    """
+    一覧表示用の小さなサムネイルを作る
+
+    画像として読めない場合は None を返す（元のアイコンをそのまま配信する）
+    """
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            output = BytesIO()
+            if image.mode in ("RGBA", "LA", "P"):
+                image.save(output, format="PNG", optimize=True)
+            else:
+                image.convert("RGB").save(output, format="JPEG", quality=85, optimize=True)
+            return output.getvalue()
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
@@ -0,0 +1,14 @@
+"""
+接続先の DB に合わせた INSERT 文
+ON CONFLICT（重複時に何もしない・更新する）は SQLite と PostgreSQL の方言の insert でしか書けない
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, table):
+    """on_conflict_do_nothing / on_conflict_do_update が使える insert 文を返す"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
@@ -0,0 +1,114 @@
+"""
+認証ユーザーのプロセス内キャッシュ
+トークンの検証結果とユーザー行の列の値を、件数上限（LRU）と有効期限（TTL）付きで保持する
+
+キャッシュはプロセスごとに独立しているため、複数プロセスで動かす場合は
+他のプロセスでの更新が最大 TTL 秒遅れて反映される
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "60"))
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, accept: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """値を返す（期限切れ、または accept が False を返す場合はミス）"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None or (accept is not None and not accept(entry[1])):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class UserCache(TTLCache):
+    """
+    ユーザーID → 列の値（{列名: 値}）のキャッシュ
+
+    load_only で一部の列だけを読んだ場合もその列だけを保持し、
+    必要な列がそろっているときだけヒットとして扱う
+    """
+
+    def get_columns(self, user_id: int, keys: Iterable[str]) -> Optional[Dict[str, Any]]:
+        keys = tuple(keys)
+        return self.get(user_id, accept=lambda values: all(key in values for key in keys))
+
+    def merge_columns(self, user_id: int, values: Dict[str, Any]) -> None:
+        """既にキャッシュしている列の値に新しく読んだ列を加える（有効期限は延ばさない）"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries[user_id] = (entry[0], {**entry[1], **values})
+                self._entries.move_to_end(user_id)
+                return
+        self.set(user_id, values)
+
+
+# トークン文字列 → (ユーザーID, 有効期限の UNIX 時刻)
+token_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+
+def invalidate_user(*user_ids: int) -> None:
+    """ユーザーの情報を変更したときに呼ぶ（commit の後）"""
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
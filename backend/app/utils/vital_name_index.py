@@ -0,0 +1,215 @@
+"""
+自由入力のカテゴリ名（エージェントの関数呼び出し・API のパラメータ）をカテゴリに解決する索引
+
+次の順に解決し、最初に見つかったものを返す
+
+1. exact: 名前の完全一致（app/utils/vital_names.py の辞書）
+2. normalized: 正規化した名前の一致（NFKC・小文字化・カタカナ → ひらがな・区切り文字と「1日の」「weekly」などの修飾語の除去）
+3. alias: 同義語（SYNONYMS の同じグループの名前。例: steps / 歩数 / ほすう）
+4. fuzzy: 正規化した名前の文字 trigram の類似度（Jaccard）が FUZZY_THRESHOLD 以上で最も高いもの
+
+索引はプロセス内に1つだけ持ち、カテゴリ辞書の version が変わったときだけ作り直す
+"""
+
+import re
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.utils.vital_names import VitalNameVocabulary, vital_names
+
+
+# trigram の類似度がこの値以上の候補だけを fuzzy の一致とする（pg_trgm の既定値と同じ）
+FUZZY_THRESHOLD = 0.3
+
+# 同じ意味のカテゴリ名のグループ（登録済みのカテゴリ名がグループに含まれれば、グループの他の名前もそのカテゴリに解決する）
+SYNONYMS: List[Tuple[str, ...]] = [
+    ("歩数", "ほすう", "歩", "歩行数", "ステップ数", "ステップ", "steps", "step count", "walking steps"),
+    ("体重", "たいじゅう", "ウェイト", "ウエイト", "weight", "body weight", "bodyweight"),
+    ("身長", "しんちょう", "height", "body height"),
+    ("睡眠時間", "睡眠", "すいみん", "sleep", "sleep time", "sleep hours", "sleep duration"),
+    ("心拍数", "心拍", "脈拍", "しんぱくすう", "heart rate", "heartrate", "pulse", "bpm"),
+    ("血圧", "けつあつ", "blood pressure"),
+    ("体温", "たいおん", "body temperature", "temperature"),
+    ("体脂肪率", "体脂肪", "たいしぼう", "body fat", "body fat percentage"),
+    ("水分", "水分量", "飲水量", "すいぶん", "water", "water intake", "hydration"),
+    ("カロリー", "calories", "calorie", "kcal"),
+    ("消費カロリー", "calories burned", "burned calories", "active calories", "active energy"),
+    ("摂取カロリー", "calorie intake", "intake calories"),
+    ("距離", "きょり", "distance", "walking distance"),
+    ("運動時間", "exercise", "exercise time", "workout", "workout time"),
+    ("血糖値", "けっとうち", "blood sugar", "blood glucose", "glucose"),
+]
+
+SEPARATORS = re.compile(r"[\s_\-・/.,、。:：()（）\[\]「」]+")
+# 区切り文字で分けた英単語のうち、期間・集計の修飾語として除く単語
+WORD_MODIFIERS = {"daily", "weekly", "monthly", "total", "average", "avg", "my", "per", "day", "week", "month", "today"}
+# 名前の先頭・末尾から除く修飾語（長いものから順に試す）
+PREFIX_MODIFIERS = sorted(
+    ("1日の", "1日", "一日の", "一日", "毎日の", "毎日", "今日の", "1週間の", "1週間", "一週間の", "一週間", "週間", "週の", "月間",
+     "daily", "weekly", "monthly", "total", "average"),
+    key=len, reverse=True,
+)
+SUFFIX_MODIFIERS = sorted(("の合計", "合計", "の平均", "平均", "count", "total"), key=len, reverse=True)
+KATAKANA = {code: code - 0x60 for code in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+@lru_cache(maxsize=4096)
+def normalize_name(text: str) -> str:
+    """カテゴリ名を比較用に正規化する（全角・半角、大文字・小文字、カタカナ・ひらがな、区切り文字と修飾語の違いをなくす）"""
+    text = unicodedata.normalize("NFKC", text).casefold().translate(KATAKANA)
+    words = [word for word in SEPARATORS.split(text) if word]
+    # 修飾語だけの名前（"weekly" など）はそのまま残す
+    text = "".join([word for word in words if word not in WORD_MODIFIERS] or words)
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in PREFIX_MODIFIERS:
+            if text.startswith(prefix) and len(text) > len(prefix):
+                text, stripped = text[len(prefix):], True
+                break
+        for suffix in SUFFIX_MODIFIERS:
+            if text.endswith(suffix) and len(text) > len(suffix):
+                text, stripped = text[:-len(suffix)], True
+                break
+    # 英語の複数形（steps → step）
+    if text.isascii() and len(text) > 3 and text.endswith("s") and not text.endswith("ss"):
+        text = text[:-1]
+    return text
+
+
+def trigrams(text: str) -> Set[str]:
+    """前に空白2つ、後ろに空白1つを足した文字 trigram（pg_trgm と同じ区切り方）"""
+    padded = f"  {text} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class NameMatch:
+    """解決したカテゴリ（method は exact / normalized / alias / fuzzy、score は fuzzy の類似度、それ以外は 1.0）"""
+
+    def __init__(self, vital_id: int, name: str, method: str, score: float = 1.0):
+        self.vital_id = vital_id
+        self.name = name
+        self.method = method
+        self.score = score
+
+    def __repr__(self):
+        return f"<NameMatch(vital_id={self.vital_id}, name={self.name}, method={self.method}, score={self.score:.2f})>"
+
+
+class VitalNameIndex:
+    def __init__(self, vocabulary: VitalNameVocabulary):
+        self.vocabulary = vocabulary
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._names: Dict[int, str] = {}
+        self._by_normalized: Dict[str, int] = {}
+        self._by_alias: Dict[str, int] = {}
+        # fuzzy 用: 正規化した名前（カテゴリ名と同義語）ごとの (カテゴリ ID, trigram の数) と trigram → 名前の転置索引
+        self._entries: Dict[str, Tuple[int, int]] = {}
+        self._postings: Dict[str, List[str]] = {}
+
+    def resolve(self, db: Session, text: str, fuzzy: bool = True) -> Optional[NameMatch]:
+        """
+        自由入力の名前をカテゴリに解決する（見つからなければ None）
+
+        完全一致・正規化・同義語はプロセス内の辞書と索引だけで解決する。
+        類似度で選ぶ前に1回だけ DB で完全一致を確かめる（他のプロセスで作成されたカテゴリを取り違えないため）。
+        fuzzy が False の場合は類似度では解決しない（登録・作成などの書き込み。取り違えると別のカテゴリに書き込んでしまうため）
+        """
+        if not text:
+            return None
+        self._refresh(db)
+        vital_id = self.vocabulary.get_id(text)
+        if vital_id is not None:
+            return NameMatch(vital_id, text, "exact")
+        key = normalize_name(text)
+        for method, mapping in (("normalized", self._by_normalized), ("alias", self._by_alias)):
+            vital_id = mapping.get(key)
+            if vital_id is not None:
+                return NameMatch(vital_id, self._names[vital_id], method)
+
+        vital_id = self.vocabulary.id_for(db, text)
+        if vital_id is not None:
+            return NameMatch(vital_id, text, "exact")
+        if not fuzzy:
+            return None
+        candidates = self._similar(key)
+        if not candidates:
+            return None
+        # 最も近い候補が別々のカテゴリで同点の場合は取り違えないよう解決しない
+        best_score = candidates[0][1]
+        best_ids = {vital_id for vital_id, score in candidates if score == best_score}
+        if best_score < FUZZY_THRESHOLD or len(best_ids) > 1:
+            return None
+        vital_id = candidates[0][0]
+        return NameMatch(vital_id, self._names[vital_id], "fuzzy", best_score)
+
+    def suggestions(self, db: Session, text: str, limit: int = 3) -> List[str]:
+        """似ているカテゴリ名を類似度の高い順に返す（解決できなかったときのエラーメッセージ用）"""
+        self._refresh(db)
+        names = []
+        for vital_id, _ in self._similar(normalize_name(text or "")):
+            name = self._names[vital_id]
+            if name not in names:
+                names.append(name)
+            if len(names) >= limit:
+                break
+        return names
+
+    def _similar(self, key: str) -> List[Tuple[int, float]]:
+        """trigram を1つ以上共有する (カテゴリ ID, 類似度) を類似度の高い順に返す（カテゴリごとに最も高い値）"""
+        query = trigrams(key)
+        shared = Counter(entry for gram in query for entry in self._postings.get(gram, ()))
+        best: Dict[int, float] = {}
+        for entry, count in shared.items():
+            vital_id, size = self._entries[entry]
+            score = count / (len(query) + size - count)
+            if score > best.get(vital_id, 0.0):
+                best[vital_id] = score
+        return sorted(best.items(), key=lambda item: (-item[1], item[0]))
+
+    def _refresh(self, db: Session) -> None:
+        """カテゴリ辞書の version が変わっていれば索引を作り直す"""
+        # 先に version を読む（読み込みの途中でカテゴリが増えても次の呼び出しで作り直される）
+        version = self.vocabulary.version
+        if version == self._version and self.vocabulary.loaded:
+            return
+        categories = self.vocabulary.items(db)
+        names = dict(categories)
+        # 同じ名前に正規化されるカテゴリが複数あれば ID の小さいほうを使う
+        by_normalized: Dict[str, int] = {}
+        for vital_id, name in categories:
+            by_normalized.setdefault(normalize_name(name), vital_id)
+        by_alias: Dict[str, int] = {}
+        for group in SYNONYMS:
+            keys = [normalize_name(name) for name in group]
+            vital_id = next((by_normalized[key] for key in keys if key in by_normalized), None)
+            if vital_id is not None:
+                for key in keys:
+                    by_alias.setdefault(key, vital_id)
+
+        entries: Dict[str, Tuple[int, int]] = {}
+        postings: Dict[str, List[str]] = {}
+        for key, vital_id in list(by_normalized.items()) + list(by_alias.items()):
+            if key in entries:
+                continue
+            grams = trigrams(key)
+            entries[key] = (vital_id, len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(key)
+
+        with self._lock:
+            self._names = names
+            self._by_normalized = by_normalized
+            self._by_alias = by_alias
+            self._entries = entries
+            self._postings = postings
+            self._version = version
+
+
+vital_name_index = VitalNameIndex(vital_names)
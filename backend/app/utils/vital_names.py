@@ -0,0 +1,124 @@
+"""
+カテゴリ名（vitaldataname）と ID の対応のプロセス内辞書
+
+起動時（app/main.py の lifespan）に全件を読み込み、このプロセスでカテゴリを作成したときは commit の後に add() で加える。
+全件の読み込み（vitaldataname の全件スキャン）は load() を呼んだときだけ行い、リクエストの中では行わない。
+辞書にない名前・ID だけを索引で DB に問い合わせる（他のプロセスで作成されたカテゴリも最初の1回で辞書に入る）。
+カテゴリは名前の変更・削除をしないため、読み込んだ対応が古くなることはない
+
+version は辞書の内容が変わるたびに増える（辞書から作る索引を作り直す目安にする）
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.vitaldataname import VitalDataName
+
+
+class VitalNameVocabulary:
+    def __init__(self):
+        self._id_by_name: Dict[str, int] = {}
+        self._name_by_id: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, db: Session) -> int:
+        """全カテゴリを読み込み直す（起動時に呼ぶ）。読み込んだ件数を返す"""
+        rows = db.execute(select(VitalDataName.id, VitalDataName.name)).all()
+        with self._lock:
+            self._id_by_name = {name: vital_id for vital_id, name in rows}
+            self._name_by_id = {vital_id: name for vital_id, name in rows}
+            self.loaded = True
+            self.version += 1
+        return len(rows)
+
+    def add(self, vital_id: int, name: str) -> None:
+        """作成したカテゴリを辞書に加える（commit の後に呼ぶ）"""
+        with self._lock:
+            if self._name_by_id.get(vital_id) == name:
+                return
+            self._id_by_name[name] = vital_id
+            self._name_by_id[vital_id] = name
+            self.version += 1
+
+    def invalidate(self) -> None:
+        """辞書を捨てる（次に引いたときに全件を読み込み直す）"""
+        with self._lock:
+            self._id_by_name = {}
+            self._name_by_id = {}
+            self.loaded = False
+            self.version += 1
+
+    def get_id(self, name: str) -> Optional[int]:
+        """辞書だけを引く（DB には問い合わせない）"""
+        return self._id_by_name.get(name)
+
+    def id_for(self, db: Session, name: str) -> Optional[int]:
+        """名前 → ID（辞書になければ DB に問い合わせ、なければ None）"""
+        return self.ids_for(db, [name]).get(name)
+
+    def ids_for(self, db: Session, names: Iterable[str]) -> Dict[str, int]:
+        """名前 → ID（辞書にない名前だけを1回のクエリで問い合わせ、見つかった名前だけを返す）"""
+        names = set(names)
+        missing = self._missing(names, by_name=True)
+        if missing:
+            self._fetch(db, VitalDataName.name.in_(missing))
+        return {name: self._id_by_name[name] for name in names if name in self._id_by_name}
+
+    def name_for(self, db: Session, vital_id: int) -> Optional[str]:
+        """ID → 名前（辞書になければ DB に問い合わせ、なければ None）"""
+        return self.names_for(db, [vital_id]).get(vital_id)
+
+    def names_for(self, db: Session, ids: Iterable[int]) -> Dict[int, str]:
+        """ID → 名前（辞書にない ID だけを1回のクエリで問い合わせ、見つかった ID だけを返す）"""
+        ids = set(ids)
+        missing = self._missing(ids, by_name=False)
+        if missing:
+            self._fetch(db, VitalDataName.id.in_(missing))
+        return {vital_id: self._name_by_id[vital_id] for vital_id in ids if vital_id in self._name_by_id}
+
+    def items(self, db: Session) -> List[Tuple[int, str]]:
+        """全カテゴリの (ID, 名前) を ID 順に返す（DB には問い合わせない。未読み込みなら RuntimeError）"""
+        if not self.loaded:
+            raise RuntimeError("カテゴリ辞書が読み込まれていません（起動時に vital_names.load() を呼んでください）")
+        self._count(1, 0)
+        with self._lock:
+            return sorted(self._name_by_id.items())
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._name_by_id),
+                "loaded": self.loaded,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _missing(self, keys: set, by_name: bool) -> set:
+        """辞書にないキー（DB に問い合わせる分。未読み込みでも全件は読み込まない）"""
+        mapping = self._id_by_name if by_name else self._name_by_id
+        missing = {key for key in keys if key not in mapping}
+        self._count(len(keys) - len(missing), len(missing))
+        return missing
+
+    def _fetch(self, db: Session, condition) -> None:
+        """辞書にないカテゴリを読み込んで加える"""
+        for vital_id, name in db.execute(select(VitalDataName.id, VitalDataName.name).where(condition)):
+            self.add(vital_id, name)
+
+    def _count(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+
+vital_names = VitalNameVocabulary()
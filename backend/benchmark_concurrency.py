@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+同時接続時のレイテンシ計測ツール
+
+重いエンドポイント（統計・ライフログ）と軽いエンドポイント（/user/id/）を並列に呼び出し、
+エンドポイントごとの p50 / p95 / p99 を表示します。
+クエリの待ち時間にイベントループが止まっていると、軽いエンドポイントの p99 が重い方に引きずられます。
+
+    python benchmark_concurrency.py --user-id 1 --vital-name 体重
+    python benchmark_concurrency.py --concurrency 64 --requests 1000
+    python benchmark_concurrency.py --base-url http://localhost:8000   # 起動中のサーバーに対して計測
+
+--base-url を省略した場合はアプリをプロセス内（ASGI）で呼び出します。
+"""
+
+import argparse
+import asyncio
+import math
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple, Any
+
+import httpx
+
+from settings import async_engine
+from app.main import app
+from app.utils.auth import create_access_token
+
+
+# (ラベル, パス, クエリパラメータ)
+WORKLOAD: List[Tuple[str, str, Dict[str, Any]]] = [
+    ("fast  /user/id/", "/user/id/", {}),
+    ("slow  /vitaldata/statistics/histogram/", "/vitaldata/statistics/histogram/", {"start_age": 14, "end_age": 80, "split_by_sex": True}),
+    ("fast  /user/id/", "/user/id/", {}),
+    ("slow  /vitaldata/life-logs/", "/vitaldata/life-logs/", {}),
+]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """p パーセンタイル（最近傍法）"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+async def run(client: httpx.AsyncClient, vital_name: str, concurrency: int, total: int) -> Dict[str, List[float]]:
+    """total 件のリクエストを concurrency 並列で送り、ラベルごとのレイテンシ（ミリ秒）を返す"""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            label, path, params = WORKLOAD[index % len(WORKLOAD)]
+            if path.startswith("/vitaldata/statistics/"):
+                params = {"vital_name": vital_name, **params}
+            started = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies[label].append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    if errors:
+        print(f"⚠️  {errors} 件のリクエストがエラーになりました")
+    return latencies
+
+
+async def main_async(args) -> None:
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(args.user_id)})}"}
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, headers=headers, timeout=60)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", headers=headers, timeout=60)
+
+    async with client:
+        # ウォームアップ（接続・キャッシュの初期化を計測に含めない）
+        await run(client, args.vital_name, concurrency=1, total=len(WORKLOAD))
+
+        print(f"🚀 {args.requests} リクエストを {args.concurrency} 並列で送信します...")
+        started = time.perf_counter()
+        latencies = await run(client, args.vital_name, args.concurrency, args.requests)
+        elapsed = time.perf_counter() - started
+    # プールに残った接続を閉じる（aiosqlite の接続スレッドが残るとプロセスが終了しない）
+    await async_engine.dispose()
+
+    print(f"\n📊 {args.requests / elapsed:.1f} リクエスト/秒 ({elapsed:.2f} 秒)")
+    print(f"{'endpoint':<42}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for label, values in latencies.items():
+        print(
+            f"{label:<42}{len(values):>7}{percentile(values, 50):>10.1f}"
+            f"{percentile(values, 95):>10.1f}{percentile(values, 99):>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="並列負荷時のエンドポイントごとのレイテンシを計測します")
+    parser.add_argument("--user-id", type=int, default=1, help="呼び出しに使うユーザーID")
+    parser.add_argument("--vital-name", default="体重", help="統計エンドポイントに渡すバイタル名")
+    parser.add_argument("--concurrency", type=int, default=32, help="同時に送るリクエスト数")
+    parser.add_argument("--requests", type=int, default=400, help="送信するリクエストの総数")
+    parser.add_argument("--base-url", help="起動中のサーバーの URL（省略時はプロセス内で呼び出す）")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
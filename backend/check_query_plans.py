@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+ホットパスのクエリプラン確認ツール
+
+主要な参照系エンドポイントをアプリ内で呼び出して発行された SQL を収集し、
+SQLite の EXPLAIN QUERY PLAN で全件スキャン（SCAN <table>）になっていないか確認します。
+全件スキャンが見つかった場合は終了コード 1 を返します。
+
+    python check_query_plans.py --user-id 3
+"""
+
+import argparse
+import sys
+from typing import List, Tuple, Dict, Any
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, inspect
+
+from settings import engine, async_engine
+from app.main import app
+from app.utils.auth import create_access_token
+
+
+# (パス, クエリパラメータ)
+HOT_ENDPOINTS: List[Tuple[str, Dict[str, Any]]] = [
+    ("/user/profile/", {}),
+    ("/vitaldata/me/", {}),
+    ("/vitaldata/life-logs/", {}),
+    ("/vitaldata/my-categories/", {}),
+    ("/vitaldata/statistics/", {"start_age": 20, "end_age": 40}),
+    ("/vitaldata/statistics/", {"start_age": 20, "end_age": 40, "sex": True}),
+    ("/vitaldata/statistics/histogram/", {"start_age": 14, "end_age": 72, "split_by_sex": True}),
+    ("/objectives/", {}),
+    ("/friends/", {}),
+    ("/chat/conversations/", {}),
+]
+
+
+def collect_statements(user_id: int, vital_name: str) -> List[Tuple[str, Any]]:
+    """エンドポイントを呼び出して発行された SELECT 文を収集する"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    # 起動処理（カテゴリ辞書の全件読み込み）はリクエストの外なので、収集を始める前に済ませておく
+    with TestClient(app) as client:
+        # アプリのクエリは非同期 engine（の内部の同期 engine）を通る
+        event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            token = create_access_token(data={"sub": str(user_id)})
+            headers = {"Authorization": f"Bearer {token}"}
+            for path, params in HOT_ENDPOINTS:
+                if path.startswith("/vitaldata/statistics/"):
+                    params = {"vital_name": vital_name, **params}
+                response = client.get(path, params=params, headers=headers)
+                print(f"  {response.status_code} GET {path} {params or ''}")
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    # 同じ SQL は1回だけ確認する
+    unique = {}
+    for statement, parameters in statements:
+        unique.setdefault(statement, parameters)
+    return list(unique.items())
+
+
+def find_full_scans(statements: List[Tuple[str, Any]]) -> List[Tuple[str, str]]:
+    """EXPLAIN QUERY PLAN の結果から索引を使わない SCAN を探す"""
+    full_scans = []
+    with engine.connect() as conn:
+        tables = set(inspect(conn).get_table_names())
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            for row in plan:
+                detail = row[-1]
+                # サブクエリ結果（anon_1 など）や CTE の走査は対象外
+                if detail.startswith("SCAN ") and "USING" not in detail and detail.split()[1] in tables:
+                    full_scans.append((detail, statement))
+    return full_scans
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ホットパスのクエリが全件スキャンしていないか確認します")
+    parser.add_argument("--user-id", type=int, default=1, help="呼び出しに使うユーザーID")
+    parser.add_argument("--vital-name", default="体重", help="統計エンドポイントに渡すバイタル名")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "sqlite":
+        print(f"⚠️  このツールは SQLite 専用です（現在: {engine.dialect.name}）")
+        return 0
+
+    print("🔍 エンドポイントを呼び出しています...")
+    statements = collect_statements(args.user_id, args.vital_name)
+    print(f"📋 {len(statements)} 種類の SELECT 文を確認します")
+
+    full_scans = find_full_scans(statements)
+    if not full_scans:
+        print("✅ 全件スキャンは見つかりませんでした")
+        return 0
+
+    print(f"❌ {len(full_scans)} 件の全件スキャンが見つかりました")
+    for detail, statement in full_scans:
+        print("-" * 60)
+        print(detail)
+        print(" ".join(statement.split()))
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+読み取りレプリカへの振り分けと read-your-writes を確認するスクリプト
+
+一時ファイルの SQLite を2つ（primary とそのコピーのレプリカ）用意し、アプリをプロセス内（ASGI）で呼び出します。
+レプリカには書き込みが反映されない（遅延し続けている）状態にして、次を確認します。
+
+    1. 書き込んだ直後のユーザーの読み取りは primary に送られ、自分の書き込みが見える
+    2. プロセス内の記録がない別のワーカーでも、書き込み時刻の Cookie で primary に送られる
+    3. 他のユーザーの読み取りはレプリカに送られる（まだ反映されていない）
+    4. read-your-writes の期間が過ぎると、書き込んだユーザーの読み取りもレプリカに戻る
+
+1つでも期待と異なる場合は終了コード 1 で終わります。
+
+    python check_read_routing.py
+    python check_read_routing.py --window 2
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+
+def main():
+    parser = argparse.ArgumentParser(description="読み取りレプリカへの振り分けと read-your-writes を確認します")
+    parser.add_argument("--window", type=float, default=1.0, help="read-your-writes の秒数（DB_READ_YOUR_WRITES_SECONDS）")
+    args = parser.parse_args()
+
+    # settings を読み込む前に接続先を一時ファイルに切り替える
+    directory = tempfile.mkdtemp(prefix="check_read_routing_")
+    primary_path = os.path.join(directory, "primary.db")
+    replica_path = os.path.join(directory, "replica.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{primary_path}"
+    os.environ["DATABASE_READ_URL"] = f"sqlite:///{replica_path}"
+    os.environ["DB_READ_YOUR_WRITES_SECONDS"] = str(args.window)
+    try:
+        ok = asyncio.run(run(primary_path, replica_path, args.window))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+def seed(primary_path: str, replica_path: str) -> int:
+    """ユーザー2人と体重の記録を1件ずつ作り、primary をレプリカにコピーしてカテゴリ ID を返す"""
+    from settings import Base, SessionLocal, engine
+    from models.users import User
+    from models.vitaldata import VitalData
+    from models.vitaldataname import VitalDataName
+    from models.uservitalcategory import UserVitalCategory
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        vital = VitalDataName(name="体重")
+        db.add(vital)
+        db.flush()
+        for index in range(2):
+            user = User(email=f"routing{index}@example.com", username=f"routing{index}", date_of_birth=datetime(1990, 1, 1))
+            db.add(user)
+            db.flush()
+            db.add(UserVitalCategory(user_id=user.id, vital_id=vital.id, is_public=True, is_accumulating=False))
+            db.add(VitalData(user_id=user.id, name_id=vital.id, date=datetime(2024, 1, 1), value=60.0))
+        db.commit()
+        vital_id = vital.id
+    finally:
+        db.close()
+
+    # WAL の内容を本体に書き戻してからコピーする
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    engine.dispose()
+    shutil.copyfile(primary_path, replica_path)
+    return vital_id
+
+
+async def run(primary_path: str, replica_path: str, window: float) -> bool:
+    import httpx
+    from settings import async_engine, async_read_engine
+    from app.database.routing import LAST_WRITE_COOKIE, recent_writers
+    from app.main import app
+    from app.utils.auth import create_access_token
+
+    if async_read_engine is async_engine:
+        print("❌ DATABASE_READ_URL が反映されていません")
+        return False
+
+    vital_id = seed(primary_path, replica_path)
+    clients = {
+        user_id: httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://check",
+            headers={"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id)})}"},
+        )
+        for user_id in (1, 2)
+    }
+
+    async def my_rows(user_id: int) -> int:
+        response = await clients[user_id].get("/vitaldata/me/")
+        response.raise_for_status()
+        return len(response.json())
+
+    async def friend_points(user_id: int, friend_id: int) -> int:
+        response = await clients[user_id].get(f"/friends/{friend_id}/")
+        response.raise_for_status()
+        return sum(len(log["vitaldata_list"]) for log in response.json()["life_logs"])
+
+    results = []
+
+    def check(name: str, actual: int, expected: int):
+        passed = actual == expected
+        results.append(passed)
+        print(f"  {'✅' if passed else '❌'} {name}: {actual} 件（期待値 {expected}）")
+
+    try:
+        print(f"🔍 primary: {primary_path}\n🔍 replica: {replica_path}（書き込みは反映しない）")
+        check("書き込み前の読み取り（レプリカ）", await my_rows(1), 1)
+
+        response = await clients[1].post("/vitaldata/register/", json={
+            "name_id": vital_id, "date": "2024-01-02T00:00:00", "value": 61.0
+        })
+        response.raise_for_status()
+        written_at = time.monotonic()
+
+        check("書き込んだ直後の自分の読み取り（primary）", await my_rows(1), 2)
+        # 別のワーカーに届いた場合（プロセス内の記録はなく、Cookie だけが届く）
+        recent_writers.clear()
+        check("書き込み時刻の Cookie", int(LAST_WRITE_COOKIE in clients[1].cookies), 1)
+        check("別のワーカーでの自分の読み取り（Cookie で primary）", await my_rows(1), 2)
+        check("他のユーザーの読み取り（レプリカ）", await friend_points(2, 1), 1)
+
+        await asyncio.sleep(max(0.0, written_at + window - time.monotonic()) + 0.2)
+        check(f"{window:g} 秒後の自分の読み取り（レプリカ）", await my_rows(1), 1)
+    finally:
+        for client in clients.values():
+            await client.aclose()
+        await async_engine.dispose()
+        await async_read_engine.dispose()
+
+    ok = all(results)
+    print("✅ 読み取りの振り分けは期待どおりです" if ok else "❌ 期待と異なる振り分けがありました")
+    return ok
+
+
+if __name__ == "__main__":
+    main()
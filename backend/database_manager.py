@@ -12,6 +12,7 @@ import json
 
 # 全てのモデルをインポート（リレーションシップの解決のため）
 from models.users import User
+from models.friendship import Friendship
 from models.vitaldata import VitalData
 from models.vitaldataname import VitalDataName
 from models.objective import Objective
@@ -47,7 +48,19 @@ class DatabaseManager:
             List[Dict[str, Any]]: ユーザー情報の辞書のリスト
         """
         users = self.session.query(User).all()
-        return [self._user_to_dict(user) for user in users]
+
+        # 友達関係と目標はそれぞれ1回のクエリでまとめて取得
+        friends: Dict[int, List[int]] = {}
+        for user_id, friend_id in self.session.query(Friendship.user_id, Friendship.friend_id).order_by(Friendship.friend_id):
+            friends.setdefault(user_id, []).append(friend_id)
+        objectives: Dict[int, List[int]] = {}
+        for user_id, objective_id in self.session.query(Objective.user_id, Objective.id).order_by(Objective.id):
+            objectives.setdefault(user_id, []).append(objective_id)
+
+        return [
+            self._user_to_dict(user, friends.get(user.id, []), objectives.get(user.id, []))
+            for user in users
+        ]
     
     def get_all_vital_data(self) -> List[Dict[str, Any]]:
         """
@@ -123,15 +136,15 @@ class DatabaseManager:
         
         return all_data
     
-    def _user_to_dict(self, user: User) -> Dict[str, Any]:
+    def _user_to_dict(self, user: User, friends: List[int], objectives: List[int]) -> Dict[str, Any]:
         return {
             'id': user.id,
             'email': user.email,
             'username': user.username,
             'date_of_birth': user.date_of_birth.isoformat() if user.date_of_birth else None,
             'sex': user.sex,
-            'friends': user.friends,
-            'objective': user.objective
+            'friends': friends,
+            'objective': objectives
         }
     
     def _vital_data_to_dict(self, vital_data: VitalData, user_vital_category: Optional[UserVitalCategory] = None) -> Dict[str, Any]:
@@ -148,6 +161,7 @@ class DatabaseManager:
     def _objective_to_dict(self, objective: Objective) -> Dict[str, Any]:
         return {
             'id': objective.id,
+            'user_id': objective.user_id,
             'start_date': objective.start_date.isoformat(),
             'end_date': objective.end_date.isoformat(),
             'name_id': objective.name_id,
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+CSV / NDJSON のバイタルデータを取り込むスクリプト
+
+使い方:
+    python import_vital_data.py data.csv --user-id 1
+    python import_vital_data.py data.ndjson --chunk-size 5000
+    cat data.ndjson | python import_vital_data.py - --format ndjson --user-id 1
+
+CSV は1行目がヘッダーで、列は user_id（省略可）, name_id または data_name, date, value, source（省略可）
+user_id 列がない行は --user-id のユーザーに登録する
+"""
+
+import argparse
+import io
+import sys
+
+from settings import SessionLocal
+from app.services.vital_importer import VitalImporter, FORMATS, DEFAULT_CHUNK_SIZE, detect_format
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV / NDJSON のバイタルデータを取り込む")
+    parser.add_argument("path", help="取り込むファイル（- で標準入力）")
+    parser.add_argument("--format", choices=FORMATS, help="省略時は拡張子から判定")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="1回の挿入・commit にまとめる行数")
+    parser.add_argument("--user-id", type=int, help="user_id 列がない行の登録先ユーザー")
+    args = parser.parse_args()
+
+    format = args.format or detect_format(args.path)
+    if format is None:
+        parser.error("--format を指定してください")
+
+    if args.path == "-":
+        lines = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    else:
+        lines = open(args.path, encoding="utf-8-sig", newline="")
+
+    def on_chunk(report):
+        print(f"  … {report['rows']} 行 (登録 {report['inserted']} / 重複 {report['duplicates']} / 失敗 {report['failed']}, {report['rows_per_second']} 行/秒)")
+
+    db = SessionLocal()
+    try:
+        print(f"🚀 {args.path} を取り込みます ({format}, {args.chunk_size} 行ずつ)...")
+        report = VitalImporter(
+            db, chunk_size=args.chunk_size, user_id=args.user_id, per_row_user=True
+        ).run(lines, format, on_chunk=on_chunk)
+
+        for error in report["errors"]:
+            print(f"⚠️  {error['line']} 行目: {error['error']}")
+        print(f"\n📊 {report['rows']} 行を {report['seconds']} 秒で処理しました ({report['rows_per_second']} 行/秒)")
+        print(f"登録: {report['inserted']} / 重複: {report['duplicates']} / 失敗: {report['failed']}")
+        print("\n✅ 取り込みが完了しました！")
+    except Exception as e:
+        print(f"❌ エラーが発生しました: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        lines.close()
+
+
+if __name__ == "__main__":
+    main()
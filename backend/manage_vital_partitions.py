@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+vitaldata の月パーティション・アーカイブ管理スクリプト
+
+    python manage_vital_partitions.py status                          # 月ごとの行数とアーカイブ済みの月
+    python manage_vital_partitions.py maintain --ahead 2              # 月のパーティションを作る（PostgreSQL、月に1回 cron で実行）
+    python manage_vital_partitions.py archive --older-than-months 12  # 12か月より前の月をアーカイブ
+    python manage_vital_partitions.py archive --month 2024-01
+    python manage_vital_partitions.py restore --month 2024-01         # アーカイブした月を vitaldata に戻す
+    python manage_vital_partitions.py restore --all
+
+アーカイブした月の生データは読み取りのときだけ（期間にかかる場合に）読まれ、書き込みはできません。
+集計テーブルはそのまま残るため、統計・日単位以上の系列はアーカイブしても変わりません。
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from settings import SessionLocal
+from app.database.partitions import month_start
+from app.services.vital_partitions import VitalPartitionService
+
+
+def parse_month(value: str):
+    try:
+        return month_start(datetime.strptime(value, "%Y-%m"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("YYYY-MM の形式で指定してください")
+
+
+def months_before(count: int):
+    """今月から count か月前の月初（この月より前をアーカイブの対象にする）"""
+    month = month_start(datetime.utcnow())
+    for _ in range(count):
+        month = month.replace(year=month.year - 1, month=12) if month.month == 1 else month.replace(month=month.month - 1)
+    return month
+
+
+def show_status(service: VitalPartitionService):
+    hot = service.hot_months()
+    print("📊 vitaldata（月ごとの行数）")
+    for month, count in hot.items():
+        print(f"  {month:%Y-%m}: {count} 件")
+    if not hot:
+        print("  （なし）")
+    partitions = service.partitions()
+    if partitions:
+        print(f"🧩 パーティション: {', '.join(partitions)}")
+    print("🗄️  アーカイブ済み")
+    archived = service.archived_months()
+    for month in archived:
+        print(f"  {month:%Y-%m}")
+    if not archived:
+        print("  （なし）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="vitaldata の月パーティションとアーカイブを管理します")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("status", help="月ごとの行数とアーカイブ済みの月を表示する")
+    maintain = commands.add_parser("maintain", help="今月以降と DEFAULT パーティションにある月のパーティションを作る（PostgreSQL）")
+    maintain.add_argument("--ahead", type=int, default=2, help="何か月先まで作っておくか")
+    archive = commands.add_parser("archive", help="古い月をアーカイブする")
+    archive_target = archive.add_mutually_exclusive_group(required=True)
+    archive_target.add_argument("--month", type=parse_month, help="アーカイブする月（YYYY-MM）")
+    archive_target.add_argument("--older-than-months", type=int, help="今月からこの月数より前の月をすべてアーカイブする")
+    archive.add_argument("--dry-run", action="store_true", help="対象の月を表示するだけ")
+    restore = commands.add_parser("restore", help="アーカイブした月を vitaldata に戻す")
+    restore_target = restore.add_mutually_exclusive_group(required=True)
+    restore_target.add_argument("--month", type=parse_month, help="戻す月（YYYY-MM）")
+    restore_target.add_argument("--all", action="store_true", help="すべての月を戻す")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    service = VitalPartitionService(db)
+    try:
+        if args.command in (None, "status"):
+            show_status(service)
+            return
+
+        if args.command == "maintain":
+            created = service.maintain(args.ahead)
+            db.commit()
+            if not service.is_postgresql:
+                print("ℹ️  SQLite にはパーティションがありません（古い月は archive で切り出します）")
+            else:
+                print(f"✅ {len(created)} 個のパーティションを作成しました{': ' + ', '.join(created) if created else ''}")
+            return
+
+        if args.command == "archive":
+            if args.month is not None:
+                months = [args.month]
+            else:
+                cutoff = months_before(args.older_than_months)
+                months = [month for month in service.hot_months() if month < cutoff]
+            if not months:
+                print("ℹ️  アーカイブする月はありません")
+                return
+            for month in months:
+                if args.dry_run:
+                    print(f"📋 {month:%Y-%m} をアーカイブします（dry run）")
+                    continue
+                count = service.archive(month)
+                # 月ごとに commit して、途中で止めてもそこまでの月は有効にする
+                db.commit()
+                print(f"🗄️  {month:%Y-%m}: {count} 件をアーカイブしました")
+            return
+
+        if args.command == "restore":
+            months = service.archived_months() if args.all else [args.month]
+            for month in list(months):
+                count = service.restore(month)
+                db.commit()
+                print(f"♻️  {month:%Y-%m}: {count} 件を vitaldata に戻しました")
+            if not months:
+                print("ℹ️  アーカイブした月はありません")
+    except ValueError as e:
+        db.rollback()
+        print(f"❌ {e}")
+        sys.exit(1)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
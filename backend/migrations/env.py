@@ -8,11 +8,17 @@ from alembic import context
 import settings
 
 import models.users  # noqa: F401 ← flake8のエラーを回避用らしい
+import models.friendship  # noqa: F401
 import models.otpcodes  # noqa: F401
 import models.vitaldataname  # noqa: F401
 import models.vitaldata  # noqa: F401
 import models.objective  # noqa: F401
 import models.uservitalcategory  # noqa: F401
+import models.uservitallatest  # noqa: F401
+import models.vitaldailyrollup  # noqa: F401
+import models.vitalrollup  # noqa: F401
+import models.idempotencykey  # noqa: F401
+import models.vitaldataarchive  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -23,6 +29,10 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# 接続先はアプリと同じ設定（APP_ENV / DATABASE_URL）を使う（alembic.ini の値は使わない）
+# configparser の補間を避けるため % をエスケープする
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -47,9 +57,7 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url")
-    # TODO : こっちで指定でもいいかも
-    # url = settings.DATABASE_URL
+    url = settings.DATABASE_URL
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -76,7 +84,10 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite は ALTER TABLE が限られるため、autogenerate でテーブルを作り直す batch 操作を出力する
+            render_as_batch=connection.dialect.name == "sqlite",
         )
 
         with context.begin_transaction():
@@ -0,0 +1,77 @@
+"""Add vital_daily_rollup and drop user_vital_latest.latest_day_sum
+
+Revision ID: 1b8e5c3d7f20
+Revises: f4b7d2a8c619
+Create Date: 2025-07-26 11:05:37.218840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b8e5c3d7f20'
+down_revision: Union[str, Sequence[str], None] = 'f4b7d2a8c619'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('vital_daily_rollup',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('vital_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('value_sum', sa.Float(), nullable=False),
+        sa.Column('value_count', sa.Integer(), nullable=False),
+        sa.Column('value_min', sa.Float(), nullable=False),
+        sa.Column('value_max', sa.Float(), nullable=False),
+        sa.Column('last_value', sa.Float(), nullable=False),
+        sa.Column('last_date', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['vital_id'], ['vitaldataname.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'vital_id', 'day')
+    )
+    op.create_index('ix_vital_daily_rollup_vital_id_day', 'vital_daily_rollup', ['vital_id', 'day'], unique=False)
+
+    # 既存の vitaldata から日次集計を埋める
+    op.execute("""
+        INSERT INTO vital_daily_rollup
+            (user_id, vital_id, day, value_sum, value_count, value_min, value_max, last_value, last_date)
+        SELECT user_id, name_id, day,
+               SUM(value), COUNT(*), MIN(value), MAX(value),
+               MAX(CASE WHEN rn = 1 THEN value END),
+               MAX(CASE WHEN rn = 1 THEN date END)
+        FROM (
+            SELECT user_id, name_id, date, value,
+                   date(date) AS day,
+                   ROW_NUMBER() OVER (PARTITION BY user_id, name_id, date(date) ORDER BY date DESC, id DESC) AS rn
+            FROM vitaldata
+        ) AS ranked
+        GROUP BY user_id, name_id, day
+    """)
+
+    # 最新日の合計は vital_daily_rollup から引けるので削除する
+    with op.batch_alter_table('user_vital_latest') as batch_op:
+        batch_op.drop_column('latest_day_sum')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user_vital_latest') as batch_op:
+        batch_op.add_column(sa.Column('latest_day_sum', sa.Float(), nullable=False, server_default='0'))
+
+    op.execute("""
+        UPDATE user_vital_latest
+        SET latest_day_sum = COALESCE((
+            SELECT value_sum FROM vital_daily_rollup
+            WHERE vital_daily_rollup.user_id = user_vital_latest.user_id
+              AND vital_daily_rollup.vital_id = user_vital_latest.vital_id
+              AND vital_daily_rollup.day = date(user_vital_latest.latest_date)
+        ), 0)
+    """)
+
+    op.drop_index('ix_vital_daily_rollup_vital_id_day', table_name='vital_daily_rollup')
+    op.drop_table('vital_daily_rollup')
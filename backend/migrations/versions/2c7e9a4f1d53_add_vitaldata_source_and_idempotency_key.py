@@ -0,0 +1,132 @@
+"""Add vitaldata.source with a unique natural key, and idempotency_key
+
+Revision ID: 2c7e9a4f1d53
+Revises: 8f3a1d6b2c94
+Create Date: 2025-07-28 10:17:46.381905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.date_trunc import truncate_date
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c7e9a4f1d53'
+down_revision: Union[str, Sequence[str], None] = '8f3a1d6b2c94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+vitaldata = sa.table(
+    'vitaldata',
+    sa.column('id', sa.Integer), sa.column('user_id', sa.Integer), sa.column('name_id', sa.Integer),
+    sa.column('date', sa.DateTime), sa.column('value', sa.Float), sa.column('source', sa.String),
+)
+AGGREGATE_COLUMNS = ['value_sum', 'value_count', 'value_min', 'value_max', 'last_value', 'last_date']
+user_vital_latest = sa.table(
+    'user_vital_latest', *[sa.column(name) for name in ('user_id', 'vital_id', 'latest_date', 'latest_value')]
+)
+vital_daily_rollup = sa.table(
+    'vital_daily_rollup', *[sa.column(name) for name in ['user_id', 'vital_id', 'day'] + AGGREGATE_COLUMNS]
+)
+vital_rollup = sa.table(
+    'vital_rollup', *[sa.column(name) for name in ['user_id', 'vital_id', 'resolution', 'bucket_start'] + AGGREGATE_COLUMNS]
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('vitaldata', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('source', sa.String(), server_default='app', nullable=False))
+
+    # 再送で重複した行はユニーク索引の前に最も古い行だけ残し、
+    # 削除した行を含んでいた投影（最新値・日次集計・時間/週/月の集計）をユーザー×カテゴリごとに作り直す
+    bind = op.get_bind()
+    duplicated = bind.execute(sa.text("""
+        SELECT DISTINCT user_id, name_id FROM (
+            SELECT user_id, name_id FROM vitaldata
+            GROUP BY user_id, name_id, date, source
+            HAVING COUNT(*) > 1
+        ) AS duplicated
+    """)).all()
+    op.execute("""
+        DELETE FROM vitaldata
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM vitaldata GROUP BY user_id, name_id, date, source
+        )
+    """)
+    for user_id, vital_id in duplicated:
+        rebuild_projections(bind, user_id, vital_id)
+    op.create_index('ix_vitaldata_user_id_name_id_date_source', 'vitaldata', ['user_id', 'name_id', 'date', 'source'], unique=True)
+    # 先頭の (user_id, name_id, date) が同じ索引は自然キーの索引で足りるため、挿入のたびに2つ更新しないよう削除する
+    op.drop_index('ix_vitaldata_user_id_name_id_date', table_name='vitaldata')
+
+    op.create_table('idempotency_key',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('request_hash', sa.String(), nullable=False),
+        sa.Column('response', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'key')
+    )
+    op.create_index('ix_idempotency_key_created_at', 'idempotency_key', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_idempotency_key_created_at', table_name='idempotency_key')
+    op.drop_table('idempotency_key')
+    op.create_index('ix_vitaldata_user_id_name_id_date', 'vitaldata', ['user_id', 'name_id', 'date', 'value'], unique=False)
+    op.drop_index('ix_vitaldata_user_id_name_id_date_source', table_name='vitaldata')
+    with op.batch_alter_table('vitaldata', schema=None) as batch_op:
+        batch_op.drop_column('source')
+
+
+def ranked_rows(condition, bucket=None):
+    """条件に合う vitaldata に、区間（bucket）ごとの新しい順の番号 rn を付ける（bucket が None ならユーザー×カテゴリごと）"""
+    partition = [vitaldata.c.user_id, vitaldata.c.name_id] + ([bucket] if bucket is not None else [])
+    columns = [vitaldata.c.user_id, vitaldata.c.name_id, vitaldata.c.date, vitaldata.c.value]
+    if bucket is not None:
+        columns.append(bucket.label('bucket'))
+    return sa.select(
+        *columns,
+        sa.func.row_number().over(
+            partition_by=partition, order_by=(vitaldata.c.date.desc(), vitaldata.c.id.desc())
+        ).label('rn'),
+    ).where(condition).subquery('ranked')
+
+
+def aggregated_rows(ranked, *constants):
+    """区間ごとの合計・件数・最小・最大・最後の値と日時"""
+    return sa.select(
+        ranked.c.user_id, ranked.c.name_id, *constants, ranked.c.bucket,
+        sa.func.sum(ranked.c.value), sa.func.count(), sa.func.min(ranked.c.value), sa.func.max(ranked.c.value),
+        sa.func.max(sa.case((ranked.c.rn == 1, ranked.c.value))),
+        sa.func.max(sa.case((ranked.c.rn == 1, ranked.c.date))),
+    ).group_by(ranked.c.user_id, ranked.c.name_id, ranked.c.bucket)
+
+
+def rebuild_projections(bind, user_id: int, vital_id: int) -> None:
+    """ユーザー×カテゴリの投影を vitaldata から作り直す（rebuild_projections.py と同じ集計）"""
+    for table in (user_vital_latest, vital_daily_rollup, vital_rollup):
+        bind.execute(table.delete().where(table.c.user_id == user_id, table.c.vital_id == vital_id))
+    condition = sa.and_(vitaldata.c.user_id == user_id, vitaldata.c.name_id == vital_id)
+
+    ranked = ranked_rows(condition)
+    bind.execute(user_vital_latest.insert().from_select(
+        ['user_id', 'vital_id', 'latest_date', 'latest_value'],
+        sa.select(ranked.c.user_id, ranked.c.name_id, ranked.c.date, ranked.c.value).where(ranked.c.rn == 1),
+    ))
+    bind.execute(vital_daily_rollup.insert().from_select(
+        ['user_id', 'vital_id', 'day'] + AGGREGATE_COLUMNS,
+        aggregated_rows(ranked_rows(condition, truncate_date('day', vitaldata.c.date))),
+    ))
+    for resolution in ('hour', 'week', 'month'):
+        bind.execute(vital_rollup.insert().from_select(
+            ['user_id', 'vital_id', 'resolution', 'bucket_start'] + AGGREGATE_COLUMNS,
+            aggregated_rows(ranked_rows(condition, truncate_date(resolution, vitaldata.c.date)), sa.literal(resolution)),
+        ))
@@ -0,0 +1,110 @@
+"""Partition vitaldata by month and add the archive registry
+
+Revision ID: 3e8b5d1f9a72
+Revises: 2c7e9a4f1d53
+Create Date: 2025-07-28 10:12:44.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e8b5d1f9a72'
+down_revision: Union[str, Sequence[str], None] = '2c7e9a4f1d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+VITALDATA_INDEXES = [
+    ('ix_vitaldata_user_id_date', ['user_id', 'date'], False),
+    ('ix_vitaldata_user_id_name_id_date_source', ['user_id', 'name_id', 'date', 'source'], True),
+]
+VITALDATA_COLUMNS = "id, user_id, date, name_id, value, source"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('vitaldata_archives',
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('table_name', sa.String(), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('month')
+    )
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # 古い月をアーカイブテーブルに移しても id を使い回さないよう AUTOINCREMENT にする
+        with op.batch_alter_table('vitaldata', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+            pass
+    elif bind.dialect.name == 'postgresql':
+        # パーティション表には作り替えるしかないため、月ごとのパーティションを作って行を移す
+        op.execute("ALTER TABLE vitaldata RENAME TO vitaldata_unpartitioned")
+        op.execute("ALTER TABLE vitaldata_unpartitioned RENAME CONSTRAINT vitaldata_pkey TO vitaldata_unpartitioned_pkey")
+        op.execute("ALTER SEQUENCE vitaldata_id_seq RENAME TO vitaldata_unpartitioned_id_seq")
+        for name, _, _ in VITALDATA_INDEXES:
+            op.drop_index(name, table_name='vitaldata_unpartitioned')
+
+        create_vitaldata(partitioned=True)
+        op.execute("CREATE TABLE vitaldata_default PARTITION OF vitaldata DEFAULT")
+        months = bind.execute(sa.text(
+            "SELECT DISTINCT date_trunc('month', date) FROM vitaldata_unpartitioned"
+        )).scalars().all()
+        for month in months:
+            upper = month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+            op.execute(
+                f"CREATE TABLE vitaldata_p{month:%Y%m} PARTITION OF vitaldata"
+                f" FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+            )
+        copy_vitaldata('vitaldata_unpartitioned')
+        op.drop_table('vitaldata_unpartitioned')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.execute(sa.text("SELECT COUNT(*) FROM vitaldata_archives")).scalar():
+        raise RuntimeError("Restore archived months first: python manage_vital_partitions.py restore --all")
+
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('vitaldata', recreate='always'):
+            pass
+    elif bind.dialect.name == 'postgresql':
+        op.execute("ALTER TABLE vitaldata RENAME TO vitaldata_partitioned")
+        op.execute("ALTER TABLE vitaldata_partitioned RENAME CONSTRAINT vitaldata_pkey TO vitaldata_partitioned_pkey")
+        op.execute("ALTER SEQUENCE vitaldata_id_seq RENAME TO vitaldata_partitioned_id_seq")
+        for name, _, _ in VITALDATA_INDEXES:
+            op.drop_index(name, table_name='vitaldata_partitioned')
+
+        create_vitaldata(partitioned=False)
+        copy_vitaldata('vitaldata_partitioned')
+        op.execute("DROP TABLE vitaldata_partitioned CASCADE")
+
+    op.drop_table('vitaldata_archives')
+
+
+def create_vitaldata(partitioned: bool) -> None:
+    """vitaldata と索引を作る（partitioned なら主キーに date を含めて月の範囲で分割する）"""
+    op.create_table('vitaldata',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('name_id', sa.Integer(), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.Column('source', sa.String(), server_default='app', nullable=False),
+        sa.ForeignKeyConstraint(['name_id'], ['vitaldataname.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id', 'date') if partitioned else sa.PrimaryKeyConstraint('id'),
+        **({'postgresql_partition_by': 'RANGE (date)'} if partitioned else {})
+    )
+    for name, columns, unique in VITALDATA_INDEXES:
+        op.create_index(name, 'vitaldata', columns, unique=unique)
+
+
+def copy_vitaldata(source: str) -> None:
+    """行を新しい vitaldata に移し、id の連番を続きから振るようにする"""
+    op.execute(f"INSERT INTO vitaldata ({VITALDATA_COLUMNS}) SELECT {VITALDATA_COLUMNS} FROM {source}")
+    op.execute("SELECT setval('vitaldata_id_seq', COALESCE((SELECT MAX(id) FROM vitaldata), 0) + 1, false)")
@@ -0,0 +1,54 @@
+"""Add user_vital_latest projection table
+
+Revision ID: 4c1e7a9b2d3f
+Revises: b277e46d1a8f
+Create Date: 2025-07-22 10:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e7a9b2d3f'
+down_revision: Union[str, Sequence[str], None] = 'b277e46d1a8f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_vital_latest',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('vital_id', sa.Integer(), nullable=False),
+        sa.Column('latest_date', sa.DateTime(), nullable=False),
+        sa.Column('latest_value', sa.Float(), nullable=False),
+        sa.Column('latest_day_sum', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['vital_id'], ['vitaldataname.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'vital_id')
+    )
+
+    # 既存の vitaldata から最新値を埋める
+    op.execute("""
+        INSERT INTO user_vital_latest (user_id, vital_id, latest_date, latest_value, latest_day_sum)
+        SELECT user_id, name_id,
+               MAX(CASE WHEN rn = 1 THEN date END),
+               MAX(CASE WHEN rn = 1 THEN value END),
+               SUM(CASE WHEN day = latest_day THEN value END)
+        FROM (
+            SELECT user_id, name_id, date, value,
+                   date(date) AS day,
+                   date(MAX(date) OVER (PARTITION BY user_id, name_id)) AS latest_day,
+                   ROW_NUMBER() OVER (PARTITION BY user_id, name_id ORDER BY date DESC, id DESC) AS rn
+            FROM vitaldata
+        ) AS ranked
+        GROUP BY user_id, name_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_vital_latest')
@@ -0,0 +1,108 @@
+"""Add composite indexes for hot query paths
+
+Revision ID: 7d2b9e4f1a6c
+Revises: 4c1e7a9b2d3f
+Create Date: 2025-07-23 14:38:05.117942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2b9e4f1a6c'
+down_revision: Union[str, Sequence[str], None] = '4c1e7a9b2d3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 同じカテゴリを参照する列（重複したカテゴリ名をまとめるときに付け替える）
+VITAL_REFERENCES = [('vitaldata', 'name_id'), ('uservitalcategory', 'vital_id'), ('objective', 'name_id')]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # 同じメールアドレスのユーザーはどちらを残すか決められないため、ユニーク索引を作る前に止める
+    emails = bind.execute(sa.text(
+        "SELECT email FROM users WHERE email IS NOT NULL GROUP BY email HAVING COUNT(*) > 1 ORDER BY email"
+    )).scalars().all()
+    if emails:
+        raise RuntimeError(f"Duplicate user emails must be resolved before this upgrade: {', '.join(emails)}")
+
+    # 同じ名前のカテゴリは最も古い ID にまとめ、参照している行を付け替える
+    merged = bind.execute(sa.text("""
+        SELECT vitaldataname.id, kept.id
+        FROM vitaldataname
+        JOIN (SELECT name, MIN(id) AS id FROM vitaldataname GROUP BY name) AS kept ON kept.name = vitaldataname.name
+        WHERE vitaldataname.id <> kept.id
+    """)).all()
+    for duplicate_id, kept_id in merged:
+        for table, column in VITAL_REFERENCES:
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {column} = :kept_id WHERE {column} = :duplicate_id"),
+                {"kept_id": kept_id, "duplicate_id": duplicate_id},
+            )
+    if merged:
+        # まとめたカテゴリの最新値は付け替えた vitaldata から作り直す（4c1e7a9b2d3f と同じ集計）
+        affected = sorted({vital_id for pair in merged for vital_id in pair})
+        bind.execute(
+            sa.text("DELETE FROM user_vital_latest WHERE vital_id IN :ids").bindparams(sa.bindparam('ids', expanding=True)),
+            {"ids": affected},
+        )
+        bind.execute(sa.text("""
+            INSERT INTO user_vital_latest (user_id, vital_id, latest_date, latest_value, latest_day_sum)
+            SELECT user_id, name_id,
+                   MAX(CASE WHEN rn = 1 THEN date END),
+                   MAX(CASE WHEN rn = 1 THEN value END),
+                   SUM(CASE WHEN day = latest_day THEN value END)
+            FROM (
+                SELECT user_id, name_id, date, value,
+                       date(date) AS day,
+                       date(MAX(date) OVER (PARTITION BY user_id, name_id)) AS latest_day,
+                       ROW_NUMBER() OVER (PARTITION BY user_id, name_id ORDER BY date DESC, id DESC) AS rn
+                FROM vitaldata
+                WHERE name_id IN :ids
+            ) AS ranked
+            GROUP BY user_id, name_id
+        """).bindparams(sa.bindparam('ids', expanding=True)), {"ids": affected})
+        bind.execute(
+            sa.text("DELETE FROM vitaldataname WHERE id IN :ids").bindparams(sa.bindparam('ids', expanding=True)),
+            {"ids": [duplicate_id for duplicate_id, _ in merged]},
+        )
+
+    # 同じ (user_id, vital_id) の重複設定（カテゴリをまとめてできたものを含む）はユニーク索引の前に最も古い行だけ残す
+    op.execute("""
+        DELETE FROM uservitalcategory
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM uservitalcategory GROUP BY user_id, vital_id
+        )
+    """)
+
+    op.create_index('ix_vitaldata_user_id_name_id_date', 'vitaldata', ['user_id', 'name_id', 'date', 'value'], unique=False)
+    op.create_index('ix_vitaldata_user_id_date', 'vitaldata', ['user_id', 'date'], unique=False)
+    op.create_index('ix_uservitalcategory_user_id_vital_id', 'uservitalcategory', ['user_id', 'vital_id'], unique=True)
+    op.create_index('ix_uservitalcategory_vital_id_is_public', 'uservitalcategory', ['vital_id', 'is_public', 'user_id', 'is_accumulating'], unique=False)
+    op.create_index(op.f('ix_vitaldataname_name'), 'vitaldataname', ['name'], unique=True)
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_otpcodes_otp_code'), 'otpcodes', ['otp_code'], unique=False)
+    op.create_index('ix_user_vital_latest_vital_id', 'user_vital_latest', ['vital_id'], unique=False)
+    op.create_index('ix_chat_conversations_user_id_updated_at', 'chat_conversations', ['user_id', 'updated_at'], unique=False)
+    op.create_index('ix_chat_messages_conversation_id_timestamp', 'chat_messages', ['conversation_id', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chat_messages_conversation_id_timestamp', table_name='chat_messages')
+    op.drop_index('ix_chat_conversations_user_id_updated_at', table_name='chat_conversations')
+    op.drop_index('ix_user_vital_latest_vital_id', table_name='user_vital_latest')
+    op.drop_index(op.f('ix_otpcodes_otp_code'), table_name='otpcodes')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_index(op.f('ix_vitaldataname_name'), table_name='vitaldataname')
+    op.drop_index('ix_uservitalcategory_vital_id_is_public', table_name='uservitalcategory')
+    op.drop_index('ix_uservitalcategory_user_id_vital_id', table_name='uservitalcategory')
+    op.drop_index('ix_vitaldata_user_id_date', table_name='vitaldata')
+    op.drop_index('ix_vitaldata_user_id_name_id_date', table_name='vitaldata')
@@ -0,0 +1,69 @@
+"""Add vital_rollup for hourly, weekly and monthly aggregates
+
+Revision ID: 8f3a1d6b2c94
+Revises: 1b8e5c3d7f20
+Create Date: 2025-07-27 09:41:12.604381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a1d6b2c94'
+down_revision: Union[str, Sequence[str], None] = '1b8e5c3d7f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 粒度ごとの区間の開始時刻（DateTime 列と同じ文字列形式、週は月曜始まり）
+BUCKETS = {
+    'hour': "strftime('%Y-%m-%d %H:00:00.000000', date)",
+    'week': "strftime('%Y-%m-%d 00:00:00.000000', date, 'weekday 0', '-6 days')",
+    'month': "strftime('%Y-%m-01 00:00:00.000000', date)",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('vital_rollup',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('vital_id', sa.Integer(), nullable=False),
+        sa.Column('resolution', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('value_sum', sa.Float(), nullable=False),
+        sa.Column('value_count', sa.Integer(), nullable=False),
+        sa.Column('value_min', sa.Float(), nullable=False),
+        sa.Column('value_max', sa.Float(), nullable=False),
+        sa.Column('last_value', sa.Float(), nullable=False),
+        sa.Column('last_date', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['vital_id'], ['vitaldataname.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'vital_id', 'resolution', 'bucket_start')
+    )
+
+    # 既存の vitaldata から集計を埋める
+    for resolution, bucket in BUCKETS.items():
+        op.execute(f"""
+            INSERT INTO vital_rollup
+                (user_id, vital_id, resolution, bucket_start, value_sum, value_count,
+                 value_min, value_max, last_value, last_date)
+            SELECT user_id, name_id, '{resolution}', bucket_start,
+                   SUM(value), COUNT(*), MIN(value), MAX(value),
+                   MAX(CASE WHEN rn = 1 THEN value END),
+                   MAX(CASE WHEN rn = 1 THEN date END)
+            FROM (
+                SELECT user_id, name_id, date, value,
+                       {bucket} AS bucket_start,
+                       ROW_NUMBER() OVER (PARTITION BY user_id, name_id, {bucket} ORDER BY date DESC, id DESC) AS rn
+                FROM vitaldata
+            ) AS ranked
+            GROUP BY user_id, name_id, bucket_start
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('vital_rollup')
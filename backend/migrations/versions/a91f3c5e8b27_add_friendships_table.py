@@ -0,0 +1,79 @@
+"""Add friendships table and drop users.friends
+
+Revision ID: a91f3c5e8b27
+Revises: 7d2b9e4f1a6c
+Create Date: 2025-07-24 11:05:52.640317
+
+"""
+import json
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a91f3c5e8b27'
+down_revision: Union[str, Sequence[str], None] = '7d2b9e4f1a6c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _load_json_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value or []
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    friendships = op.create_table('friendships',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('friend_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['friend_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'friend_id')
+    )
+    op.create_index('ix_friendships_friend_id', 'friendships', ['friend_id', 'user_id'], unique=False)
+
+    # users.friends（JSON 配列）から友達関係を移す
+    conn = op.get_bind()
+    users = conn.execute(sa.text("SELECT id, friends FROM users")).fetchall()
+    user_ids = {user_id for user_id, _ in users}
+    now = datetime.utcnow()
+    edges = set()
+    for user_id, friends in users:
+        for friend_id in _load_json_list(friends):
+            if friend_id in user_ids and friend_id != user_id:
+                edges.add((user_id, friend_id))
+    if edges:
+        op.bulk_insert(friendships, [
+            {"user_id": user_id, "friend_id": friend_id, "created_at": now}
+            for user_id, friend_id in sorted(edges)
+        ])
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('friends')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('friends', sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    friends = {}
+    for user_id, friend_id in conn.execute(sa.text("SELECT user_id, friend_id FROM friendships ORDER BY friend_id")):
+        friends.setdefault(user_id, []).append(friend_id)
+    for user_id, friend_ids in friends.items():
+        conn.execute(
+            sa.text("UPDATE users SET friends = :friends WHERE id = :id"),
+            {"friends": json.dumps(friend_ids), "id": user_id}
+        )
+
+    op.drop_index('ix_friendships_friend_id', table_name='friendships')
+    op.drop_table('friendships')
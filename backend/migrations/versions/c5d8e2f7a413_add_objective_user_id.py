@@ -0,0 +1,77 @@
+"""Add objective.user_id and drop users.objective
+
+Revision ID: c5d8e2f7a413
+Revises: a91f3c5e8b27
+Create Date: 2025-07-24 16:47:19.283904
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d8e2f7a413'
+down_revision: Union[str, Sequence[str], None] = 'a91f3c5e8b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _load_json_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value or []
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('objective') as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+
+    # users.objective（JSON 配列）から所有者を埋める（複数ユーザーが参照していれば最初のユーザー）
+    conn = op.get_bind()
+    owners = {}
+    for user_id, objectives in conn.execute(sa.text("SELECT id, objective FROM users ORDER BY id")):
+        for objective_id in _load_json_list(objectives):
+            owners.setdefault(objective_id, user_id)
+    for objective_id, user_id in owners.items():
+        conn.execute(
+            sa.text("UPDATE objective SET user_id = :user_id WHERE id = :id"),
+            {"user_id": user_id, "id": objective_id}
+        )
+
+    # どのユーザーからも参照されていない目標は API から到達できないため削除する
+    conn.execute(sa.text("DELETE FROM objective WHERE user_id IS NULL"))
+
+    with op.batch_alter_table('objective') as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_objective_user_id_users', 'users', ['user_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_objective_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('objective')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('objective', sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    objectives = {}
+    for user_id, objective_id in conn.execute(sa.text("SELECT user_id, id FROM objective ORDER BY id")):
+        objectives.setdefault(user_id, []).append(objective_id)
+    for user_id, objective_ids in objectives.items():
+        conn.execute(
+            sa.text("UPDATE users SET objective = :objective WHERE id = :id"),
+            {"objective": json.dumps(objective_ids), "id": user_id}
+        )
+
+    with op.batch_alter_table('objective') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_objective_user_id'))
+        batch_op.drop_constraint('fk_objective_user_id_users', type_='foreignkey')
+        batch_op.drop_column('user_id')
@@ -0,0 +1,47 @@
+"""Add users.icon_hash and users.icon_thumbnail
+
+Revision ID: e3a6f1c9b852
+Revises: c5d8e2f7a413
+Create Date: 2025-07-25 10:12:41.530218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.icons import icon_hash, make_thumbnail
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a6f1c9b852'
+down_revision: Union[str, Sequence[str], None] = 'c5d8e2f7a413'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('icon_hash', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('icon_thumbnail', sa.LargeBinary(), nullable=True))
+
+    # 既存のアイコンからハッシュとサムネイルを作る
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, icon FROM users WHERE icon IS NOT NULL")).fetchall()
+    for user_id, icon in rows:
+        if not icon:
+            continue
+        if isinstance(icon, str):
+            icon = icon.encode('utf-8')
+        conn.execute(
+            sa.text("UPDATE users SET icon_hash = :hash, icon_thumbnail = :thumbnail WHERE id = :id"),
+            {"hash": icon_hash(icon), "thumbnail": make_thumbnail(icon), "id": user_id}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('icon_thumbnail')
+        batch_op.drop_column('icon_hash')
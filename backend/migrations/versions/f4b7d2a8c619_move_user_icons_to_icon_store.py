@@ -0,0 +1,73 @@
+"""Move user icons from users BLOBs to the content-addressed icon store
+
+Revision ID: f4b7d2a8c619
+Revises: e3a6f1c9b852
+Create Date: 2025-07-25 15:38:02.917455
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.icons import make_thumbnail
+from app.utils.icon_store import IconStore
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b7d2a8c619'
+down_revision: Union[str, Sequence[str], None] = 'e3a6f1c9b852'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('icon_thumbnail_hash', sa.String(), nullable=True))
+
+    # 既存の BLOB をファイルストアへ書き出す（ハッシュはファイル名と同じ内容の sha256）
+    conn = op.get_bind()
+    store = IconStore()
+    rows = conn.execute(sa.text("SELECT id, icon, icon_thumbnail FROM users WHERE icon IS NOT NULL")).fetchall()
+    for user_id, icon, thumbnail in rows:
+        if not icon:
+            continue
+        if isinstance(icon, str):
+            icon = icon.encode('utf-8')
+        if thumbnail is None:
+            thumbnail = make_thumbnail(icon)
+        conn.execute(
+            sa.text("UPDATE users SET icon_hash = :icon_hash, icon_thumbnail_hash = :thumbnail_hash WHERE id = :id"),
+            {
+                "icon_hash": store.put(icon),
+                "thumbnail_hash": store.put(thumbnail) if thumbnail else None,
+                "id": user_id,
+            }
+        )
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('icon_thumbnail')
+        batch_op.drop_column('icon')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('icon', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('icon_thumbnail', sa.LargeBinary(), nullable=True))
+
+    # ファイルストアから BLOB に書き戻す（ファイルは他の環境と共有している可能性があるので消さない）
+    conn = op.get_bind()
+    store = IconStore()
+    rows = conn.execute(sa.text(
+        "SELECT id, icon_hash, icon_thumbnail_hash FROM users WHERE icon_hash IS NOT NULL"
+    )).fetchall()
+    for user_id, icon_hash, thumbnail_hash in rows:
+        conn.execute(
+            sa.text("UPDATE users SET icon = :icon, icon_thumbnail = :thumbnail WHERE id = :id"),
+            {"icon": store.read(icon_hash), "thumbnail": store.read(thumbnail_hash), "id": user_id}
+        )
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('icon_thumbnail_hash')
@@ -2,19 +2,31 @@
 # 全てのモデルを適切な順序でインポート
 
 from .users import User
+from .friendship import Friendship
 from .otpcodes import OTPCode
 from .vitaldataname import VitalDataName
 from .vitaldata import VitalData
 from .uservitalcategory import UserVitalCategory
+from .uservitallatest import UserVitalLatest
+from .vitaldailyrollup import VitalDailyRollup
+from .vitalrollup import VitalRollup
+from .idempotencykey import IdempotencyKey
+from .vitaldataarchive import VitalDataArchive
 from .objective import Objective
 from .chat_conversation import ChatConversation, ChatMessage
 
 __all__ = [
     "User",
+    "Friendship",
     "OTPCode", 
     "VitalDataName",
     "VitalData",
     "UserVitalCategory",
+    "UserVitalLatest",
+    "VitalDailyRollup",
+    "VitalRollup",
+    "IdempotencyKey",
+    "VitalDataArchive",
     "Objective",
     "ChatConversation",
     "ChatMessage"
@@ -1,11 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from settings import Base
+from models.types import JSONType
 from datetime import datetime
 import uuid
 
 class ChatConversation(Base):
     __tablename__ = "chat_conversations"
+    __table_args__ = (
+        Index("ix_chat_conversations_user_id_updated_at", "user_id", "updated_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -19,13 +23,16 @@ class ChatConversation(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_conversation_id_timestamp", "conversation_id", "timestamp"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     conversation_id = Column(String, ForeignKey("chat_conversations.id"), nullable=False)
     role = Column(String, nullable=False)  # "user" or "assistant"
     content = Column(Text, nullable=False)
-    function_call = Column(JSON, nullable=True)  # OpenAI function call情報
-    function_result = Column(JSON, nullable=True)  # function実行結果
+    function_call = Column(JSONType, nullable=True)  # OpenAI function call情報
+    function_result = Column(JSONType, nullable=True)  # function実行結果
     timestamp = Column(DateTime, default=datetime.utcnow)
     
     # リレーションシップ
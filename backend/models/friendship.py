@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from settings import Base
+from datetime import datetime
+
+class Friendship(Base):
+    __tablename__ = 'friendships'
+    __table_args__ = (
+        # 「誰が自分を友達にしているか」を引くための逆方向の索引
+        Index('ix_friendships_friend_id', 'friend_id', 'user_id'),
+    )
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    friend_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Friendship(user_id={self.user_id}, friend_id={self.friend_id}, created_at={self.created_at})>"
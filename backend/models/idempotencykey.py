@@ -0,0 +1,25 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from settings import Base
+from models.types import JSONType
+
+
+class IdempotencyKey(Base):
+    """
+    Idempotency-Key 付きリクエストの結果
+
+    同じキーで再送されたリクエストは処理せず、保存した応答を返す
+    """
+    __tablename__ = 'idempotency_key'
+    __table_args__ = (
+        Index('ix_idempotency_key_created_at', 'created_at'),
+    )
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)  # 同じキーで別の内容が送られていないかの確認用
+    response = Column(JSONType, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(user_id={self.user_id}, key={self.key}, created_at={self.created_at})>"
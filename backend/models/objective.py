@@ -7,6 +7,7 @@ class Objective(Base):
     __tablename__ = 'objective'
 
     id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime, nullable=False)
     name_id = Column(Integer, ForeignKey('vitaldataname.id'), nullable=False)
@@ -16,6 +17,6 @@ class Objective(Base):
 
     def __repr__(self):
         return (
-            f"<Objective(id={self.id}, start_date={self.start_date}, end_date={self.end_date}, "
+            f"<Objective(id={self.id}, user_id={self.user_id}, start_date={self.start_date}, end_date={self.end_date}, "
             f"name_id={self.name_id}, value={self.value})>"
         )
\ No newline at end of file
@@ -5,7 +5,7 @@ class OTPCode(Base):
     __tablename__ = 'otpcodes'
 
     id = Column(Integer, ForeignKey('users.id'), primary_key=True)
-    otp_code = Column(String, nullable=False)
+    otp_code = Column(String, nullable=False, index=True)
     expires_at = Column(DateTime, nullable=False)
     is_used = Column(Boolean, nullable=False, default=False)
 
@@ -0,0 +1,5 @@
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+
+# JSON 列の型（PostgreSQL ではバイナリ形式の JSONB、SQLite などでは汎用の JSON）
+JSONType = JSON().with_variant(JSONB(), "postgresql")
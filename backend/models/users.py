@@ -1,21 +1,18 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, LargeBinary, Float
-from sqlalchemy.dialects.sqlite import JSON
-from sqlalchemy.ext.mutable import MutableList
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float
 from sqlalchemy.orm import relationship
 from settings import Base
-from typing import Optional, List
 
 class User(Base):
     __tablename__ = 'users'
 
     id = Column(Integer, primary_key=True)
-    email = Column(String, nullable=False)
+    email = Column(String, nullable=False, unique=True, index=True)
     username = Column(String, nullable=False)
     date_of_birth = Column(DateTime, nullable=True)
     sex = Column(Boolean, nullable=True)
-    friends: Optional[List[int]] = Column(MutableList.as_mutable(JSON), nullable=True)
-    objective: Optional[List[int]] = Column(MutableList.as_mutable(JSON), nullable=True)
-    icon = Column(LargeBinary, nullable=True)
+    # アイコン本体は IconStore（app/utils/icon_store.py）に置き、ここには内容のハッシュだけを持つ
+    icon_hash = Column(String, nullable=True)
+    icon_thumbnail_hash = Column(String, nullable=True)
     height = Column(Float, nullable=True)
 
     # リレーションシップ（文字列で指定してlazy loading）
@@ -25,6 +22,14 @@ class User(Base):
         return (
             f"<User(id={self.id}, email={self.email}, username={self.username}, "
             f"date_of_birth={self.date_of_birth}, sex={self.sex}, "
-            f"friends={self.friends}, objective={self.objective}, "
-            f"icon={self.icon}, height={self.height})>"
-        )
\ No newline at end of file
+            f"icon_hash={self.icon_hash}, height={self.height})>"
+        )
+
+# 認証依存関数（app/utils/auth.py の current_user_with）で load_only する列のグループ
+# ここに含まれない列もアクセスすれば遅延ロードされるが、その分クエリが増える
+USER_COLUMN_GROUPS = {
+    "identity": (User.id,),
+    "profile": (User.username, User.date_of_birth, User.sex, User.height, User.icon_hash),
+    "account": (User.email, User.username, User.height, User.icon_hash),
+    "icon": (User.icon_hash, User.icon_thumbnail_hash),
+}
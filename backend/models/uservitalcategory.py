@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, Boolean, Index
 from settings import Base
 
 class UserVitalCategory(Base):
     __tablename__ = 'uservitalcategory'
+    __table_args__ = (
+        Index('ix_uservitalcategory_user_id_vital_id', 'user_id', 'vital_id', unique=True),
+        Index('ix_uservitalcategory_vital_id_is_public', 'vital_id', 'is_public', 'user_id', 'is_accumulating'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
+from settings import Base
+
+class UserVitalLatest(Base):
+    __tablename__ = 'user_vital_latest'
+    __table_args__ = (
+        Index('ix_user_vital_latest_vital_id', 'vital_id'),
+    )
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    vital_id = Column(Integer, ForeignKey('vitaldataname.id'), primary_key=True)
+    latest_date = Column(DateTime, nullable=False)
+    latest_value = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<UserVitalLatest(user_id={self.user_id}, vital_id={self.vital_id}, latest_date={self.latest_date}, "
+            f"latest_value={self.latest_value})>"
+        )
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey, Index
+from settings import Base
+
+class VitalDailyRollup(Base):
+    __tablename__ = 'vital_daily_rollup'
+    __table_args__ = (
+        Index('ix_vital_daily_rollup_vital_id_day', 'vital_id', 'day'),
+    )
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    vital_id = Column(Integer, ForeignKey('vitaldataname.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    value_sum = Column(Float, nullable=False)
+    value_count = Column(Integer, nullable=False)
+    value_min = Column(Float, nullable=False)
+    value_max = Column(Float, nullable=False)
+    last_value = Column(Float, nullable=False)
+    last_date = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<VitalDailyRollup(user_id={self.user_id}, vital_id={self.vital_id}, day={self.day}, "
+            f"sum={self.value_sum}, count={self.value_count}, min={self.value_min}, max={self.value_max}, "
+            f"last_value={self.last_value}, last_date={self.last_date})>"
+        )
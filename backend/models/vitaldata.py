@@ -1,21 +1,47 @@
-from sqlalchemy import Column, Integer, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, Boolean, DateTime, String, ForeignKey, Index, DDL, event
 from sqlalchemy.orm import relationship
 from settings import Base
 from sqlalchemy.orm import relationship
+from app.database.partitions import default_partition_name
+
+# 登録元を指定しない書き込みの source
+DEFAULT_SOURCE = "app"
 
 class VitalData(Base):
     __tablename__ = 'vitaldata'
+    __table_args__ = (
+        Index('ix_vitaldata_user_id_date', 'user_id', 'date'),
+        # 自然キー：同じ登録元からの同じ時刻の計測値は1行だけ（再送は挿入されない）
+        # (user_id, name_id) で絞り込み date で並べるクエリもこの索引を使う
+        Index('ix_vitaldata_user_id_name_id_date_source', 'user_id', 'name_id', 'date', 'source', unique=True),
+        {
+            # PostgreSQL では date の範囲で月ごとにパーティション分割する（app/database/partitions.py）
+            'postgresql_partition_by': 'RANGE (date)',
+            'info': {'partition_key': 'date'},
+            # 古い月をアーカイブしても id を使い回さない
+            'sqlite_autoincrement': True,
+        },
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     date = Column(DateTime, nullable=False)
     name_id = Column(Integer, ForeignKey('vitaldataname.id'), nullable=False)
     value = Column(Float, nullable=False)
+    source = Column(String, nullable=False, default=DEFAULT_SOURCE, server_default=DEFAULT_SOURCE)  # app / agent / import / 外部連携名など
 
     vitaldataname = relationship("VitalDataName", back_populates="vitaldata")
 
     def __repr__(self):
         return (
             f"<VitalData(id={self.id}, user_id={self.user_id}, date={self.date}, name_id={self.name_id}, "
-            f"value={self.value})>"
-        )
\ No newline at end of file
+            f"value={self.value}, source={self.source})>"
+        )
+
+
+# 月のパーティションがまだない行は DEFAULT パーティションで受ける（月のパーティションは manage_vital_partitions.py で作る）
+event.listen(
+    VitalData.__table__,
+    "after_create",
+    DDL(f"CREATE TABLE {default_partition_name('vitaldata')} PARTITION OF vitaldata DEFAULT").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Date, DateTime
+from settings import Base
+
+
+class VitalDataArchive(Base):
+    """
+    vitaldata から切り出した月（アーカイブテーブル）の一覧
+
+    読み取りはこの一覧から期間にかかる月のテーブルだけを vitaldata に合わせて読む（app/services/vital_partitions.py）
+    """
+    __tablename__ = 'vitaldata_archives'
+
+    month = Column(Date, primary_key=True)  # 月の初日
+    table_name = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<VitalDataArchive(month={self.month}, table_name={self.table_name}, row_count={self.row_count})>"
@@ -7,7 +7,7 @@ class VitalDataName(Base):
     __tablename__ = 'vitaldataname'
 
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, unique=True, index=True)
 
     vitaldata = relationship("VitalData", back_populates="vitaldataname")
     objective = relationship("Objective", back_populates="vitaldataname")
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey
+from settings import Base
+
+class VitalRollup(Base):
+    """時間・週・月単位の集計（日単位は vital_daily_rollup）"""
+    __tablename__ = 'vital_rollup'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    vital_id = Column(Integer, ForeignKey('vitaldataname.id'), primary_key=True)
+    resolution = Column(String, primary_key=True)  # hour / week / month
+    bucket_start = Column(DateTime, primary_key=True)
+    value_sum = Column(Float, nullable=False)
+    value_count = Column(Integer, nullable=False)
+    value_min = Column(Float, nullable=False)
+    value_max = Column(Float, nullable=False)
+    last_value = Column(Float, nullable=False)
+    last_date = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<VitalRollup(user_id={self.user_id}, vital_id={self.vital_id}, resolution={self.resolution}, "
+            f"bucket_start={self.bucket_start}, sum={self.value_sum}, count={self.value_count}, "
+            f"min={self.value_min}, max={self.value_max}, last_value={self.last_value}, last_date={self.last_date})>"
+        )
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+投影テーブル再構築スクリプト
+
+vitaldata を直接書き換えた後（add_data_example.py など raw SQL での一括投入後）に実行し、
+user_vital_latest（最新値）・vital_daily_rollup（日次集計）・vital_rollup（時間・週・月の集計）を
+vitaldata から作り直します。
+
+    python rebuild_projections.py                  # 全ユーザー・全テーブル
+    python rebuild_projections.py --user-id 3
+    python rebuild_projections.py --only daily     # 日次集計だけ
+"""
+
+import argparse
+
+from settings import SessionLocal
+from app.services.vital_projection import VitalProjectionService
+from app.services.vital_rollup import VitalRollupService
+
+
+def rebuild_projections(user_id=None, only=None):
+    db = SessionLocal()
+    try:
+        target = f"ユーザー {user_id}" if user_id is not None else "全ユーザー"
+        service = VitalProjectionService(db)
+        if only in (None, "latest"):
+            print(f"🔄 {target} の user_vital_latest を再構築しています...")
+            count = service.rebuild_latest(user_id)
+            print(f"✅ {count} 件の最新値を再構築しました")
+        if only in (None, "daily"):
+            print(f"🔄 {target} の vital_daily_rollup を再構築しています...")
+            count = service.rebuild_daily(user_id)
+            print(f"✅ {count} 件の日次集計を再構築しました")
+        if only in (None, "rollup"):
+            print(f"🔄 {target} の vital_rollup を再構築しています...")
+            count = VitalRollupService(db).rebuild(user_id)
+            print(f"✅ {count} 件の時間・週・月の集計を再構築しました")
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"❌ 再構築に失敗しました: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="vitaldata から投影テーブルを再構築します")
+    parser.add_argument("--user-id", type=int, default=None, help="対象ユーザーID（省略時は全ユーザー）")
+    parser.add_argument("--only", choices=["latest", "daily", "rollup"], default=None, help="再構築するテーブル（省略時はすべて）")
+    args = parser.parse_args()
+    rebuild_projections(args.user_id, args.only)
@@ -37,6 +37,7 @@ class SearchManager:
             # デモ用のユーザーを設定（実際の運用では認証システムが必要）
             self._set_demo_user()
             self._set_demo_auth()
+            self._load_vital_names()
             
             return success
             
@@ -82,6 +83,17 @@ class SearchManager:
         except Exception as e:
             print(f"デモ認証設定エラー: {e}")
     
+    def _load_vital_names(self):
+        """カテゴリ名 ⇔ ID の辞書を読み込む（全件の読み込みは起動時だけ行う）"""
+        from settings import get_db
+        from app.utils.vital_names import vital_names
+
+        session = next(get_db())
+        try:
+            vital_names.load(session)
+        finally:
+            session.close()
+
     def search(self, query: str, context: str = "") -> Dict[str, Any]:
         try:
             if not self.vector_store_manager.vector_store_id:
@@ -303,23 +315,30 @@ class SearchManager:
                 elif function_name == "register_vital_data":
                     url = f"{self.fastapi_base_url}/vitaldata/register/"
                     
-                    # data_nameからname_idを取得する必要があるため、まずVitalDataNameを検索
+                    # data_nameからname_idを取得する（プロセス内の辞書にない場合だけセッションを開き、表記ゆれ・同義語も解決する）
+                    # 書き込みなので似ているだけの名前には解決せず、候補を返す
                     data_name = arguments["data_name"]
-                    from settings import get_db
-                    from models.vitaldataname import VitalDataName
-                    session = next(get_db())
-                    try:
-                        data_name_obj = session.query(VitalDataName).filter(
-                            VitalDataName.name == data_name
-                        ).first()
-                        if not data_name_obj:
-                            return {
-                                "success": False,
-                                "error": f"データ名 '{data_name}' が見つかりません"
-                            }
-                        name_id = data_name_obj.id
-                    finally:
-                        session.close()
+                    from app.utils.vital_names import vital_names
+                    name_id = vital_names.get_id(data_name)
+                    suggestions = []
+                    if name_id is None:
+                        from settings import get_db
+                        from app.utils.vital_name_index import vital_name_index
+                        session = next(get_db())
+                        try:
+                            match = vital_name_index.resolve(session, data_name, fuzzy=False)
+                            if match is not None:
+                                name_id = match.vital_id
+                            else:
+                                suggestions = vital_name_index.suggestions(session, data_name)
+                        finally:
+                            session.close()
+                    if name_id is None:
+                        return {
+                            "success": False,
+                            "error": f"データ名 '{data_name}' が見つかりません" + (f"（候補: {', '.join(suggestions)}）" if suggestions else ""),
+                            "suggestions": suggestions
+                        }
                     
                     data = {
                         "name_id": name_id,
@@ -1,34 +1,76 @@
 # settings.py
 
-import os
+from typing import Optional
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database.engine import DatabaseSettings, create_db_engine, create_async_db_engine
+from app.database.routing import WriteTrackingSession, recent_writers
 
 # .envファイルを読み込む
 load_dotenv()
 
-DATABASE_URL = "sqlite:///./test.db"  # プロジェクトルート直下
+# 接続先・プール設定（APP_ENV, DATABASE_URL, DB_POOL_SIZE などの環境変数で変更できる）
+db_settings = DatabaseSettings()
+DATABASE_URL = db_settings.resolved_url()
+READ_DATABASE_URL = db_settings.resolved_read_url()
 
-# Alembic でも使う engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=False,  # ログを出すなら True
-)
+# Alembic・スクリプトでも使う engine
+engine = create_db_engine(db_settings, DATABASE_URL)
 
-# アプリケーション用セッション
+# スクリプト・CLI 用セッション
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
+    class_=WriteTrackingSession,
+)
+
+# FastAPI 用の非同期 engine（クエリの待ち時間にイベントループを塞がない）
+async_engine = create_async_db_engine(db_settings, DATABASE_URL)
+
+# FastAPI 用の非同期セッション
+# commit 後に属性を読み直すと遅延ロードになるため expire_on_commit=False にする
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    sync_session_class=WriteTrackingSession,
+)
+
+# 読み取り専用エンドポイント用（レプリカ、未設定なら primary と同じ engine）
+async_read_engine = create_async_db_engine(db_settings, READ_DATABASE_URL) if READ_DATABASE_URL else async_engine
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine,
+    autoflush=False,
+    expire_on_commit=False,
 )
 
+# 書き込んだユーザーの読み取りを primary に送る期間
+recent_writers.window = db_settings.read_your_writes_seconds
+
 # すべてのモデルがこれを継承する
 Base = declarative_base()
 
 
 # FastAPI の Depends() で使う
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# 読み取り専用のエンドポイントで使う（直近に書き込んだユーザーは primary から読む）
+# ユーザーの判定が必要なため、Depends() では app.utils.auth.get_async_read_db を使う
+# last_write は Cookie で受け取った書き込み時刻（他のワーカーで書き込んだ場合）
+async def get_async_read_session(user_id: Optional[int], last_write: Optional[float] = None):
+    recent = recent_writers.is_recent(user_id) or recent_writers.is_recent_write(last_write)
+    session_factory = AsyncSessionLocal if recent else AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
+
+
+# 同期処理のまま def で動かすエンドポイント（ファイル取り込みなど）とスクリプト用
 def get_db():
     db = SessionLocal()
     try:
@@ -41,11 +83,17 @@ def setup_models():
     """全てのモデルをインポートしてリレーションシップを解決する"""
     try:
         from models.users import User
+        from models.friendship import Friendship
         from models.vitaldata import VitalData
         from models.vitaldataname import VitalDataName
         from models.objective import Objective
         from models.otpcodes import OTPCode
         from models.uservitalcategory import UserVitalCategory
+        from models.uservitallatest import UserVitalLatest
+        from models.vitaldailyrollup import VitalDailyRollup
+        from models.vitalrollup import VitalRollup
+        from models.idempotencykey import IdempotencyKey
+        from models.vitaldataarchive import VitalDataArchive
         from models.chat_conversation import ChatConversation, ChatMessage
         return True
     except Exception as e:
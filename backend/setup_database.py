@@ -9,9 +9,39 @@ import os
 import subprocess
 import sys
 
+from settings import DATABASE_URL
+
+def setup_server_database():
+    """
+    SQLite 以外（PostgreSQL など）の DB を初期化する
+
+    初期のマイグレーションは SQLite の既存 DB を前提にしているため、空の DB では
+    モデルから全テーブルを作って Alembic を head に stamp する（以降は alembic upgrade head で更新）
+    """
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import inspect
+    from settings import Base, engine
+    import models  # noqa: F401
+
+    config = Config("alembic.ini")
+    if "alembic_version" in inspect(engine).get_table_names():
+        print("📌 Database is already managed by Alembic. Running migrations...")
+        command.upgrade(config, "head")
+    else:
+        print("📊 Creating all tables from the models...")
+        Base.metadata.create_all(engine)
+        command.stamp(config, "head")
+    print(f"📋 Database tables: {sorted(inspect(engine).get_table_names())}")
+    print("\n🎉 Database setup completed successfully!")
+
 def setup_database():
     """Set up the database safely without losing data"""
     
+    if not DATABASE_URL.startswith("sqlite"):
+        setup_server_database()
+        return
+
     print("🚀 Setting up database...")
     
     # Check if database exists
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+SQLite 同時書き込みの負荷テスト
+
+複数のスレッドから /vitaldata/register/ と同じ経路（VitalIngestService.insert_rows → commit）で
+1件ずつ書き込み、同時に読み取り（ライフログと同じ範囲検索）を流します。
+"database is locked" などの書き込み失敗があった場合や、vitaldata と日次集計の件数が合わない場合は終了コード 1 で終わります。
+
+    python stress_sqlite_writers.py                          # 現在の設定（DB_SQLITE_*）で実行
+    python stress_sqlite_writers.py --compare                # チューニングなしと比較
+    python stress_sqlite_writers.py --writers 16 --writes 500
+
+毎回一時ファイルに新しい DB を作るため、test.db には書き込みません。
+"""
+
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Any
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from settings import Base, db_settings
+from app.database.engine import create_db_engine
+from app.services.vital_ingest import VitalIngestService
+from models.users import User
+from models.vitaldata import VitalData
+from models.vitaldataname import VitalDataName
+from models.uservitalcategory import UserVitalCategory
+from models.vitaldailyrollup import VitalDailyRollup
+
+
+def percentile(values: List[float], p: float) -> float:
+    """p パーセンタイル（最近傍法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def seed(Session, writers: int) -> int:
+    """書き込みスレッドごとのユーザーとカテゴリを作り、カテゴリ ID を返す"""
+    db = Session()
+    try:
+        vital = VitalDataName(name="stress")
+        db.add(vital)
+        db.flush()
+        for index in range(writers):
+            user = User(email=f"stress{index}@example.com", username=f"stress{index}", date_of_birth=datetime(1990, 1, 1))
+            db.add(user)
+            db.flush()
+            db.add(UserVitalCategory(user_id=user.id, vital_id=vital.id, is_public=True, is_accumulating=False))
+        db.commit()
+        return vital.id
+    finally:
+        db.close()
+
+
+def run_profile(tuning: bool, args) -> Dict[str, Any]:
+    """一時 DB を作り、指定のプロファイルで書き込み・読み取りを並列に流す"""
+    directory = tempfile.mkdtemp(prefix="stress_sqlite_")
+    url = f"sqlite:///{os.path.join(directory, 'stress.db')}"
+    config = db_settings.model_copy(update={
+        "sqlite_tuning": tuning,
+        "pool_size": args.writers + args.readers,
+    })
+    engine = create_db_engine(config, url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    vital_id = seed(Session, args.writers)
+
+    write_latencies: List[float] = []
+    errors: List[str] = []
+    reads = 0
+    lock = threading.Lock()
+    writers_done = threading.Event()
+    start_date = datetime(2024, 1, 1)
+
+    def writer(user_id: int):
+        db = Session()
+        try:
+            for index in range(args.writes):
+                row = {
+                    "user_id": user_id,
+                    "name_id": vital_id,
+                    # 数時間おきの計測（日をまたぐので日次集計も更新される）
+                    "date": start_date + timedelta(hours=index * 3),
+                    "value": 60.0 + index % 10,
+                    "source": "stress",
+                }
+                started = time.perf_counter()
+                try:
+                    VitalIngestService(db).insert_rows([row])
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    with lock:
+                        errors.append(f"{type(e).__name__}: {str(e).splitlines()[0]}")
+                    continue
+                with lock:
+                    write_latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+
+    def reader(user_id: int):
+        nonlocal reads
+        db = Session()
+        try:
+            while not writers_done.is_set():
+                try:
+                    db.execute(
+                        select(VitalData.date, VitalData.value)
+                        .where(VitalData.user_id == user_id, VitalData.name_id == vital_id)
+                        .order_by(VitalData.date.desc())
+                        .limit(200)
+                    ).all()
+                    db.rollback()  # 読み取りトランザクションを閉じる
+                except Exception as e:
+                    db.rollback()
+                    with lock:
+                        errors.append(f"read {type(e).__name__}: {str(e).splitlines()[0]}")
+                    continue
+                with lock:
+                    reads += 1
+        finally:
+            db.close()
+
+    writer_threads = [threading.Thread(target=writer, args=(user_id,)) for user_id in range(1, args.writers + 1)]
+    reader_threads = [
+        threading.Thread(target=reader, args=(index % args.writers + 1,)) for index in range(args.readers)
+    ]
+    started = time.perf_counter()
+    for thread in reader_threads + writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    writers_done.set()
+    for thread in reader_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with engine.connect() as connection:
+        rows = connection.scalar(select(func.count()).select_from(VitalData))
+        rolled_up = connection.scalar(select(func.coalesce(func.sum(VitalDailyRollup.value_count), 0)))
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+    engine.dispose()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "profile": "tuned" if tuning else "default",
+        "journal_mode": journal_mode,
+        "seconds": elapsed,
+        "writes": len(write_latencies),
+        "writes_per_second": len(write_latencies) / elapsed,
+        "reads_per_second": reads / elapsed,
+        "write_p50": percentile(write_latencies, 50),
+        "write_p99": percentile(write_latencies, 99),
+        "errors": errors,
+        "rows": rows,
+        "rolled_up": rolled_up,
+    }
+
+
+def print_report(result: Dict[str, Any], expected: int) -> bool:
+    print(
+        f"\n📊 {result['profile']} (journal_mode={result['journal_mode']}): "
+        f"{result['writes']}/{expected} 件を {result['seconds']:.2f} 秒で書き込みました"
+    )
+    print(f"書き込み: {result['writes_per_second']:.1f} 件/秒 (p50 {result['write_p50']:.1f} ms, p99 {result['write_p99']:.1f} ms)")
+    print(f"読み取り: {result['reads_per_second']:.1f} 回/秒")
+
+    ok = True
+    if result["errors"]:
+        ok = False
+        print(f"❌ {len(result['errors'])} 件の失敗（先頭: {result['errors'][0]}）")
+    if result["rows"] != result["writes"] or result["rolled_up"] != result["rows"]:
+        ok = False
+        print(f"❌ 件数が一致しません (vitaldata {result['rows']} / 日次集計 {result['rolled_up']} / 成功 {result['writes']})")
+    if ok:
+        print("✅ 失敗なし・集計も一致")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite に複数スレッドから同時に書き込み、ロックエラーと速度を確認します")
+    parser.add_argument("--writers", type=int, default=8, help="書き込みスレッド数（スレッドごとに別ユーザー）")
+    parser.add_argument("--readers", type=int, default=4, help="読み取りスレッド数")
+    parser.add_argument("--writes", type=int, default=200, help="書き込みスレッドあたりの件数")
+    parser.add_argument("--compare", action="store_true", help="チューニングなし（PRAGMA 未設定）でも実行して比較する")
+    args = parser.parse_args()
+
+    print(f"🚀 {args.writers} スレッド × {args.writes} 件を書き込みます（読み取り {args.readers} スレッド）...")
+    profiles = [False, True] if args.compare else [db_settings.sqlite_tuning]
+    expected = args.writers * args.writes
+    results = [print_report(run_profile(tuning, args), expected) for tuning in profiles]
+
+    # 比較時はチューニングなしの失敗は想定内として、チューニングありの結果だけで判定する
+    sys.exit(0 if results[-1] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import AsyncStorage from '@react-native-async-storage/async-storage';
 
 const api = axios.create({
   baseURL: 'http://localhost:8000',  // <-- computer ip   192.168.1.2
+  // 書き込み後の読み取りを primary に送るための Cookie（last_write）を Web でも送る
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },
@@ -27,4 +29,13 @@ api.interceptors.request.use(
   }
 );
 
+// アイコン取得エンドポイントの URL（icon_url / friend_icon_url）を画像の source にする（エンドポイントは認証が必要）
+export const iconSource = (iconUrl: string | null | undefined, token: string | null) => {
+  if (!iconUrl) return undefined;
+  return {
+    uri: `${api.defaults.baseURL}${iconUrl}`,
+    headers: token ? { Authorization: `Bearer ${token}` } : undefined,
+  };
+};
+
 export default api; 
\ No newline at end of file
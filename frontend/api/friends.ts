@@ -1,4 +1,5 @@
-import api from './base';
+import api, { iconSource } from './base';
+import { DEFAULT_LIFE_LOG_MAX_POINTS } from './user_vital';
 import { getToken } from '@/utils/tokenStorage';
 
 // 获取朋友列表（带 token）
@@ -8,17 +9,21 @@ export async function getFriends() {
   const res = await api.get('/friends/', {
     headers: { Authorization: `Bearer ${token}` }
   });
-  return res.data;
+  // アイコンは本体を埋め込まず、サムネイルの URL から読み込む
+  return res.data.map((friend: any) => ({ ...friend, icon_source: iconSource(friend.icon_url, token) }));
 }
 
 // 获取朋友详情（带 token）
 export async function getFriendDetail(user_id: number | string) {
   const token = await getToken();
   if (!token) throw new Error('No token');
+  // グラフに描ける点数だけ要求し、全期間の生データは集計済みの系列で受け取る
   const res = await api.get(`/friends/${user_id}`, {
-    headers: { Authorization: `Bearer ${token}` }
+    headers: { Authorization: `Bearer ${token}` },
+    params: { max_points: DEFAULT_LIFE_LOG_MAX_POINTS }
   });
-  return res.data;
+  // アイコンは本体を埋め込まず、icon_url から読み込む（ETag でキャッシュされる）
+  return { ...res.data, icon_source: iconSource(res.data.icon_url, token) };
 }
 
 // 添加朋友（带 token，参数为 friend_id）
@@ -1,4 +1,4 @@
-import api from './base';
+import api, { iconSource } from './base';
 import { getToken } from '@/utils/tokenStorage';
 
 // 获取目标列表（带 token）
@@ -8,7 +8,14 @@ export async function getObjectives() {
   const res = await api.get('/objectives/', {
     headers: { Authorization: `Bearer ${token}` }
   });
-  return res.data;
+  // 友達のアイコンは本体を埋め込まず、サムネイルの URL から読み込む
+  return res.data.map((objective: any) => ({
+    ...objective,
+    friends: objective.friends.map((friend: any) => ({
+      ...friend,
+      friend_icon_source: iconSource(friend.friend_icon_url, token),
+    })),
+  }));
 }
 
 // 创建目标（带 token，路径加斜杠，日期为 ISO 字符串，数值为数字，直接传对象）
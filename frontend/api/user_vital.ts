@@ -14,8 +14,23 @@ interface LifeLogDataPoint {
 export interface LifeLogSeries {
   data_name: string;
   vitaldata_list: LifeLogDataPoint[];
+  next_cursor?: string | null;
+  downsampled?: boolean;
 }
 
+// ライフログ取得のオプション（期間・ページング・グラフ用の間引き）
+export interface LifeLogQuery {
+  start?: string;
+  end?: string;
+  data_name?: string;
+  limit?: number;
+  cursor?: string;
+  max_points?: number;
+}
+
+// グラフ表示で使う1系列あたりの最大点数
+export const DEFAULT_LIFE_LOG_MAX_POINTS = 500;
+
 // 新しい型定義：健康データ登録用
 export interface RegisterVitalDataRequest {
   name_id: number;
@@ -55,15 +70,18 @@ export const fetchUserVitals = async (): Promise<UserVital[]> => {
  * 指定された期間のライフログ（血圧、歩数など）を取得します。
  * この関数を呼び出す前に、AsyncStorageからトークンを取得して渡してください。
  */
-export const fetchLifeLogs = async (): Promise<LifeLogSeries[]> => {
+export const fetchLifeLogs = async (
+  query: LifeLogQuery = { max_points: DEFAULT_LIFE_LOG_MAX_POINTS }
+): Promise<LifeLogSeries[]> => {
   try {
     const token = await AsyncStorage.getItem('userToken');
     if (!token) {
       throw new Error('認証トークンが見つかりません。ログインしてください。');
     }
     
-    // params（日付範囲）の指定をなくし、単純にGETリクエストを送る
+    // 履歴が長くてもレスポンスが大きくならないよう、既定ではサーバー側で間引いた点を受け取る
     const response = await api.get<LifeLogSeries[]>('/vitaldata/life-logs/', {
+      params: query,
       headers: {
         Authorization: `Bearer ${token}`,
       },
@@ -75,21 +93,54 @@ export const fetchLifeLogs = async (): Promise<LifeLogSeries[]> => {
   }
 };
 
+// 一括登録の1件（カテゴリは name_id か data_name で指定）
+export interface BulkVitalReading {
+  name_id?: number;
+  data_name?: string;
+  date: string; // ISO string format
+  value: number;
+  source?: string; // 登録元（同じ登録元・同じ時刻の値は1件だけ保存される）
+}
+export interface BulkRegisterResult {
+  inserted: number;
+  duplicates: number; // 登録済みのため挿入しなかった件数
+  failed: number;
+  results: { index: number; status: 'ok' | 'duplicate' | 'error'; error?: string }[];
+}
+
+/**
+ * 複数の健康データを1リクエストでまとめて登録します（ウェアラブル端末の同期など）
+ */
+export const registerVitalDataBulk = async (readings: BulkVitalReading[]): Promise<BulkRegisterResult> => {
+  try {
+    const response = await api.post<BulkRegisterResult>('/vitaldata/register/bulk/', readings);
+    return response.data;
+  } catch (error) {
+    console.error('健康データの一括登録に失敗しました:', error);
+    throw error;
+  }
+};
+
 /**
  * 健康データを登録します
  * @param data 登録する健康データ
+ * @param idempotencyKey 再送時に同じ値を渡すと二重登録されない
  * @returns 登録結果
  */
-export const registerVitalData = async (data: RegisterVitalDataRequest): Promise<{ message: string }> => {
+export const registerVitalData = async (
+  data: RegisterVitalDataRequest,
+  idempotencyKey?: string
+): Promise<{ message: string; created: boolean }> => {
   try {
     const token = await AsyncStorage.getItem('userToken');
     if (!token) {
       throw new Error('認証トークンが見つかりません。ログインしてください。');
     }
 
-    const response = await api.post<{ message: string }>('/vitaldata/register/', data, {
+    const response = await api.post<{ message: string; created: boolean }>('/vitaldata/register/', data, {
       headers: {
         Authorization: `Bearer ${token}`,
+        ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
       },
     });
     return response.data;
@@ -172,3 +223,36 @@ export const registerCategoryToUser = async (data: { vitaldataname: string; is_p
     throw error;
   }
 };
+
+// 集計済みの系列（生データ / 時間 / 日 / 週 / 月 のうち点数の上限に収まる粒度）
+export interface VitalSeriesPoint {
+  x: string;
+  y: number;
+  min: number;
+  max: number;
+  count: number;
+}
+export interface VitalSeries {
+  data_name: string;
+  resolution: 'raw' | 'hour' | 'day' | 'week' | 'month';
+  vitaldata_list: VitalSeriesPoint[];
+}
+
+/**
+ * グラフ用の集計済み系列を取得します（user_id を指定すると友達の公開カテゴリ）
+ */
+export const fetchVitalSeries = async (params: {
+  data_name: string;
+  start?: string;
+  end?: string;
+  max_points?: number;
+  user_id?: number;
+}): Promise<VitalSeries> => {
+  try {
+    const response = await api.get<VitalSeries>('/vitaldata/series/', { params });
+    return response.data;
+  } catch (error) {
+    console.error('集計済み系列の取得に失敗しました:', error);
+    throw error;
+  }
+};
@@ -61,7 +61,7 @@ export default function FriendsScreen() {
               ]}
               onPress={() => handleFriendPress(friend.user_id)}
             >
-              <UserAvatar uri={friend.icon ? `data:image/png;base64,${friend.icon}` : ''} size={50} />
+              <UserAvatar source={friend.icon_source} size={50} />
               <View style={styles.friendInfo}>
                 <Text style={styles.friendName}>{friend.username}</Text>
                 <Text style={styles.friendAge}>{friend.age === -1 ? '年齢未設定' : `${friend.age}歳`}</Text>
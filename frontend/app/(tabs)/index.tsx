@@ -9,6 +9,7 @@ import { User } from '@/types';
 import { getUserProfile, updateUserProfile } from '@/api/auth';
 import { ProfileEditModal } from '@/components/ProfileEditModal';
 import { getToken } from '@/utils/tokenStorage';
+import { iconSource } from '@/api/base';
 import { getObjectives } from '@/api/objectives';
 // ★ 1. ライフログ取得用のAPI関数と型をインポート
 import { fetchLifeLogs, LifeLogSeries, createDataNameToIdMapping } from '@/api/user_vital';
@@ -81,7 +82,8 @@ export default function HomeScreen() {
         height: data.height,
         weight: 0,
         gender: data.sex === true ? 'male' : data.sex === false ? 'female' : 'other',
-        avatar: data.icon ? `data:image/png;base64,${data.icon}` : '',
+        avatar: '',
+        avatarSource: iconSource(data.icon_url, token),
       });
     } catch (e) {
       console.error("Profile fetch error:", e);
@@ -119,7 +121,7 @@ export default function HomeScreen() {
   const fetchLogs = async () => {
     setLifeLogsLoading(true);
     try {
-      const data = await fetchLifeLogs(); // 引数なしで全データを取得
+      const data = await fetchLifeLogs(); // 全期間をグラフ用に間引いて取得
       setLifeLogs(data);
     } catch(e) {
       console.error("LifeLogs fetch error:", e);
@@ -160,7 +162,8 @@ export default function HomeScreen() {
         icon = icon.replace(/^data:image\/\w+;base64,/, '');
       }
       await updateUserProfile({
-        icon,
+        // アイコンは新しく選んだときだけ送る（未変更なら送らず、保存済みのアイコンを残す）
+        icon: icon || undefined,
         username: updatedUser.name,
         date_of_birth: updatedUser.dateOfBirth ? updatedUser.dateOfBirth.split('T')[0] : updatedUser.dateOfBirth,
         height: updatedUser.height,
@@ -195,7 +198,7 @@ export default function HomeScreen() {
         <View style={styles.header}>
             <View style={styles.userInfoRow}>
                 <View style={styles.userInfoLeft}>
-                <UserAvatar uri={displayAvatar} size={64} />
+                <UserAvatar uri={displayAvatar} source={user.avatar ? undefined : user.avatarSource} size={64} />
                 <View style={styles.userDetailsColumn}>
                     <View style={styles.userNameRow}>
                     <Text style={styles.userName} numberOfLines={1} ellipsizeMode="tail">{displayName}</Text>
@@ -271,7 +274,7 @@ export default function HomeScreen() {
                               </View>
                               {barWidth > 0 && (
                                 <View style={[styles.friendAvatarContainer, { left }]}>
-                                  {f.friend_icon && <UserAvatar uri={`data:image/png;base64,${f.friend_icon}`} size={avatarSize} borderWidth={0} />}
+                                  {f.friend_icon_source && <UserAvatar source={f.friend_icon_source} size={avatarSize} borderWidth={0} />}
                                 </View>
                               )}
                               <View style={styles.friendProgressText}>
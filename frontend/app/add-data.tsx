@@ -221,7 +221,7 @@ export default function AddDataScreen() {
         is_accumulating: false  // 固定为false，因为创建全局类型时不需要累积设置
       };
 
-      await api.put('/vitaldata/create/', requestData);
+      const response = await api.put<{ message: string; created: boolean; id: number; name: string }>('/vitaldata/create/', requestData);
       
       // 重新获取数据类型列表
       await fetchCategories();
@@ -229,9 +229,12 @@ export default function AddDataScreen() {
       setCustomModalVisible(false);
       setCustomName('');
       
+      // 表記ゆれ・同義語で既存のデータタイプに当たった場合は作成されない
       setToast({
         visible: true,
-        message: '新しいデータタイプが作成されました！',
+        message: response.data.created
+          ? '新しいデータタイプが作成されました！'
+          : `「${response.data.name}」は既にあるデータタイプです`,
         type: 'success'
       });
 
@@ -403,7 +403,7 @@ export default function FriendDetailScreen() {
         
         setFriend({
           username: data.username,
-          icon: data.icon,
+          icon_source: data.icon_source,
           age: data.age,
           sex: data.sex,
         });
@@ -432,8 +432,8 @@ export default function FriendDetailScreen() {
     );
   }
 
-  // 表示するアバター画像
-  const displayAvatar = friend?.icon ? `data:image/png;base64,${friend.icon}` : 'https://placehold.co/64x64?text=User';
+  // 表示するアバター画像（アイコンがなければプレースホルダー）
+  const displayAvatar = 'https://placehold.co/64x64?text=User';
 
   return (
     <SafeAreaView style={styles.container}>
@@ -443,7 +443,7 @@ export default function FriendDetailScreen() {
       <ScrollView>
         {/* フレンドのプロフィールヘッダー */}
         <View style={styles.header}>
-          <UserAvatar uri={displayAvatar} size={80} />
+          <UserAvatar uri={displayAvatar} source={friend?.icon_source} size={80} />
           <Text style={styles.friendName}>{friend?.username}</Text>
           <Text style={styles.friendAge}>
             {friend?.age === -1 ? '年齢未設定' : `${friend?.age}歳`}
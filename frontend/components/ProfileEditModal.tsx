@@ -171,7 +171,7 @@ export function ProfileEditModal({ visible, user, onClose, onSave }: ProfileEdit
             {/* Avatar Section */}
             <View style={styles.avatarSection}>
               <TouchableOpacity style={styles.avatarContainer} onPress={handleAvatarPress}>
-                <UserAvatar uri={editedUser.avatar} size={80} />
+                <UserAvatar uri={editedUser.avatar} source={editedUser.avatar ? undefined : editedUser.avatarSource} size={80} />
                 <View style={styles.avatarOverlay}>
                   <Camera size={16} color="#FFFFFF" />
                 </View>
@@ -2,7 +2,9 @@ import React from 'react';
 import { Image, View, StyleSheet, Text } from 'react-native';
 
 interface UserAvatarProps {
-  uri: string;
+  uri?: string;
+  // 認証が必要な URL（アイコン取得エンドポイント）はヘッダー付きの source で渡す
+  source?: { uri: string; headers?: Record<string, string> };
   size?: number;
   borderWidth?: number;
   borderColor?: string;
@@ -10,12 +12,14 @@ interface UserAvatarProps {
 
 export function UserAvatar({
   uri,
+  source,
   size = 40,
   borderWidth = 2,
   borderColor = '#FFFFFF'
 }: UserAvatarProps) {
   // 检查uri是否有效
-  const isValidUri = uri && uri.trim() !== '';
+  const imageSource = source ?? (uri && uri.trim() !== '' ? { uri } : undefined);
+  const isValidUri = !!imageSource;
   
   return (
     <View
@@ -32,7 +36,7 @@ export function UserAvatar({
     >
       {isValidUri ? (
         <Image
-          source={{ uri }}
+          source={imageSource}
           style={[
             styles.image,
             {
@@ -6,7 +6,8 @@ export interface User {
   height: number; // in cm
   weight: number; // in kg
   gender: 'male' | 'female' | 'other';
-  avatar: string;
+  avatar: string; // 新しく選んだアイコン（base64 / file://）。保存済みのアイコンは avatarSource から読み込む
+  avatarSource?: { uri: string; headers?: Record<string, string> };
 }
 
 export interface Friend {